@@ -1,9 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+import logging
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 from vox_box.config.config import Config
+from vox_box.utils.audio import generate_wav_bytes
+
+logger = logging.getLogger(__name__)
+
+# (audio duration in seconds, response format) pairs.
+WARMUP_TRANSCRIPTION_INPUTS = [
+    (1.0, "json"),
+    (5.0, "verbose_json"),
+    (20.0, "json"),
+]
 
 
 class STTBackend(ABC):
+    _warm: bool = False
+    _warmup_timings: List[Dict] = []
+
     def __init__(
         self,
         cfg: Config,
@@ -25,12 +40,68 @@ class STTBackend(ABC):
     @abstractmethod
     def transcribe(
         self,
-        audio: bytes,
+        audio: Union[bytes, BinaryIO],
         language: Optional[str] = None,
         prompt: Optional[str] = None,
         temperature: float = 0.2,
         timestamp_granularities: Optional[List[str]] = None,
         response_format: str = "json",
-        **kwargs
+        **kwargs,
     ):
         pass
+
+    def warmup(self):
+        """Run synthetic requests so that lazy initialization, kernel
+        selection and allocator growth happen before real traffic.
+
+        Called at the end of `load`, does nothing but mark the backend warm
+        when warmup is disabled. A failed warmup request is logged and
+        doesn't prevent the backend from serving.
+        """
+        if not self._cfg.warmup:
+            self._warm = True
+            return
+
+        timings = []
+        for duration, response_format in self._warmup_inputs():
+            timing = {"audio_duration": duration, "response_format": response_format}
+            audio = generate_wav_bytes(duration, noise=0.05)
+            start = time.perf_counter()
+            try:
+                self.transcribe(
+                    audio,
+                    None,
+                    None,
+                    0,
+                    None,
+                    response_format,
+                    content_type="audio/wav",
+                )
+            except Exception as e:
+                logger.warning(f"Warmup request failed, {e}")
+                timing["error"] = str(e)
+            timing["seconds"] = round(time.perf_counter() - start, 3)
+            timings.append(timing)
+
+        self._warmup_timings = timings
+        self._warm = True
+        logger.info(
+            f"Warmed up in {sum(t['seconds'] for t in timings):.2f}s, {timings}"
+        )
+
+    def is_warm(self) -> bool:
+        return self._warm
+
+    def warmup_timings(self) -> List[Dict]:
+        return self._warmup_timings
+
+    def _warmup_inputs(self) -> List[Tuple[float, str]]:
+        return WARMUP_TRANSCRIPTION_INPUTS
+
+    def supports_streaming(self) -> bool:
+        return False
+
+    def create_stream(self, **kwargs):
+        """Per-connection state of streaming recognition, None if the
+        backend doesn't support it."""
+        return None
@@ -1,11 +1,11 @@
 import json
 import logging
 import os
-from typing import Dict, List, Optional
-import tempfile
+from typing import BinaryIO, Dict, List, Optional, Union
+import numpy as np
 from vox_box.backends.stt.base import STTBackend
 from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
-from vox_box.utils.audio import convert
+from vox_box.utils.audio import audio_file_path, convert
 from vox_box.utils.log import log_method
 from vox_box.utils.model import create_model_dict
 
@@ -60,7 +60,8 @@ class FunASR(STTBackend):
             backend_framework=BackendEnum.FUN_ASR,
             languages=self._languages,
         )
-        self._model_load = True
+        self.model_load = True
+        self.warmup()
         return self
 
     def is_load(self) -> bool:
@@ -72,7 +73,7 @@ class FunASR(STTBackend):
     @log_method
     def transcribe(
         self,
-        audio: bytes,
+        audio: Union[bytes, BinaryIO],
         language: Optional[str] = None,
         prompt: Optional[str] = None,
         temperature: Optional[float] = 0.2,
@@ -97,13 +98,13 @@ class FunASR(STTBackend):
                 "Params `prompt` and `temperature` are only supported for FunASR llm asr model, will ignore them if model isn't supported"
             )
 
-        with tempfile.NamedTemporaryFile(buffering=0, delete=False) as f:
-            f.write(audio)
-            input_file = f.name
-
+        # Uploads spooled to disk are read in place.
+        audio_file, is_temp = audio_file_path(audio)
+        input_file = audio_file
+        try:
             content_type = kwargs.get("content_type")
             if content_type is not None and "webm" in content_type:
-                input_file = convert(input_file, "wav", 1, "webm")
+                input_file = convert(audio_file, "wav", 1, "webm")
 
             res = self._model.generate(
                 input=input_file,
@@ -117,8 +118,119 @@ class FunASR(STTBackend):
 
             text = rich_transcription_postprocess(res[0]["text"])
             return text
+        finally:
+            if is_temp:
+                os.remove(audio_file)
+            if input_file != audio_file:
+                os.remove(input_file)
+
+    def supports_streaming(self) -> bool:
+        # Online models such as paraformer-zh-streaming load as ParaformerStreaming.
+        return (
+            self._model is not None and "Streaming" in type(self._model.model).__name__
+        )
+
+    def create_stream(self, **kwargs) -> "FunASRStream":
+        if not self.supports_streaming():
+            return super().create_stream(**kwargs)
+
+        return FunASRStream(self._model, **kwargs)
 
     def _get_languages(self) -> List[Dict]:
         return [
             {"auto": "auto"},
         ]
+
+
+class FunASRStream:
+    """Per-connection state of a FunASR online model.
+
+    Only the model cache and the samples not decoded yet are kept, so many
+    sessions can share the loaded model. Audio is 16 kHz mono 16-bit PCM and
+    is decoded in chunks of `chunk_size[1] * 60ms`.
+    """
+
+    def __init__(
+        self,
+        model,
+        chunk_size: List[int] = [0, 10, 5],
+        encoder_chunk_look_back: int = 4,
+        decoder_chunk_look_back: int = 1,
+    ):
+        self._model = model
+        self._chunk_size = chunk_size
+        self._encoder_chunk_look_back = encoder_chunk_look_back
+        self._decoder_chunk_look_back = decoder_chunk_look_back
+        self._chunk_stride = chunk_size[1] * 960
+        self._reset()
+
+    def feed(self, pcm: bytes):
+        # A sample may be split across frames, keep its first byte.
+        pcm = self._odd_byte + pcm
+        size = len(pcm) - len(pcm) % 2
+        self._odd_byte = pcm[size:]
+        samples = np.frombuffer(pcm[:size], dtype=np.int16).astype(np.float32) / 2**15
+        self._pending.append(samples)
+        self._pending_samples += len(samples)
+
+    def ready(self) -> bool:
+        return self._pending_samples >= self._chunk_stride
+
+    def decode(self) -> str:
+        """Decode all complete chunks and return the partial hypothesis."""
+        audio = self._take_pending()
+        offset = 0
+        while len(audio) - offset >= self._chunk_stride:
+            chunk = audio[offset : offset + self._chunk_stride]
+            self._text += self._generate(chunk, is_final=False)
+            offset += self._chunk_stride
+
+        rest = audio[offset:]
+        if len(rest) > 0:
+            self._pending.append(rest)
+            self._pending_samples = len(rest)
+        return self._text
+
+    def finish(self) -> str:
+        """Flush the remaining samples and return the final hypothesis.
+
+        The stream is reset afterwards and can be used for the next utterance.
+        """
+        audio = self._take_pending()
+        if len(audio) == 0:
+            audio = np.zeros(960, dtype=np.float32)
+
+        text = self._text + self._generate(audio, is_final=True)
+        self._reset()
+        return text
+
+    def _generate(self, chunk: np.ndarray, is_final: bool) -> str:
+        res = self._model.generate(
+            input=chunk,
+            cache=self._cache,
+            is_final=is_final,
+            chunk_size=self._chunk_size,
+            encoder_chunk_look_back=self._encoder_chunk_look_back,
+            decoder_chunk_look_back=self._decoder_chunk_look_back,
+            disable_pbar=True,
+        )
+        if not res:
+            return ""
+        return res[0].get("text", "")
+
+    def _take_pending(self) -> np.ndarray:
+        audio = (
+            np.concatenate(self._pending)
+            if self._pending
+            else np.zeros(0, dtype=np.float32)
+        )
+        self._pending = []
+        self._pending_samples = 0
+        return audio
+
+    def _reset(self):
+        self._cache = {}
+        self._text = ""
+        self._pending: List[np.ndarray] = []
+        self._pending_samples = 0
+        self._odd_byte = b""
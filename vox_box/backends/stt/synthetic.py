@@ -0,0 +1,70 @@
+import time
+from typing import BinaryIO, Dict, List, Optional, Union
+
+from vox_box.backends.stt.base import STTBackend
+from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
+from vox_box.utils.audio import as_audio_file, get_audio_duration
+from vox_box.utils.log import log_method
+from vox_box.utils.model import create_model_dict
+
+
+class SyntheticSTT(STTBackend):
+    """Deterministic STT backend without model weights, used for benchmarking.
+
+    Decodes the container to find the audio duration, sleeps `synthetic_rtf`
+    times that duration to simulate inference and returns a fixed text.
+    """
+
+    def __init__(
+        self,
+        cfg: Config,
+    ):
+        self.model_load = False
+        self._cfg = cfg
+        self._model_dict = {}
+
+    def load(self):
+        if self.model_load:
+            return self
+
+        self._model_dict = create_model_dict(
+            "synthetic-stt",
+            task_type=TaskTypeEnum.STT,
+            backend_framework=BackendEnum.SYNTHETIC,
+            languages=[{"auto": "auto"}],
+        )
+        self.model_load = True
+        self.warmup()
+        return self
+
+    def is_load(self) -> bool:
+        return self.model_load
+
+    def model_info(self) -> Dict:
+        return self._model_dict
+
+    @log_method
+    def transcribe(
+        self,
+        audio: Union[bytes, BinaryIO],
+        language: Optional[str] = None,
+        prompt: Optional[str] = None,
+        temperature: Optional[float] = 0.2,
+        timestamp_granularities: Optional[List[str]] = None,
+        response_format: str = "json",
+        **kwargs,
+    ):
+        duration = get_audio_duration(as_audio_file(audio)) or 0.0
+        time.sleep(duration * self._cfg.synthetic_rtf)
+
+        text = f"Synthetic transcription of {duration:.2f} seconds of audio."
+        if response_format != "verbose_json":
+            return text
+
+        return {
+            "task": "transcribe",
+            "language": "en",
+            "duration": duration,
+            "text": text,
+            "segments": [{"id": 0, "start": 0.0, "end": duration, "text": text}],
+        }
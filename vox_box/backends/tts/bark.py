@@ -1,16 +1,24 @@
 import json
+import logging
 import os
 import tempfile
 from typing import Dict, List, Optional
 
+import numpy as np
+
 from vox_box.backends.tts.base import TTSBackend
 from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
 from transformers import AutoProcessor, BarkModel
 from scipy.io.wavfile import write as write_wav
 
 from vox_box.utils.audio import convert
+from vox_box.utils.batching import BatchScheduler
 from vox_box.utils.log import log_method
 from vox_box.utils.model import create_model_dict
+from vox_box.utils.resources import get_resource_manager
+from vox_box.utils.precision import precision_context, quantize_linear
+
+logger = logging.getLogger(__name__)
 
 
 class Bark(TTSBackend):
@@ -23,6 +31,8 @@ class Bark(TTSBackend):
         self._voices = None
         self._model = None
         self._model_dict = {}
+        self._voice_presets = {}
+        self._scheduler = None
 
         self._config_json = None
         self._speaker_json = None
@@ -42,8 +52,29 @@ class Bark(TTSBackend):
 
         self._processor = AutoProcessor.from_pretrained(self._cfg.model)
         self._model = BarkModel.from_pretrained(self._cfg.model).to(self._cfg.device)
-        self._model = self._model.to_bettertransformer().to(self._cfg.device)
+        if self._cfg.precision == "int8":
+            # The BetterTransformer attention layers use the Linear weights
+            # directly, they can't be combined with quantized layers.
+            self._model = quantize_linear(self._model, "Bark")
+        else:
+            self._model = self._model.to_bettertransformer().to(self._cfg.device)
         self._voices = self._get_voices()
+        self._voice_presets = self._preload_voice_presets()
+
+        if self._cfg.tts_max_batch_size > 1:
+            # Concurrent requests of the same voice are generated as one
+            # padded batch.
+            self._scheduler = BatchScheduler(
+                self._generate_batch,
+                max_batch_size=self._cfg.tts_max_batch_size,
+                max_wait=self._cfg.tts_batch_max_wait_ms / 1000,
+                name="bark-batch",
+            )
+            manager = get_resource_manager()
+            if manager is not None:
+                # Requests hold an executor thread while waiting for their
+                # batch, a bounded executor must fit a full batch.
+                manager.reserve_threads(self._cfg.tts_max_batch_size)
 
         self._model_dict = create_model_dict(
             self._cfg.model,
@@ -52,6 +83,7 @@ class Bark(TTSBackend):
             voices=self._voices,
         )
         self.model_load = True
+        self.warmup()
         return self
 
     def is_load(self) -> bool:
@@ -72,12 +104,80 @@ class Bark(TTSBackend):
         if voice not in self._voices:
             raise ValueError(f"Voice {voice} not supported")
 
-        inputs = self._processor(input, voice_preset=voice)
-        inputs["history_prompt"] = inputs["history_prompt"].to(self._cfg.device)
-        inputs.to(self._cfg.device)
+        if self._scheduler is not None:
+            audio_array = self._scheduler.run(voice, input)
+        else:
+            audio_array = self._generate_batch(voice, [input])[0]
+        return self._write_output(audio_array, reponse_format, speed)
+
+    @log_method
+    def speech_batch(
+        self,
+        inputs: List[str],
+        voice: Optional[str] = "v2/en_speaker_6",
+        speed: float = 1,
+        reponse_format: str = "mp3",
+        **kwargs,
+    ) -> List[str]:
+        if voice not in self._voices:
+            raise ValueError(f"Voice {voice} not supported")
 
-        audio_array = self._model.generate(**inputs)
-        audio_array = audio_array.cpu().numpy().squeeze()
+        # With the scheduler, the items may share their batches with
+        # concurrent requests of the same voice.
+        if self._scheduler is not None:
+            audio_arrays = self._scheduler.map(voice, inputs)
+        else:
+            audio_arrays = self._generate_batch(voice, inputs)
+
+        return [
+            self._write_output(audio_array, reponse_format, speed)
+            for audio_array in audio_arrays
+        ]
+
+    def _generate_batch(self, voice: str, inputs: List[str]) -> List[np.ndarray]:
+        batch_inputs = self._processor(inputs)
+        batch_inputs.to(self._cfg.device)
+
+        # The padded batch shares one length, use the per item output lengths
+        # to cut the trailing padding of shorter items.
+        with precision_context(self._cfg.precision, self._cfg.device):
+            audio_arrays, output_lengths = self._model.generate(
+                **batch_inputs,
+                history_prompt=self._get_voice_preset(voice),
+                return_output_lengths=True,
+            )
+        audio_arrays = audio_arrays.float().cpu().numpy()
+        output_lengths = output_lengths.cpu().tolist()
+
+        return [audio_arrays[i][: output_lengths[i]] for i in range(len(inputs))]
+
+    def _preload_voice_presets(self) -> Dict:
+        """Load every voice preset once and keep it on the device.
+
+        The processor otherwise reads the preset .npz files from disk and the
+        request has to move them to the device on every call.
+        """
+        presets = {}
+        for voice in self._voices:
+            try:
+                presets[voice] = self._load_voice_preset(voice)
+            except Exception as e:
+                logger.warning(f"Failed to preload voice preset {voice}, {e}")
+
+        logger.info(f"Preloaded {len(presets)} voice presets")
+        return presets
+
+    def _get_voice_preset(self, voice: str):
+        preset = self._voice_presets.get(voice)
+        if preset is None:
+            preset = self._load_voice_preset(voice)
+        return preset
+
+    def _load_voice_preset(self, voice: str):
+        history_prompt = self._processor("", voice_preset=voice)["history_prompt"]
+        return history_prompt.to(self._cfg.device)
+
+    def _write_output(self, audio_array, reponse_format: str, speed: float) -> str:
         sample_rate = self._model.generation_config.sample_rate
 
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
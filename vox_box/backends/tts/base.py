@@ -1,13 +1,30 @@
 from abc import ABC, abstractmethod
 import logging
-from typing import Dict, Optional
+import os
+import time
+from typing import Dict, List, Optional, Tuple
 from vox_box.config.config import Config
 from vox_box.utils.log import log_method
 
 logger = logging.getLogger(__name__)
 
+# (input, response format) pairs of increasing length, so that the encoders
+# and the shapes seen by the model on real traffic are initialized.
+WARMUP_SPEECH_INPUTS = [
+    ("Hello.", "wav"),
+    ("This is a short sentence to warm up the model.", "mp3"),
+    (
+        "Warming up the model before serving requests, so that the first "
+        "users don't pay for lazy initialization and memory growth.",
+        "opus",
+    ),
+]
+
 
 class TTSBackend(ABC):
+    _warm: bool = False
+    _warmup_timings: List[Dict] = []
+
     def __init__(
         self,
         cfg: Config,
@@ -33,6 +50,64 @@ class TTSBackend(ABC):
         voice: Optional[str],
         speed: float = 1,
         reponse_format: str = "mp3",
-        **kwargs
+        **kwargs,
     ):
         pass
+
+    def warmup(self):
+        """Run synthetic requests so that lazy initialization, kernel
+        selection and allocator growth happen before real traffic.
+
+        Called at the end of `load`, does nothing but mark the backend warm
+        when warmup is disabled. A failed warmup request is logged and
+        doesn't prevent the backend from serving.
+        """
+        if not self._cfg.warmup:
+            self._warm = True
+            return
+
+        voices = self.model_info().get("voices") or [None]
+        timings = []
+        for input, reponse_format in self._warmup_inputs():
+            timing = {"input_chars": len(input), "response_format": reponse_format}
+            start = time.perf_counter()
+            try:
+                os.remove(self.speech(input, voices[0], 1, reponse_format))
+            except Exception as e:
+                logger.warning(f"Warmup request failed, {e}")
+                timing["error"] = str(e)
+            timing["seconds"] = round(time.perf_counter() - start, 3)
+            timings.append(timing)
+
+        self._warmup_timings = timings
+        self._warm = True
+        logger.info(
+            f"Warmed up in {sum(t['seconds'] for t in timings):.2f}s, {timings}"
+        )
+
+    def is_warm(self) -> bool:
+        return self._warm
+
+    def warmup_timings(self) -> List[Dict]:
+        return self._warmup_timings
+
+    def _warmup_inputs(self) -> List[Tuple[str, str]]:
+        return WARMUP_SPEECH_INPUTS
+
+    def speech_batch(
+        self,
+        inputs: List[str],
+        voice: Optional[str],
+        speed: float = 1,
+        reponse_format: str = "mp3",
+        **kwargs,
+    ) -> List[str]:
+        """Synthesize several inputs sharing the same voice, speed and format.
+
+        Backends able to generate a padded batch in one call should override
+        this, the default implementation synthesizes the inputs one by one.
+        """
+        return [
+            self.speech(input, voice, speed, reponse_format, **kwargs)
+            for input in inputs
+        ]
@@ -8,10 +8,17 @@ import torch
 from typing import Dict, List, Optional
 
 from vox_box.backends.tts.base import TTSBackend
+from vox_box.utils.jit import export_torchscript, jit_cache_dir
 from vox_box.utils.log import log_method
 from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
 from vox_box.utils.audio import convert
 from vox_box.utils.model import create_model_dict
+from vox_box.utils.scheduling import checkpoint
+from vox_box.utils.precision import (
+    precision_context,
+    quantize_linear,
+    with_precision,
+)
 import logging
 
 from fastapi import FastAPI, Form, File, UploadFile
@@ -52,6 +59,7 @@ class CosyVoice(TTSBackend):
         self._model = None
         self._model_dict = {}
         self._is_cosyvoice_v2 = False
+        self._mode = "eager"
         #add code
         # self._prompt_wav = "/agi/gpustack/xh.mp3"
         # self._prompt_text = "今天天氣真是太好了，陽光燦爛心情超級棒，但是朋友最近的感情問題也讓我心痛不已，好像世界末日一樣，真的好為他難過喔。"
@@ -146,12 +154,21 @@ class CosyVoice(TTSBackend):
 
             self._model = CosyVoiceModel(self._cfg.model)
 
+        self._apply_precision()
+        if self._cfg.jit:
+            self._mode = self._load_jit()
+
         self._voices = self._get_voices()
         self._model_dict = create_model_dict(
             self._cfg.model,
             task_type=TaskTypeEnum.TTS,
             backend_framework=BackendEnum.COSY_VOICE,
             voices=self._voices,
+            runtime={
+                "device": self._cfg.device,
+                "precision": self._cfg.precision,
+                "mode": self._mode,
+            },
         )
         
         # 加载自定义音频
@@ -180,6 +197,7 @@ class CosyVoice(TTSBackend):
             }
         
         self.model_load = True
+        self.warmup()
         return self
 
     def is_load(self) -> bool:
@@ -222,7 +240,10 @@ class CosyVoice(TTSBackend):
                 input, prompt_text, prompt_speech_16k, stream=False, speed=speed
             )
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
+        with tempfile.NamedTemporaryFile(
+            suffix=".wav", delete=True
+        ) as temp_file, precision_context(self._cfg.precision, self._cfg.device):
+            # The model output is a generator, inference runs while iterating.
             wav_file_path = temp_file.name
             with wave.open(wav_file_path, "wb") as wf:
                 wf.setnchannels(1)  # single track
@@ -230,14 +251,64 @@ class CosyVoice(TTSBackend):
                 wf.setframerate(22050)  # Sample rate
                 #wf.setframerate(24000)  # Sample rate
                 for i in model_output:
+                    # One chunk per text segment.
+                    checkpoint()
                     tts_audio = (
-                        (i["tts_speech"].numpy() * (2**15)).astype(np.int16).tobytes()
+                        (i["tts_speech"].float().numpy() * (2**15))
+                        .astype(np.int16)
+                        .tobytes()
                     )
                     wf.writeframes(tts_audio)
 
                 output_file_path = convert(wav_file_path, reponse_format, speed)
                 return output_file_path
 
+    def _apply_precision(self):
+        model = self._model.model
+        if self._cfg.precision == "int8":
+            # The LLM and flow matching decoder hold the Linear layers, the
+            # vocoder is convolutional.
+            model.llm = quantize_linear(model.llm, "CosyVoice llm")
+            model.flow = quantize_linear(model.flow, "CosyVoice flow")
+        elif self._cfg.precision == "bf16":
+            # The LLM runs in its own thread, autocast is thread local.
+            model.llm_job = with_precision(
+                model.llm_job, self._cfg.precision, self._cfg.device
+            )
+
+    def _load_jit(self) -> str:
+        """Export the LLM and flow encoder to TorchScript and run through them.
+
+        The graphs are exported on the first start, like upstream's
+        export_jit.py does, and reused afterwards. CosyVoice2 only supports
+        it for the flow encoder. Falls back to eager mode on failure.
+        """
+        model = self._model.model
+        cache_dir = jit_cache_dir(self._cfg.model, self._cfg.data_dir, self._cfg.device)
+        try:
+            flow_encoder = export_torchscript(
+                model.flow.encoder, os.path.join(cache_dir, "flow.encoder.fp32.zip")
+            )
+            if self._is_cosyvoice_v2:
+                model.load_jit(flow_encoder)
+            else:
+                text_encoder = export_torchscript(
+                    model.llm.text_encoder,
+                    os.path.join(cache_dir, "llm.text_encoder.fp32.zip"),
+                )
+                llm = export_torchscript(
+                    model.llm.llm,
+                    os.path.join(cache_dir, "llm.llm.fp32.zip"),
+                    preserved_attrs=["forward_chunk"],
+                )
+                model.load_jit(text_encoder, llm, flow_encoder)
+        except Exception as e:
+            logger.warning(f"Failed to load TorchScript graphs, running eager, {e}")
+            return "eager"
+
+        logger.info(f"Loaded TorchScript graphs from {cache_dir}")
+        return "torchscript"
+
     def _get_voices(self) -> List[str]:
         voices = self._model.list_available_spks()
         # 默认的音色
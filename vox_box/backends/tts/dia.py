@@ -3,21 +3,33 @@ import logging
 import os
 import time
 import tempfile
+import threading
 import torch
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple, Union
 import soundfile as sf
 from vox_box.third_party.dia.dia.model import Dia as DiaModel
 
 from vox_box.backends.tts.base import TTSBackend
 from vox_box.utils.audio import convert
+from vox_box.utils.batching import BatchScheduler
+from vox_box.utils.compile_cache import CompileCache
 from vox_box.utils.log import log_method
+from vox_box.utils.precision import quantize_linear
 from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
 from vox_box.utils.model import create_model_dict
+from vox_box.utils.resources import get_resource_manager
 
 
 logger = logging.getLogger(__name__)
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass
 class GenerateConfig:
     max_tokens: Optional[int] = (
@@ -26,10 +38,10 @@ class GenerateConfig:
     cfg_scale: float = float(os.getenv("CFG_SCALE", 3.0))
     temperature: float = float(os.getenv("TEMPERATURE", 1.3))
     top_p: float = float(os.getenv("TOP_P", 0.95))
-    use_torch_compile: bool = bool(os.getenv("USE_TORCH_COMPILE", True))
+    use_torch_compile: bool = _env_bool("USE_TORCH_COMPILE", True)
     cfg_filter_top_k: int = int(os.getenv("CFG_FILTER_TOP_K", 35))
     audio_prompt: Optional[str] = os.getenv("AUDIO_PROMPT", None)
-    verbose: bool = bool(os.getenv("VERBOSE", True))
+    verbose: bool = _env_bool("VERBOSE", True)
 
 
 class Dia(TTSBackend):
@@ -41,6 +53,15 @@ class Dia(TTSBackend):
         self._cfg = cfg
         self._model = None
         self._model_dict = {}
+        self._generate_config = GenerateConfig()
+        if cfg.device == "cpu" and os.getenv("USE_TORCH_COMPILE") is None:
+            # The first compilation takes minutes on CPU, opt in with
+            # USE_TORCH_COMPILE=true to pay it once and reuse the cache.
+            self._generate_config.use_torch_compile = False
+        self._compile_cache = None
+        self._compile_cache_saved = False
+        self._compile_cache_lock = threading.Lock()
+        self._scheduler = None
 
     def load(self):
         if self.model_load:
@@ -51,12 +72,22 @@ class Dia(TTSBackend):
             device = torch.device(self._cfg.device)
             if self._cfg.device == "cpu":
                 dtype = "float32"  # for more compatibility
+            # Dia computes in bf16 natively, int8 quantizes its fp32 weights.
+            if self._cfg.precision in ("fp32", "int8"):
+                dtype = "float32"
+            elif self._cfg.precision == "bf16":
+                dtype = "bfloat16"
             self._model = DiaModel.from_pretrained(
                 self._cfg.model, compute_dtype=dtype, device=device
             )
+            if self._cfg.precision == "int8":
+                self._model.model = quantize_linear(self._model.model, "Dia")
+                dtype = "float32-int8"
         except Exception as e:
             raise RuntimeError(f"Error loading Dia model: {e}")
 
+        self._setup_compile_cache(dtype)
+
         self._model_dict = create_model_dict(
             self._cfg.model,
             task_type=TaskTypeEnum.TTS,
@@ -64,9 +95,48 @@ class Dia(TTSBackend):
             voices=["English"],
         )
 
+        if self._cfg.tts_max_batch_size > 1:
+            self._setup_batching()
+
         self.model_load = True
+        self.warmup()
+        if self._cfg.warmup:
+            # Without warmup nothing was compiled yet, the first request
+            # saves the cache instead.
+            self._save_compile_cache()
         return self
 
+    def _setup_compile_cache(self, dtype: str):
+        if not self._generate_config.use_torch_compile or not self._cfg.data_dir:
+            return
+
+        # Compiling on every start is too slow on CPU, reuse the graphs
+        # compiled by previous processes.
+        self._compile_cache = CompileCache(
+            os.path.join(self._cfg.data_dir, "compile_cache"),
+            self._cfg.model,
+            dtype,
+            self._cfg.device,
+        )
+        self._compile_cache.setup()
+        self._compile_cache.load_artifacts()
+        logger.info(f"Using compile cache {self._compile_cache.path}")
+
+    def _setup_batching(self):
+        # Concurrent requests are stacked into one padded batch instead of
+        # running in parallel threads competing for the same cores.
+        self._scheduler = BatchScheduler(
+            self._generate_batch,
+            max_batch_size=self._cfg.tts_max_batch_size,
+            max_wait=self._cfg.tts_batch_max_wait_ms / 1000,
+            name="dia-batch",
+        )
+        manager = get_resource_manager()
+        if manager is not None:
+            # Requests hold an executor thread while waiting for their
+            # batch, a bounded executor must fit a full batch.
+            manager.reserve_threads(self._cfg.tts_max_batch_size)
+
     def is_load(self) -> bool:
         return self.model_load
 
@@ -82,15 +152,65 @@ class Dia(TTSBackend):
         reponse_format: str = "mp3",
         **kwargs,
     ) -> str:
-        sample_rate = 44100
+        start_time = time.time()
+
+        if self._scheduler is not None:
+            output_audio = self._scheduler.run(None, input)
+        else:
+            output_audio = self._generate(input)
 
+        end_time = time.time()
+        logger.info(
+            f"Audio generation completed in {end_time - start_time:.2f} seconds"
+        )
+
+        return self._write_output(output_audio, reponse_format, speed)
+
+    @log_method
+    def speech_batch(
+        self,
+        inputs: List[str],
+        voice: Optional[str] = "English",
+        speed: float = 1,
+        reponse_format: str = "mp3",
+        **kwargs,
+    ) -> List[str]:
         start_time = time.time()
 
-        generate_config = GenerateConfig()
-        if self._cfg.device == "cpu":
-            generate_config.use_torch_compile = False
-        output_audio = self._model.generate(
-            text=input,
+        # Dia decodes a list of texts as one padded batch and stops each item
+        # at its own EOS. With the scheduler, the items may share their
+        # batches with concurrent requests.
+        if self._scheduler is not None:
+            output_audios = self._scheduler.map(None, inputs)
+        else:
+            output_audios = self._generate(inputs)
+
+        end_time = time.time()
+        logger.info(
+            f"Batch audio generation of {len(inputs)} items completed in {end_time - start_time:.2f} seconds"
+        )
+
+        return [
+            self._write_output(output_audio, reponse_format, speed)
+            for output_audio in output_audios
+        ]
+
+    def _warmup_inputs(self) -> List[Tuple[str, str]]:
+        # Dia expects dialogue with speaker tags.
+        return [
+            ("[S1] Hello.", "wav"),
+            ("[S1] This is a short sentence. [S2] To warm up the model.", "mp3"),
+        ]
+
+    def _generate_batch(self, key, texts: List[str]) -> List:
+        if len(texts) == 1:
+            return [self._generate(texts[0])]
+        return self._generate(texts)
+
+    def _generate(self, text: Union[str, List[str]]):
+        generate_config = self._generate_config
+        output = self._model.generate(
+            text=text,
             max_tokens=generate_config.max_tokens,
             cfg_scale=generate_config.cfg_scale,
             temperature=generate_config.temperature,
@@ -101,10 +221,24 @@ class Dia(TTSBackend):
             verbose=generate_config.verbose,
         )
 
-        end_time = time.time()
-        logger.info(
-            f"Audio generation completed in {end_time - start_time:.2f} seconds"
-        )
+        # Without warmup, the graphs are compiled by the first request.
+        if self.is_warm():
+            self._save_compile_cache()
+        return output
+
+    def _save_compile_cache(self):
+        if self._compile_cache is None:
+            return
+
+        # Concurrent requests may complete the warmup together.
+        with self._compile_cache_lock:
+            if self._compile_cache_saved:
+                return
+            self._compile_cache_saved = True
+        self._compile_cache.save_artifacts()
+
+    def _write_output(self, output_audio, reponse_format: str, speed: float) -> str:
+        sample_rate = 44100
 
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
             wav_file_path = temp_file.name
@@ -0,0 +1,180 @@
+import contextvars
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from vox_box.backends.tts.base import TTSBackend
+from vox_box.utils.audio import (
+    convert,
+    read_wav,
+    to_pcm16,
+    wav_stream_header,
+    write_wav,
+)
+from vox_box.utils.profiling import handoff_profile, profile_call
+from vox_box.utils.scheduling import checkpoint
+from vox_box.utils.text import split_sentences
+from vox_box.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentedSpeech:
+    """Text segmentation stage in front of `TTSBackend.speech`.
+
+    Long inputs are split at sentence and clause boundaries, the segments are
+    synthesized in parallel on a dedicated pool, and the audio is yielded in
+    order as soon as each segment is ready, with a short crossfade over the
+    joins. Works with any backend since segments go through `speech` as wav.
+
+    A request keeps at most `workers` segments in flight and passes a
+    scheduler checkpoint between segments, so a long input can be preempted.
+    """
+
+    def __init__(
+        self,
+        backend: TTSBackend,
+        max_chars: int = 250,
+        workers: int = 2,
+        crossfade_ms: int = 20,
+    ):
+        self._backend = backend
+        self._max_chars = max_chars
+        self._crossfade_ms = crossfade_ms
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="tts-segment"
+        )
+
+    def split(self, input: str) -> List[str]:
+        return split_sentences(input, max_chars=self._max_chars)
+
+    def should_split(self, input: str) -> bool:
+        return len(input) > self._max_chars
+
+    def stream(
+        self,
+        input: str,
+        voice: Optional[str],
+        speed: float = 1,
+        **kwargs,
+    ) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield (float32 mono audio, sample rate) chunks in input order."""
+        segments = self.split(input)
+        logger.debug(f"Synthesizing {len(segments)} segments")
+
+        # Each segment runs in a copy of the caller's context, so its spans are
+        # recorded in the request trace.
+        def submit(segment: str):
+            return self._executor.submit(
+                contextvars.copy_context().run,
+                self._synthesize,
+                segment,
+                voice,
+                speed,
+                **kwargs,
+            )
+
+        remaining = deque(segments)
+        futures = deque()
+        while remaining and len(futures) < self._workers:
+            futures.append(submit(remaining.popleft()))
+
+        pending = None
+        try:
+            while futures:
+                # The segments run in the segment workers, let them be profiled.
+                handoff_profile()
+                audio, sample_rate = futures.popleft().result()
+                checkpoint()
+                if remaining:
+                    futures.append(submit(remaining.popleft()))
+
+                fade = int(sample_rate * self._crossfade_ms / 1000)
+                if pending is not None:
+                    audio = crossfade(pending, audio)
+
+                # Hold back the tail so it can be blended with the next segment.
+                if fade > 0 and len(audio) > fade:
+                    pending = audio[-fade:]
+                    audio = audio[:-fade]
+                else:
+                    pending = None
+
+                if len(audio) > 0:
+                    yield audio, sample_rate
+
+            if pending is not None:
+                yield pending, sample_rate
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _synthesize(
+        self, segment: str, voice: Optional[str], speed: float, **kwargs
+    ) -> Tuple[np.ndarray, int]:
+        with span("segment", chars=len(segment)):
+            return profile_call(
+                lambda: synthesize_segment(
+                    self._backend, segment, voice, speed, **kwargs
+                )
+            )
+
+
+def synthesize_segment(
+    backend: TTSBackend,
+    segment: str,
+    voice: Optional[str],
+    speed: float = 1,
+    **kwargs,
+) -> Tuple[np.ndarray, int]:
+    """Synthesize one segment and return it as (float32 mono audio, sample rate)."""
+    wav_file_path = backend.speech(segment, voice, speed, "wav", **kwargs)
+    try:
+        return read_wav(wav_file_path)
+    finally:
+        os.remove(wav_file_path)
+
+
+def crossfade(tail: np.ndarray, audio: np.ndarray) -> np.ndarray:
+    """Blend `tail` into the start of `audio` with a linear crossfade."""
+    n = min(len(tail), len(audio))
+    if n == 0:
+        return np.concatenate([tail, audio])
+
+    ramp = np.linspace(0, 1, n, dtype=np.float32)
+    blended = tail[len(tail) - n :] * (1 - ramp) + audio[:n] * ramp
+    return np.concatenate([tail[: len(tail) - n], blended, audio[n:]])
+
+
+def to_pcm_stream(
+    chunks: Iterator[Tuple[np.ndarray, int]], wav_header: bool = False
+) -> Iterator[bytes]:
+    """Encode audio chunks as 16-bit PCM, optionally preceded by a wav header."""
+    for audio, sample_rate in chunks:
+        if wav_header:
+            yield wav_stream_header(sample_rate)
+            wav_header = False
+        yield to_pcm16(audio)
+
+
+def to_output_file(
+    chunks: Iterator[Tuple[np.ndarray, int]], reponse_format: str = "mp3"
+) -> str:
+    """Join all audio chunks and convert them to the response format."""
+    audios = []
+    sample_rate = None
+    for audio, sample_rate in chunks:
+        audios.append(audio)
+    if not audios:
+        raise ValueError("No audio was synthesized for the input")
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
+        wav_file_path = temp_file.name
+        write_wav(wav_file_path, np.concatenate(audios), sample_rate)
+        return convert(wav_file_path, reponse_format)
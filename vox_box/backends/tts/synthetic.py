@@ -0,0 +1,72 @@
+import tempfile
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from vox_box.backends.tts.base import TTSBackend
+from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
+from vox_box.utils.audio import convert, write_wav
+from vox_box.utils.log import log_method
+from vox_box.utils.model import create_model_dict
+
+
+class SyntheticTTS(TTSBackend):
+    """Deterministic TTS backend without model weights, used for benchmarking.
+
+    Produces a sine tone of `seconds_per_char` per input character and sleeps
+    `synthetic_rtf` times the audio duration to simulate inference, so that the
+    server, scheduling and encoding overhead can be measured on any machine.
+    """
+
+    sample_rate = 22050
+    seconds_per_char = 0.06
+
+    def __init__(
+        self,
+        cfg: Config,
+    ):
+        self.model_load = False
+        self._cfg = cfg
+        self._model_dict = {}
+
+    def load(self):
+        if self.model_load:
+            return self
+
+        self._model_dict = create_model_dict(
+            "synthetic-tts",
+            task_type=TaskTypeEnum.TTS,
+            backend_framework=BackendEnum.SYNTHETIC,
+            voices=["synthetic"],
+        )
+        self.model_load = True
+        self.warmup()
+        return self
+
+    def is_load(self) -> bool:
+        return self.model_load
+
+    def model_info(self) -> Dict:
+        return self._model_dict
+
+    @log_method
+    def speech(
+        self,
+        input: str,
+        voice: Optional[str] = "synthetic",
+        speed: float = 1,
+        reponse_format: str = "mp3",
+        **kwargs,
+    ) -> str:
+        duration = max(0.5, len(input) * self.seconds_per_char)
+        time.sleep(duration * self._cfg.synthetic_rtf)
+
+        t = np.arange(int(duration * self.sample_rate), dtype=np.float32)
+        audio = 0.5 * np.sin(2 * np.pi * 440 * t / self.sample_rate)
+
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
+            wav_file_path = temp_file.name
+            write_wav(wav_file_path, audio, self.sample_rate)
+            output_file_path = convert(wav_file_path, reponse_format, speed)
+            return output_file_path
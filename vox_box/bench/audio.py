@@ -0,0 +1,209 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import av
+
+from vox_box.utils.audio import (
+    convert_to_format,
+    convert_to_pcm,
+    generate_wav_bytes,
+    output_format_to_encoder_decoder_map,
+    output_format_to_suffix_map,
+)
+from vox_box.utils.memory import get_rss
+
+DEFAULT_DURATIONS = [1.0, 10.0, 60.0]
+DEFAULT_SPEEDS = [1.0, 1.5]
+SIGNALS = ["sine", "noise"]
+
+
+@dataclass
+class ConvertCase:
+    output_format: str
+    duration: float
+    speed: float
+    signal: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.output_format}/{self.duration:g}s/x{self.speed:g}/{self.signal}"
+
+
+def build_cases(
+    formats: Optional[List[str]] = None,
+    durations: Optional[List[float]] = None,
+    speeds: Optional[List[float]] = None,
+    signals: Optional[List[str]] = None,
+) -> List[ConvertCase]:
+    formats = formats or list(output_format_to_encoder_decoder_map.keys())
+    durations = durations or DEFAULT_DURATIONS
+    speeds = speeds or DEFAULT_SPEEDS
+    signals = signals or SIGNALS
+    return [
+        ConvertCase(output_format, duration, speed, signal)
+        for output_format in formats
+        for duration in durations
+        for speed in speeds
+        for signal in signals
+    ]
+
+
+def convert_file(input_file_path: str, output_format: str, speed: float) -> str:
+    """Convert a wav file with `convert_to_pcm` or `convert_to_format`.
+
+    Unlike `convert`, the wav to wav case is encoded rather than copied, so
+    that every case measures the codec.
+    """
+    suffix = output_format_to_suffix_map.get(output_format)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        output_file_path = f.name
+
+    with av.open(input_file_path) as input_container:
+        input_stream = input_container.streams.audio[0]
+        if output_format == "pcm":
+            convert_to_pcm(input_stream, output_file_path, speed)
+        else:
+            convert_to_format(input_stream, output_file_path, output_format, speed)
+    return output_file_path
+
+
+class RSSSampler:
+    """Sample the resident set size in a thread to find its peak while a
+    block runs, including buffers allocated inside libav."""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.start_rss = 0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "RSSSampler":
+        self.start_rss = self.peak_rss = get_rss() or 0
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._update()
+
+    @property
+    def peak_increase(self) -> int:
+        return self.peak_rss - self.start_rss
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self):
+        self.peak_rss = max(self.peak_rss, get_rss() or 0)
+
+
+def run_case(case: ConvertCase, repeat: int = 5, sample_rate: int = 24000) -> Dict:
+    """Time `convert_file` on a generated wav and measure its peak memory.
+
+    Timing runs and the memory runs are separate since tracemalloc slows the
+    conversion down. The tracemalloc peak only covers Python objects and
+    numpy buffers, the RSS peak increase also covers libav internal buffers
+    but is coarser, as it's sampled and includes memory reused from earlier
+    runs.
+    """
+    if case.signal not in SIGNALS:
+        raise Exception(f"Unknown signal {case.signal}, expected one of {SIGNALS}")
+
+    noise = 0.3 if case.signal == "noise" else 0.0
+    wav = generate_wav_bytes(case.duration, sample_rate=sample_rate, noise=noise)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        f.write(wav)
+        input_file_path = f.name
+
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output_file_path = convert_file(
+                input_file_path, case.output_format, case.speed
+            )
+            times.append(time.perf_counter() - start)
+            os.remove(output_file_path)
+
+        with RSSSampler() as rss:
+            output_file_path = convert_file(
+                input_file_path, case.output_format, case.speed
+            )
+        os.remove(output_file_path)
+
+        tracemalloc.start()
+        try:
+            output_file_path = convert_file(
+                input_file_path, case.output_format, case.speed
+            )
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        output_size = os.path.getsize(output_file_path)
+        os.remove(output_file_path)
+    finally:
+        os.remove(input_file_path)
+
+    seconds = statistics.median(times)
+    return {
+        "key": case.key,
+        "output_format": case.output_format,
+        "duration": case.duration,
+        "speed": case.speed,
+        "signal": case.signal,
+        "seconds": seconds,
+        "seconds_min": min(times),
+        "realtime_factor": seconds / case.duration,
+        "peak_memory": peak_memory,
+        "peak_rss_increase": rss.peak_increase,
+        "peak_rss": rss.peak_rss,
+        "output_size": output_size,
+    }
+
+
+def compare(
+    results: List[Dict],
+    baseline: Dict,
+    threshold: float = 0.2,
+    memory_threshold: float = 0.2,
+    min_time_delta: float = 0.002,
+) -> List[str]:
+    """Return the regressions of `results` against a baseline.
+
+    A case regresses when its median time or peak memory exceeds the baseline
+    by more than the relative threshold. Time differences below
+    `min_time_delta` seconds are timer noise on the fastest cases and are
+    ignored, as are cases absent from the baseline.
+    """
+    baseline_results = {r["key"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = baseline_results.get(result["key"])
+        if base is None:
+            continue
+
+        if (
+            result["seconds"] > base["seconds"] * (1 + threshold)
+            and result["seconds"] - base["seconds"] > min_time_delta
+        ):
+            regressions.append(
+                f"{result['key']}: time {result['seconds'] * 1000:.1f}ms, "
+                f"baseline {base['seconds'] * 1000:.1f}ms +{threshold:.0%}"
+            )
+        if result["peak_memory"] > base["peak_memory"] * (1 + memory_threshold):
+            regressions.append(
+                f"{result['key']}: peak memory {result['peak_memory']}B, "
+                f"baseline {base['peak_memory']}B +{memory_threshold:.0%}"
+            )
+
+    return regressions
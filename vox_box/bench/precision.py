@@ -0,0 +1,242 @@
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vox_box.utils.audio import read_wav
+from vox_box.utils.memory import get_peak_rss, get_rss, get_torch_memory
+
+DEFAULT_TEXTS = [
+    "Hello, how are you today?",
+    "The quick brown fox jumps over the lazy dog, while the band plays on.",
+    "Please call Stella. Ask her to bring these things with her from the store.",
+]
+
+REFERENCE_PRECISION = "fp32"
+
+# Long-term average spectrum bands, in Hz.
+_LTAS_BANDS = np.geomspace(50, 8000, 33)
+
+
+def run_precision(
+    cfg_kwargs: Dict,
+    precision: str,
+    texts: List[str],
+    voice: Optional[str] = None,
+    repeat: int = 3,
+    seed: int = 0,
+) -> Dict:
+    """Load the backend with `precision` and time speech for every text.
+
+    A `+jit` suffix, e.g. `fp32+jit`, runs the backend through its exported
+    TorchScript graphs. Meant to run in a fresh process, so that the resident memory only
+    covers one model and the torch allocator and quantized kernels of other
+    precisions don't interfere.
+    """
+    from vox_box.config.config import Config
+    from vox_box.server.model import ModelInstance
+
+    cfg = Config()
+    for name, value in cfg_kwargs.items():
+        setattr(cfg, name, value)
+    cfg.precision, _, mode = precision.partition("+")
+    cfg.jit = mode == "jit"
+    # Measure the model alone, the first untimed call per text warms it up.
+    cfg.warmup = False
+    cfg.tts_max_batch_size = 1
+
+    rss_before = get_rss()
+    start = time.perf_counter()
+    backend = ModelInstance(cfg).run()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = get_rss()
+
+    voice = voice or backend.model_info().get("voices", [None])[0]
+    _seed(seed)
+    backend.speech(texts[0], voice, 1, "wav")
+
+    cases = []
+    for text in texts:
+        times = []
+        audio, sample_rate = None, None
+        for i in range(repeat):
+            _seed(seed + i)
+            start = time.perf_counter()
+            output_file_path = backend.speech(text, voice, 1, "wav")
+            times.append(time.perf_counter() - start)
+            # Keep the first output, generated with the same seed for every
+            # precision.
+            if audio is None:
+                audio, sample_rate = read_wav(output_file_path)
+            os.remove(output_file_path)
+
+        cases.append(
+            {
+                "text": text,
+                "seconds": statistics.median(times),
+                "audio": audio,
+                "sample_rate": sample_rate,
+            }
+        )
+
+    torch_memory = get_torch_memory()
+    return {
+        "precision": precision,
+        "load_seconds": load_seconds,
+        "load_memory": (
+            rss_loaded - rss_before
+            if rss_loaded is not None and rss_before is not None
+            else None
+        ),
+        "peak_memory": torch_memory.get("peak_allocated", get_peak_rss()),
+        "cases": cases,
+    }
+
+
+def measure(
+    cfg_kwargs: Dict,
+    precisions: List[str],
+    texts: List[str],
+    voice: Optional[str] = None,
+    repeat: int = 3,
+    seed: int = 0,
+) -> Dict[str, Dict]:
+    """Run every precision in its own spawned process, one after the other."""
+    results = {}
+    for precision in precisions:
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results[precision] = executor.submit(
+                run_precision, cfg_kwargs, precision, texts, voice, repeat, seed
+            ).result()
+    return results
+
+
+def compare_audio(reference: np.ndarray, audio: np.ndarray, sample_rate: int) -> Dict:
+    """Compare an output to the fp32 output of the same text.
+
+    The TTS models sample their output, a lower precision changes the logits
+    slightly and with them the sampled tokens, so the waveforms can't be
+    compared sample by sample even with the same seed. The duration ratio
+    and the distance between the long-term average spectra catch broken
+    outputs, like silence, noise or runaway generation, rather than small
+    differences.
+    """
+    finite = bool(np.isfinite(audio).all())
+    silent = len(audio) == 0 or float(np.sqrt(np.mean(audio**2))) < 1e-4
+    duration_ratio = len(audio) / len(reference) if len(reference) else None
+    return {
+        "valid": finite and not silent,
+        "duration_ratio": duration_ratio,
+        "spectral_distance": (
+            _ltas_distance(reference, audio, sample_rate) if finite else None
+        ),
+    }
+
+
+def summarize(results: Dict[str, Dict]) -> List[Dict]:
+    """One row per precision, compared to the fp32 reference."""
+    reference = results[REFERENCE_PRECISION]
+    reference_seconds = sum(case["seconds"] for case in reference["cases"])
+
+    rows = []
+    for precision, result in results.items():
+        comparisons = [
+            compare_audio(ref["audio"], case["audio"], case["sample_rate"])
+            for ref, case in zip(reference["cases"], result["cases"])
+        ]
+        seconds = sum(case["seconds"] for case in result["cases"])
+        rows.append(
+            {
+                "precision": precision,
+                "seconds": seconds,
+                "speedup": reference_seconds / seconds if seconds else None,
+                "load_memory": result["load_memory"],
+                "peak_memory": result["peak_memory"],
+                "memory_reduction": _reduction(
+                    reference["peak_memory"], result["peak_memory"]
+                ),
+                "valid": all(c["valid"] for c in comparisons),
+                "duration_ratio_max": max(
+                    (
+                        abs(np.log(c["duration_ratio"]))
+                        for c in comparisons
+                        if c["duration_ratio"]
+                    ),
+                    default=0.0,
+                ),
+                "spectral_distance_max": max(
+                    (
+                        c["spectral_distance"]
+                        for c in comparisons
+                        if c["spectral_distance"] is not None
+                    ),
+                    default=None,
+                ),
+            }
+        )
+    return rows
+
+
+def check(
+    rows: List[Dict],
+    max_spectral_distance: float = 6.0,
+    max_duration_ratio: float = 1.5,
+) -> List[str]:
+    """Return the accuracy failures of the precisions against fp32."""
+    failures = []
+    for row in rows:
+        precision = row["precision"]
+        if not row["valid"]:
+            failures.append(f"{precision}: non-finite or silent output")
+        if row["duration_ratio_max"] > np.log(max_duration_ratio):
+            failures.append(
+                f"{precision}: duration differs by more than x{max_duration_ratio:g} from {REFERENCE_PRECISION}"
+            )
+        distance = row["spectral_distance_max"]
+        if distance is not None and distance > max_spectral_distance:
+            failures.append(
+                f"{precision}: spectral distance {distance:.2f} dB over {max_spectral_distance:g} dB"
+            )
+    return failures
+
+
+def _ltas_distance(reference: np.ndarray, audio: np.ndarray, sample_rate: int) -> float:
+    """RMS difference in dB between the long-term average spectra."""
+
+    def ltas(x: np.ndarray) -> np.ndarray:
+        spectrum = np.abs(np.fft.rfft(x)) ** 2
+        freqs = np.fft.rfftfreq(len(x), 1 / sample_rate)
+        masks = [
+            (freqs >= lo) & (freqs < hi)
+            for lo, hi in zip(_LTAS_BANDS[:-1], _LTAS_BANDS[1:])
+            if hi <= sample_rate / 2
+        ]
+        bands = [spectrum[mask].mean() if mask.any() else 0.0 for mask in masks]
+        power = np.asarray(bands) / max(np.sum(bands), 1e-12)
+        return 10 * np.log10(power + 1e-12)
+
+    if len(reference) == 0 or len(audio) == 0:
+        return float("inf")
+    return float(np.sqrt(np.mean((ltas(reference) - ltas(audio)) ** 2)))
+
+
+def _reduction(reference: Optional[int], value: Optional[int]) -> Optional[float]:
+    if not reference or value is None:
+        return None
+    return 1 - value / reference
+
+
+def _seed(seed: int):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.manual_seed(seed)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from vox_box.bench.runner import BenchCase, HTTPTarget
+from vox_box.bench.stats import Sample, summarize
+from vox_box.config.config import TaskTypeEnum
+from vox_box.utils.audio import generate_wav_bytes
+
+logger = logging.getLogger(__name__)
+
+REPLAYABLE_PATHS = {
+    "/v1/audio/speech": TaskTypeEnum.TTS,
+    "/v1/audio/transcriptions": TaskTypeEnum.STT,
+}
+
+FILLER_TEXT = (
+    "The quick brown fox jumps over the lazy dog, and then it runs back home. "
+)
+
+
+def load_trace(path: str) -> List[Dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def record_to_case(record: Dict, trace_dir: str) -> Optional[BenchCase]:
+    """Rebuild a request from a trace record.
+
+    The sampled payload is used when present, otherwise an input of the same
+    shape is synthesized: filler text of the recorded length for speech, and a
+    generated tone of the recorded duration for transcriptions.
+    """
+    task = REPLAYABLE_PATHS.get(record.get("path"))
+    if task is None:
+        return None
+
+    params = record.get("params", {})
+    payload = None
+    if record.get("payload"):
+        with open(os.path.join(trace_dir, record["payload"]), "rb") as f:
+            payload = f.read()
+
+    if task == TaskTypeEnum.TTS:
+        body = json.loads(payload) if payload else params
+        text = body.get("input")
+        if text is None:
+            chars = params.get("input_chars", len(FILLER_TEXT))
+            text = (FILLER_TEXT * (chars // len(FILLER_TEXT) + 1))[:chars]
+        return BenchCase(
+            task=task,
+            response_format=body.get("response_format", "mp3"),
+            concurrency=1,
+            requests=1,
+            text=text,
+            voice=body.get("voice"),
+            speed=body.get("speed", 1.0),
+        )
+
+    audio = payload
+    audio_content_type = params.get("file_content_type", "audio/wav")
+    if audio is None:
+        duration = params.get("audio_duration")
+        if duration is None:
+            # Assume 16 kHz mono 16-bit audio when the duration is unknown.
+            duration = params.get("file_size", 320000) / 32000
+        audio = generate_wav_bytes(duration, noise=0.05)
+        audio_content_type = "audio/wav"
+
+    return BenchCase(
+        task=task,
+        response_format=params.get("response_format", "json"),
+        concurrency=1,
+        requests=1,
+        audio=audio,
+        audio_content_type=audio_content_type,
+    )
+
+
+async def replay(
+    target: HTTPTarget, records: List[Dict], trace_dir: str, speed: float = 1.0
+) -> List[Dict]:
+    """Send the trace requests at their recorded arrival times, divided by `speed`.
+
+    Requests are dispatched open-loop, so a slow server builds up a backlog
+    just like it would in production. Results are grouped per task and format.
+    """
+    groups: Dict[Tuple[str, str], List[Sample]] = {}
+    lags: List[float] = []
+    skipped = 0
+
+    async def send(case: BenchCase):
+        key = (case.task, case.response_format)
+        try:
+            sample = await target.request(case)
+        except Exception as e:
+            sample = Sample(0.0, error=str(e))
+        groups.setdefault(key, []).append(sample)
+
+    tasks = []
+    t0 = records[0]["ts"] if records else 0
+    start = time.perf_counter()
+    for record in records:
+        case = record_to_case(record, trace_dir)
+        if case is None:
+            skipped += 1
+            continue
+
+        offset = (record["ts"] - t0) / speed
+        delay = offset - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -0.01:
+            lags.append(-delay)
+        tasks.append(asyncio.ensure_future(send(case)))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    if skipped:
+        logger.info(f"Skipped {skipped} records of non replayable endpoints")
+    if lags:
+        logger.info(
+            f"{len(lags)} requests were dispatched late, max lag {max(lags):.3f}s"
+        )
+
+    return [
+        {
+            "task": task,
+            "response_format": response_format,
+            **summarize(samples, elapsed),
+        }
+        for (task, response_format), samples in sorted(groups.items())
+    ]
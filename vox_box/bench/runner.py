@@ -0,0 +1,180 @@
+import asyncio
+import functools
+import io
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+import httpx
+
+from vox_box.backends.stt.base import STTBackend
+from vox_box.backends.tts.base import TTSBackend
+from vox_box.bench.stats import Sample, summarize
+from vox_box.config.config import TaskTypeEnum
+from vox_box.utils.audio import get_audio_duration
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchCase:
+    task: str
+    response_format: str
+    concurrency: int
+    requests: int
+    text: Optional[str] = None
+    voice: Optional[str] = None
+    speed: float = 1.0
+    audio: Optional[bytes] = None
+    audio_content_type: str = "audio/wav"
+
+
+class HTTPTarget:
+    """Drive a running vox-box server over its OpenAI compatible API."""
+
+    def __init__(self, url: str, timeout: float = 600):
+        self._url = url.rstrip("/")
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def model_info(self) -> Dict:
+        response = await self._client.get(f"{self._url}/v1/models")
+        data = response.json().get("data", [])
+        return data[0] if data else {}
+
+    async def request(self, case: BenchCase) -> Sample:
+        if case.task == TaskTypeEnum.TTS:
+            return await self._speech(case)
+        return await self._transcribe(case)
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def _speech(self, case: BenchCase) -> Sample:
+        payload = {
+            "model": "bench",
+            "input": case.text,
+            "voice": case.voice,
+            "response_format": case.response_format,
+            "speed": case.speed,
+        }
+        start = time.perf_counter()
+        ttfb = None
+        body = bytearray()
+        async with self._client.stream(
+            "POST", f"{self._url}/v1/audio/speech", json=payload
+        ) as response:
+            async for chunk in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                body += chunk
+        latency = time.perf_counter() - start
+
+        content_type = response.headers.get("content-type", "")
+        if response.status_code != 200 or content_type.startswith("application/json"):
+            return Sample(latency, ttfb, error=_error_message(response, body))
+
+        return Sample(latency, ttfb, get_audio_duration(io.BytesIO(bytes(body))))
+
+    async def _transcribe(self, case: BenchCase) -> Sample:
+        files = {"file": ("audio", case.audio, case.audio_content_type)}
+        data = {"model": "bench", "response_format": case.response_format}
+        start = time.perf_counter()
+        response = await self._client.post(
+            f"{self._url}/v1/audio/transcriptions", files=files, data=data
+        )
+        latency = time.perf_counter() - start
+
+        body = response.content
+        if response.status_code != 200 or b'"status_code"' in body[:64]:
+            return Sample(latency, latency, error=_error_message(response, body))
+
+        return Sample(latency, latency, get_audio_duration(io.BytesIO(case.audio)))
+
+
+class DirectTarget:
+    """Call a loaded backend in-process, bypassing the HTTP server."""
+
+    def __init__(self, backend: Union[TTSBackend, STTBackend]):
+        self._backend = backend
+        self._executor = ThreadPoolExecutor()
+
+    async def model_info(self) -> Dict:
+        return self._backend.model_info()
+
+    async def request(self, case: BenchCase) -> Sample:
+        if case.task == TaskTypeEnum.TTS:
+            func = functools.partial(self._speech, case)
+        else:
+            func = functools.partial(self._transcribe, case)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _speech(self, case: BenchCase) -> Sample:
+        start = time.perf_counter()
+        try:
+            audio_file = self._backend.speech(
+                case.text, case.voice, case.speed, case.response_format
+            )
+        except Exception as e:
+            return Sample(time.perf_counter() - start, error=str(e))
+        latency = time.perf_counter() - start
+
+        try:
+            return Sample(latency, latency, get_audio_duration(audio_file))
+        finally:
+            os.remove(audio_file)
+
+    def _transcribe(self, case: BenchCase) -> Sample:
+        start = time.perf_counter()
+        try:
+            self._backend.transcribe(
+                case.audio,
+                None,
+                None,
+                0,
+                None,
+                case.response_format,
+                content_type=case.audio_content_type,
+            )
+        except Exception as e:
+            return Sample(time.perf_counter() - start, error=str(e))
+        latency = time.perf_counter() - start
+
+        return Sample(latency, latency, get_audio_duration(io.BytesIO(case.audio)))
+
+
+async def run_case(target: Union[HTTPTarget, DirectTarget], case: BenchCase) -> Dict:
+    """Run `case.requests` requests with `case.concurrency` closed-loop workers."""
+    samples: List[Sample] = []
+    remaining = case.requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            try:
+                samples.append(await target.request(case))
+            except Exception as e:
+                samples.append(Sample(0.0, error=str(e)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(case.concurrency)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "task": case.task,
+        "response_format": case.response_format,
+        "concurrency": case.concurrency,
+        **summarize(samples, elapsed),
+    }
+
+
+def _error_message(response: httpx.Response, body: bytes) -> str:
+    return f"HTTP {response.status_code}: {bytes(body)[:200].decode(errors='replace')}"
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Sample:
+    latency: float
+    ttfb: Optional[float] = None
+    audio_duration: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def rtf(self) -> Optional[float]:
+        if self.error is not None or not self.audio_duration:
+            return None
+        return self.latency / self.audio_duration
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linearly interpolated percentile, q in [0, 100]."""
+    if not values:
+        return None
+
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict:
+    ok = [s for s in samples if s.error is None]
+    latencies = [s.latency for s in ok]
+    ttfbs = [s.ttfb for s in ok if s.ttfb is not None]
+    rtfs = [s.rtf for s in ok if s.rtf is not None]
+
+    summary = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "elapsed": elapsed,
+        "throughput": len(ok) / elapsed if elapsed > 0 else None,
+        "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+        "rtf_mean": sum(rtfs) / len(rtfs) if rtfs else None,
+    }
+    for q in (50, 95, 99):
+        summary[f"latency_p{q}"] = percentile(latencies, q)
+        summary[f"ttfb_p{q}"] = percentile(ttfbs, q)
+
+    errors = sorted({s.error for s in samples if s.error is not None})
+    if errors:
+        summary["error_messages"] = errors[:10]
+    return summary
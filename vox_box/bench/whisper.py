@@ -0,0 +1,164 @@
+import os
+import statistics
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from vox_box.utils.audio import get_audio_duration
+from vox_box.utils.cpu import get_cpu_count
+
+AUDIO_SUFFIXES = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".opus")
+
+
+@dataclass
+class Sample:
+    path: str
+    transcript: Optional[str] = None
+    language: Optional[str] = None
+
+
+# Shipped with the package as the CosyVoice prompt voice.
+BUNDLED_SAMPLES = [
+    Sample(
+        path=os.path.join(os.path.dirname(__file__), "..", "backends", "tts", "xh.mp3"),
+        transcript="今天天氣真是太好了，陽光燦爛心情超級棒，但是朋友最近的感情問題也讓我心痛不已，好像世界末日一樣，真的好為他難過喔。",
+        language="zh",
+    ),
+]
+
+
+def load_samples(
+    samples_dir: Optional[str] = None, language: Optional[str] = None
+) -> List[Sample]:
+    """Audio files of `samples_dir`, with the transcript of `name.txt` next
+    to `name.wav` when present, or the bundled samples."""
+    if samples_dir is None:
+        return BUNDLED_SAMPLES
+
+    samples = []
+    for name in sorted(os.listdir(samples_dir)):
+        stem, suffix = os.path.splitext(name)
+        if suffix.lower() not in AUDIO_SUFFIXES:
+            continue
+
+        transcript = None
+        transcript_path = os.path.join(samples_dir, f"{stem}.txt")
+        if os.path.exists(transcript_path):
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                transcript = f.read().strip()
+        samples.append(Sample(os.path.join(samples_dir, name), transcript, language))
+
+    if not samples:
+        raise Exception(f"No audio files in {samples_dir}")
+    return samples
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words without punctuation, CJK text split into characters
+    since it isn't separated by spaces."""
+    text = "".join(
+        " " if unicodedata.category(c)[0] in ("P", "S") else c for c in text.lower()
+    )
+    tokens = []
+    for word in text.split():
+        if any(_is_cjk(c) for c in word):
+            tokens.extend(word)
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def edit_distance(reference: List[str], hypothesis: List[str]) -> int:
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp))
+            )
+        previous = current
+    return previous[-1]
+
+
+def evaluate_model(
+    model_dir: str,
+    samples: List[Sample],
+    device: str = "cpu",
+    repeat: int = 3,
+) -> Dict:
+    """Transcribe the samples with a CTranslate2 Whisper model.
+
+    Returns the real time factor over all samples, from the median time of
+    `repeat` runs per sample, and the word error rate, or character error
+    rate for CJK text, over the samples with a transcript.
+    """
+    from faster_whisper.transcribe import WhisperModel
+
+    cpu_threads = get_cpu_count() if device == "cpu" else 0
+    if device.startswith("cuda:"):
+        device = device.split(":")[0]
+    start = time.perf_counter()
+    model = WhisperModel(model_dir, device=device, cpu_threads=cpu_threads)
+    load_seconds = time.perf_counter() - start
+
+    def transcribe(sample: Sample) -> str:
+        segs, _ = model.transcribe(
+            sample.path, language=sample.language, without_timestamps=True
+        )
+        return "".join(seg.text for seg in segs).strip()
+
+    transcribe(samples[0])
+
+    seconds, duration, errors, words = 0.0, 0.0, 0, 0
+    texts = []
+    for sample in samples:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = transcribe(sample)
+            times.append(time.perf_counter() - start)
+        seconds += statistics.median(times)
+        duration += get_audio_duration(sample.path) or 0.0
+        texts.append(text)
+
+        if sample.transcript is not None:
+            reference = tokenize(sample.transcript)
+            errors += edit_distance(reference, tokenize(text))
+            words += len(reference)
+
+    return {
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+        "realtime_factor": seconds / duration if duration else None,
+        "wer": errors / words if words else None,
+        "texts": texts,
+    }
+
+
+def pick_best(results: List[Dict], max_wer_increase: float = 0.02) -> Optional[Dict]:
+    """The fastest result whose error rate is within `max_wer_increase` of
+    the lowest one."""
+    results = [r for r in results if r.get("realtime_factor") is not None]
+    if not results:
+        return None
+
+    wers = [r["wer"] for r in results if r.get("wer") is not None]
+    if wers:
+        results = [
+            r
+            for r in results
+            if r.get("wer") is not None and r["wer"] <= min(wers) + max_wer_increase
+        ]
+    return min(results, key=lambda r: r["realtime_factor"])
+
+
+def _is_cjk(c: str) -> bool:
+    code = ord(c)
+    return (
+        0x3040 <= code <= 0x30FF  # Hiragana, Katakana
+        or 0x3400 <= code <= 0x4DBF  # CJK Extension A
+        or 0x4E00 <= code <= 0x9FFF  # CJK Unified Ideographs
+        or 0xAC00 <= code <= 0xD7AF  # Hangul
+        or 0xF900 <= code <= 0xFAFF  # CJK Compatibility Ideographs
+    )
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Tuple
+
+from vox_box import __git_commit__, __version__
+from vox_box.bench.runner import BenchCase, DirectTarget, HTTPTarget, run_case
+from vox_box.cmd.start import get_data_dir
+from vox_box.config import Config
+from vox_box.config.config import TaskTypeEnum
+from vox_box.logging import setup_logging
+from vox_box.server.model import ModelInstance
+from vox_box.utils.audio import generate_wav_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEXT = (
+    "Vox box is a text to speech and speech to text server compatible with "
+    "the OpenAI API. This sentence is used to benchmark its performance."
+)
+
+
+def setup_bench_cmd(subparsers: argparse._SubParsersAction):
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        "bench",
+        help="Benchmark a vox-box server or backend.",
+        description="Benchmark a vox-box server over HTTP, or call a backend directly, and report throughput, latency percentiles, time to first byte and real time factor.",
+    )
+
+    group = parser.add_argument_group("Target settings")
+    group.add_argument(
+        "--url",
+        type=str,
+        help="URL of a running vox-box server, e.g. http://localhost:80. When unset the backend is loaded and called in-process.",
+    )
+    group.add_argument("--model", type=str, help="Main model path.")
+    group.add_argument(
+        "--huggingface-repo-id",
+        type=str,
+        help="Huggingface repo id for the model.",
+    )
+    group.add_argument(
+        "--model-scope-model-id",
+        type=str,
+        help="Model scope model id for the model.",
+    )
+    group.add_argument(
+        "--synthetic-backend",
+        type=str,
+        choices=["tts", "stt"],
+        help="Benchmark the deterministic synthetic backend.",
+    )
+    group.add_argument(
+        "--synthetic-rtf",
+        type=float,
+        help="Simulated real time factor of the synthetic backend.",
+        default=0.0,
+    )
+    group.add_argument(
+        "--device",
+        type=str,
+        help="Binding device, cuda:0.",
+        default="cpu",
+    )
+    group.add_argument(
+        "--data-dir",
+        type=str,
+        help="Directory to store download model data. Default is OS specific.",
+    )
+    group.add_argument(
+        "--jit",
+        action="store_true",
+        help="Run the backend through its exported TorchScript graphs, see vox-box start --jit.",
+        default=False,
+    )
+
+    group = parser.add_argument_group("Workload settings")
+    group.add_argument(
+        "--formats",
+        type=str,
+        help="Comma separated response formats, default mp3 for speech and json for transcriptions.",
+    )
+    group.add_argument(
+        "--concurrency",
+        type=str,
+        help="Comma separated concurrency levels.",
+        default="1,4",
+    )
+    group.add_argument(
+        "--requests",
+        type=int,
+        help="Number of requests per format and concurrency level.",
+        default=20,
+    )
+    group.add_argument(
+        "--warmup",
+        type=int,
+        help="Number of untimed requests sent before measuring.",
+        default=1,
+    )
+    group.add_argument("--text", type=str, help="Speech input text.")
+    group.add_argument(
+        "--voice",
+        type=str,
+        help="Speech voice, default the first voice of the model.",
+    )
+    group.add_argument("--audio", type=str, help="Audio file to transcribe.")
+    group.add_argument(
+        "--audio-seconds",
+        type=float,
+        help="Duration of the generated audio when --audio is unset.",
+        default=10.0,
+    )
+
+    group = parser.add_argument_group("Output settings")
+    group.add_argument(
+        "--output",
+        type=str,
+        help="Write the results as JSON to this file.",
+    )
+    group.add_argument(
+        "-d",
+        "--debug",
+        action="store_true",
+        help="Enable debug mode.",
+        default=False,
+    )
+
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace):
+    setup_logging(args.debug)
+    try:
+        report = asyncio.run(bench(args))
+    except Exception as e:
+        logger.fatal(e)
+        return
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+
+async def bench(args: argparse.Namespace) -> Dict:
+    target = HTTPTarget(args.url) if args.url else DirectTarget(load_backend(args))
+    try:
+        model_info = await target.model_info()
+        task = model_info.get("task_type")
+        if task not in (TaskTypeEnum.TTS, TaskTypeEnum.STT):
+            raise Exception(f"Unknown task type of model: {task}")
+
+        cases = build_cases(args, task, model_info)
+        results = []
+        for case in cases:
+            for _ in range(args.warmup):
+                await target.request(case)
+
+            logger.info(
+                f"Running {case.requests} {case.response_format} requests at concurrency {case.concurrency}"
+            )
+            result = await run_case(target, case)
+            result["backend"] = model_info.get("backend_framework")
+            result["mode"] = model_info.get("runtime", {}).get("mode")
+            results.append(result)
+    finally:
+        await target.close()
+
+    return {
+        "version": __version__,
+        "git_commit": __git_commit__,
+        "timestamp": int(time.time()),
+        "target": args.url or "direct",
+        "model": model_info.get("id"),
+        "results": results,
+    }
+
+
+def load_backend(args: argparse.Namespace):
+    cfg = Config()
+    cfg.debug = args.debug
+    cfg.device = args.device
+    cfg.model = args.model
+    cfg.huggingface_repo_id = args.huggingface_repo_id
+    cfg.model_scope_model_id = args.model_scope_model_id
+    cfg.synthetic_backend = args.synthetic_backend
+    cfg.synthetic_rtf = args.synthetic_rtf
+    cfg.jit = args.jit
+    cfg.data_dir = args.data_dir or get_data_dir()
+    cfg.cache_dir = os.path.join(cfg.data_dir, "cache")
+    os.makedirs(cfg.cache_dir, exist_ok=True)
+
+    return ModelInstance(cfg).run()
+
+
+def build_cases(
+    args: argparse.Namespace, task: str, model_info: Dict
+) -> List[BenchCase]:
+    default_format = "mp3" if task == TaskTypeEnum.TTS else "json"
+    formats = (args.formats or default_format).split(",")
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+
+    audio = None
+    audio_content_type = "audio/wav"
+    if task == TaskTypeEnum.STT:
+        if args.audio:
+            with open(args.audio, "rb") as f:
+                audio = f.read()
+            audio_content_type = "application/octet-stream"
+        else:
+            audio = generate_wav_bytes(args.audio_seconds, noise=0.05)
+
+    voice = args.voice
+    if voice is None and model_info.get("voices"):
+        voice = model_info["voices"][0]
+
+    return [
+        BenchCase(
+            task=task,
+            response_format=response_format,
+            concurrency=concurrency,
+            requests=args.requests,
+            text=args.text or DEFAULT_TEXT,
+            voice=voice,
+            audio=audio,
+            audio_content_type=audio_content_type,
+        )
+        for response_format in formats
+        for concurrency in concurrencies
+    ]
+
+
+def print_report(report: Dict):
+    print_table(
+        report["results"],
+        [
+            ("backend", "backend", "{}"),
+            ("mode", "mode", "{}"),
+            ("format", "response_format", "{}"),
+            ("conc", "concurrency", "{}"),
+            ("reqs", "requests", "{}"),
+            ("errs", "errors", "{}"),
+            ("req/s", "throughput", "{:.2f}"),
+            ("p50", "latency_p50", "{:.3f}"),
+            ("p95", "latency_p95", "{:.3f}"),
+            ("p99", "latency_p99", "{:.3f}"),
+            ("ttfb50", "ttfb_p50", "{:.3f}"),
+            ("rtf", "rtf_mean", "{:.3f}"),
+        ],
+    )
+
+
+def print_table(results: List[Dict], columns: List[Tuple[str, str, str]]):
+    rows = [[title for title, _, _ in columns]]
+    for result in results:
+        row = []
+        for _, key, fmt in columns:
+            value = result.get(key)
+            row.append("-" if value is None else fmt.format(value))
+        rows.append(row)
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,161 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict
+
+from vox_box import __git_commit__, __version__
+from vox_box.bench.audio import (
+    DEFAULT_DURATIONS,
+    DEFAULT_SPEEDS,
+    SIGNALS,
+    build_cases,
+    compare,
+    run_case,
+)
+from vox_box.cmd.bench import print_table
+from vox_box.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def setup_bench_audio_cmd(subparsers: argparse._SubParsersAction):
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        "bench-audio",
+        help="Benchmark the audio format conversion.",
+        description="Benchmark the audio format conversion on generated signals for every output format, duration and speed, and compare the results to a stored baseline.",
+    )
+
+    group = parser.add_argument_group("Workload settings")
+    group.add_argument(
+        "--formats",
+        type=str,
+        help="Comma separated output formats, default all supported formats.",
+    )
+    group.add_argument(
+        "--durations",
+        type=str,
+        help="Comma separated input durations in seconds.",
+        default=",".join(f"{d:g}" for d in DEFAULT_DURATIONS),
+    )
+    group.add_argument(
+        "--speeds",
+        type=str,
+        help="Comma separated speeds.",
+        default=",".join(f"{s:g}" for s in DEFAULT_SPEEDS),
+    )
+    group.add_argument(
+        "--signals",
+        type=str,
+        help="Comma separated input signals.",
+        default=",".join(SIGNALS),
+    )
+    group.add_argument(
+        "--repeat",
+        type=int,
+        help="Number of timed conversions per case, the median is reported.",
+        default=5,
+    )
+
+    group = parser.add_argument_group("Baseline settings")
+    group.add_argument(
+        "--baseline",
+        type=str,
+        help="Compare the results to this baseline and exit non-zero on regressions.",
+    )
+    group.add_argument(
+        "--save-baseline",
+        type=str,
+        help="Write the results to this file to be used as a baseline.",
+    )
+    group.add_argument(
+        "--threshold",
+        type=float,
+        help="Allowed relative increase of the conversion time over the baseline.",
+        default=0.2,
+    )
+    group.add_argument(
+        "--memory-threshold",
+        type=float,
+        help="Allowed relative increase of the peak memory over the baseline.",
+        default=0.2,
+    )
+    group.add_argument(
+        "--output",
+        type=str,
+        help="Write the results as JSON to this file.",
+    )
+    group.add_argument(
+        "-d",
+        "--debug",
+        action="store_true",
+        help="Enable debug mode.",
+        default=False,
+    )
+
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace):
+    setup_logging(args.debug)
+    try:
+        report = bench_audio(args)
+    except Exception as e:
+        logger.fatal(e)
+        sys.exit(1)
+
+    print_table(
+        report["results"],
+        [
+            ("case", "key", "{}"),
+            ("time", "seconds", "{:.4f}"),
+            ("min", "seconds_min", "{:.4f}"),
+            ("rtf", "realtime_factor", "{:.4f}"),
+            ("peak mem", "peak_memory", "{}"),
+            ("rss peak", "peak_rss_increase", "{}"),
+            ("out size", "output_size", "{}"),
+        ],
+    )
+
+    for path in [args.output, args.save_baseline]:
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Wrote results to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(
+            report["results"], baseline, args.threshold, args.memory_threshold
+        )
+        if regressions:
+            for regression in regressions:
+                logger.error(f"Regression {regression}")
+            logger.error(f"{len(regressions)} regressions against {args.baseline}")
+            sys.exit(1)
+        logger.info(f"No regressions against {args.baseline}")
+
+
+def bench_audio(args: argparse.Namespace) -> Dict:
+    cases = build_cases(
+        formats=args.formats.split(",") if args.formats else None,
+        durations=[float(d) for d in args.durations.split(",")],
+        speeds=[float(s) for s in args.speeds.split(",")],
+        signals=args.signals.split(","),
+    )
+
+    results = []
+    for i, case in enumerate(cases):
+        logger.debug(f"Running case {i + 1}/{len(cases)} {case.key}")
+        results.append(run_case(case, repeat=args.repeat))
+
+    return {
+        "version": __version__,
+        "git_commit": __git_commit__,
+        "timestamp": int(time.time()),
+        "repeat": args.repeat,
+        "results": results,
+    }
@@ -0,0 +1,201 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict
+
+from vox_box import __git_commit__, __version__
+from vox_box.bench.precision import (
+    DEFAULT_TEXTS,
+    REFERENCE_PRECISION,
+    check,
+    measure,
+    summarize,
+)
+from vox_box.cmd.bench import print_table
+from vox_box.logging import setup_logging
+from vox_box.utils.precision import PRECISIONS, validate_precision
+
+logger = logging.getLogger(__name__)
+
+
+def setup_bench_precision_cmd(subparsers: argparse._SubParsersAction):
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        "bench-precision",
+        help="Benchmark and check the inference precisions of a TTS model.",
+        description="Run a TTS model with every precision in a separate process, report the speedup and memory reduction over fp32 and check the outputs against the fp32 outputs.",
+    )
+
+    group = parser.add_argument_group("Model settings")
+    group.add_argument(
+        "-m",
+        "--model",
+        type=str,
+        help="Local path to the model.",
+    )
+    group.add_argument(
+        "--huggingface-repo-id",
+        type=str,
+        help="Huggingface repo id for the model.",
+    )
+    group.add_argument(
+        "--model-scope-model-id",
+        type=str,
+        help="Model scope model id for the model.",
+    )
+    group.add_argument(
+        "--device",
+        type=str,
+        help="Binding device, e.g., cuda:0.",
+        default="cpu",
+    )
+    group.add_argument(
+        "--data-dir",
+        type=str,
+        help="Directory to store download model data.",
+    )
+    group.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory to store cache files.",
+    )
+
+    group = parser.add_argument_group("Workload settings")
+    group.add_argument(
+        "--precisions",
+        type=str,
+        help=f"Comma separated precisions, {REFERENCE_PRECISION} is always run as the reference. Append +jit to run through the exported TorchScript graphs, e.g. fp32+jit.",
+        default=",".join(PRECISIONS),
+    )
+    group.add_argument(
+        "--texts-file",
+        type=str,
+        help="File with one input text per line, default a few short sentences.",
+    )
+    group.add_argument(
+        "--voice",
+        type=str,
+        help="Voice to use, default the first voice of the model.",
+    )
+    group.add_argument(
+        "--repeat",
+        type=int,
+        help="Number of timed requests per text, the median is reported.",
+        default=3,
+    )
+    group.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed, the same for every precision.",
+        default=0,
+    )
+
+    group = parser.add_argument_group("Accuracy settings")
+    group.add_argument(
+        "--max-spectral-distance",
+        type=float,
+        help="Allowed distance in dB between the average spectra of an output and its fp32 output.",
+        default=6.0,
+    )
+    group.add_argument(
+        "--max-duration-ratio",
+        type=float,
+        help="Allowed ratio between the duration of an output and its fp32 output.",
+        default=1.5,
+    )
+    group.add_argument(
+        "--output",
+        type=str,
+        help="Write the results as JSON to this file.",
+    )
+    group.add_argument(
+        "-d",
+        "--debug",
+        action="store_true",
+        help="Enable debug mode.",
+        default=False,
+    )
+
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace):
+    setup_logging(args.debug)
+    try:
+        report = bench_precision(args)
+    except Exception as e:
+        logger.fatal(e)
+        sys.exit(1)
+
+    print_table(
+        report["results"],
+        [
+            ("precision", "precision", "{}"),
+            ("time", "seconds", "{:.3f}"),
+            ("speedup", "speedup", "{:.2f}"),
+            ("load mem", "load_memory", "{}"),
+            ("peak mem", "peak_memory", "{}"),
+            ("mem reduction", "memory_reduction", "{:.1%}"),
+            ("spectral dist", "spectral_distance_max", "{:.2f}"),
+            ("valid", "valid", "{}"),
+        ],
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+    failures = check(
+        report["results"], args.max_spectral_distance, args.max_duration_ratio
+    )
+    if failures:
+        for failure in failures:
+            logger.error(f"Accuracy check failed {failure}")
+        sys.exit(1)
+    logger.info(
+        f"All precisions passed the accuracy check against {REFERENCE_PRECISION}"
+    )
+
+
+def bench_precision(args: argparse.Namespace) -> Dict:
+    if not (args.model or args.huggingface_repo_id or args.model_scope_model_id):
+        raise Exception(
+            "One of model, huggingface-repo-id or model-scope-model-id is required."
+        )
+
+    precisions = [REFERENCE_PRECISION] + [
+        p for p in args.precisions.split(",") if p and p != REFERENCE_PRECISION
+    ]
+    for variant in precisions:
+        precision, _, mode = variant.partition("+")
+        validate_precision(precision, args.device)
+        if mode not in ("", "jit") or (mode == "jit" and precision != "fp32"):
+            raise Exception(f"Unsupported variant {variant}, only fp32+jit is")
+
+    texts = DEFAULT_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    cfg_kwargs = {
+        "model": args.model,
+        "huggingface_repo_id": args.huggingface_repo_id,
+        "model_scope_model_id": args.model_scope_model_id,
+        "device": args.device,
+        "data_dir": args.data_dir,
+        "cache_dir": args.cache_dir,
+    }
+    results = measure(
+        cfg_kwargs, precisions, texts, args.voice, repeat=args.repeat, seed=args.seed
+    )
+
+    return {
+        "version": __version__,
+        "git_commit": __git_commit__,
+        "timestamp": int(time.time()),
+        "device": args.device,
+        "repeat": args.repeat,
+        "results": summarize(results),
+    }
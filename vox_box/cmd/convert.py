@@ -0,0 +1,173 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict
+
+from vox_box import __git_commit__, __version__
+from vox_box.bench.whisper import evaluate_model, load_samples, pick_best
+from vox_box.cmd.bench import print_table
+from vox_box.cmd.start import get_data_dir
+from vox_box.logging import setup_logging
+from vox_box.utils.whisper_converter import (
+    QUANTIZATIONS,
+    convert_whisper,
+    converted_model_dir,
+    get_dir_size,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def setup_convert_cmd(subparsers: argparse._SubParsersAction):
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        "convert",
+        help="Convert a Transformers Whisper model for faster-whisper.",
+        description="Convert a Transformers Whisper checkpoint into CTranslate2 models with the given quantizations, cached under the data directory, and compare their speed and accuracy on sample audio.",
+    )
+    parser.add_argument(
+        "model",
+        type=str,
+        help="Local path or Huggingface repo id of the Transformers Whisper checkpoint.",
+    )
+
+    group = parser.add_argument_group("Conversion settings")
+    group.add_argument(
+        "-q",
+        "--quantization",
+        type=str,
+        help=f"Comma separated quantizations, any of {', '.join(QUANTIZATIONS)}.",
+        default="int8",
+    )
+    group.add_argument(
+        "--data-dir",
+        type=str,
+        help="Directory to store the converted models under. Default is OS specific.",
+    )
+    group.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert again even if a cached conversion exists.",
+        default=False,
+    )
+
+    group = parser.add_argument_group("Comparison settings")
+    group.add_argument(
+        "--skip-compare",
+        action="store_true",
+        help="Only convert, without comparing the converted models.",
+        default=False,
+    )
+    group.add_argument(
+        "--samples",
+        type=str,
+        help="Directory of audio files to compare on, with optional transcripts in name.txt next to name.wav. Default is the bundled sample.",
+    )
+    group.add_argument(
+        "--language",
+        type=str,
+        help="Language of the samples in the samples directory, default detected.",
+    )
+    group.add_argument(
+        "--device",
+        type=str,
+        help="Device to compare on, e.g., cuda:0.",
+        default="cpu",
+    )
+    group.add_argument(
+        "--repeat",
+        type=int,
+        help="Number of timed transcriptions per sample, the median is reported.",
+        default=3,
+    )
+    group.add_argument(
+        "--max-wer-increase",
+        type=float,
+        help="Error rate increase over the most accurate variant still accepted when recommending the fastest one.",
+        default=0.02,
+    )
+    group.add_argument(
+        "--output",
+        type=str,
+        help="Write the results as JSON to this file.",
+    )
+    group.add_argument(
+        "-d",
+        "--debug",
+        action="store_true",
+        help="Enable debug mode.",
+        default=False,
+    )
+
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace):
+    setup_logging(args.debug)
+    try:
+        report = convert(args)
+    except Exception as e:
+        logger.fatal(e)
+        sys.exit(1)
+
+    print_table(
+        report["results"],
+        [
+            ("quantization", "quantization", "{}"),
+            ("size", "size", "{}"),
+            ("rtf", "realtime_factor", "{:.4f}"),
+            ("wer", "wer", "{:.2%}"),
+            ("path", "path", "{}"),
+        ],
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Wrote results to {args.output}")
+
+    best = report.get("recommended")
+    if best is not None:
+        logger.info(
+            f"Fastest acceptable variant is {best['quantization']}, serve it with: vox-box start --model {best['path']}"
+        )
+
+
+def convert(args: argparse.Namespace) -> Dict:
+    quantizations = [q for q in args.quantization.split(",") if q]
+    cache_root = os.path.join(args.data_dir or get_data_dir(), "converted")
+
+    results = []
+    for quantization in quantizations:
+        output_dir = converted_model_dir(cache_root, args.model, quantization)
+        convert_whisper(args.model, output_dir, quantization, force=args.force)
+        results.append(
+            {
+                "quantization": quantization,
+                "path": output_dir,
+                "size": get_dir_size(output_dir),
+            }
+        )
+
+    if not args.skip_compare:
+        samples = load_samples(args.samples, args.language)
+        for result in results:
+            logger.info(f"Comparing {result['quantization']} on {len(samples)} samples")
+            result.update(
+                evaluate_model(
+                    result["path"], samples, device=args.device, repeat=args.repeat
+                )
+            )
+
+    best = pick_best(results, args.max_wer_increase)
+    return {
+        "version": __version__,
+        "git_commit": __git_commit__,
+        "timestamp": int(time.time()),
+        "model": args.model,
+        "device": args.device,
+        "results": results,
+        "recommended": best,
+    }
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict
+
+from vox_box import __git_commit__, __version__
+from vox_box.bench.replay import load_trace, replay
+from vox_box.bench.runner import HTTPTarget
+from vox_box.cmd.bench import print_report
+from vox_box.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def setup_replay_cmd(subparsers: argparse._SubParsersAction):
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        "replay",
+        help="Replay a captured request trace against a vox-box server.",
+        description="Replay a trace recorded with `vox-box start --capture-file` against a vox-box server and report the latency distributions.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        required=True,
+        help="JSONL trace recorded with --capture-file.",
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        required=True,
+        help="URL of the vox-box server, e.g. http://localhost:80.",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        help="Replay speed, 2 sends the requests twice as fast as recorded.",
+        default=1.0,
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the results as JSON to this file.",
+    )
+    parser.add_argument(
+        "-d",
+        "--debug",
+        action="store_true",
+        help="Enable debug mode.",
+        default=False,
+    )
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace):
+    setup_logging(args.debug)
+    try:
+        report = asyncio.run(replay_trace(args))
+    except Exception as e:
+        logger.fatal(e)
+        return
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+
+async def replay_trace(args: argparse.Namespace) -> Dict:
+    if args.speed <= 0:
+        raise Exception("Replay speed must be greater than 0")
+
+    records = load_trace(args.trace)
+    logger.info(f"Replaying {len(records)} records at {args.speed}x")
+
+    target = HTTPTarget(args.url)
+    try:
+        model_info = await target.model_info()
+        results = await replay(
+            target,
+            records,
+            os.path.dirname(os.path.abspath(args.trace)),
+            speed=args.speed,
+        )
+    finally:
+        await target.close()
+
+    for result in results:
+        result["backend"] = model_info.get("backend_framework")
+
+    return {
+        "version": __version__,
+        "git_commit": __git_commit__,
+        "timestamp": int(time.time()),
+        "target": args.url,
+        "trace": args.trace,
+        "speed": args.speed,
+        "model": model_info.get("id"),
+        "results": results,
+    }
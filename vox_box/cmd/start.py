@@ -7,7 +7,12 @@ from vox_box.logging import setup_logging
 from vox_box.config import Config
 from vox_box.server.model import ModelInstance
 from vox_box.server.server import Server
+from vox_box.utils.memory import parse_size
 from vox_box.utils.model import preconfigure_faster_whisper_env
+from vox_box.utils.precision import PRECISIONS, validate_precision
+from vox_box.utils.resources import setup_resources
+from vox_box.utils.scheduling import parse_weights
+from vox_box.utils.whisper_converter import is_transformers_whisper
 
 
 logger = logging.getLogger(__name__)
@@ -55,6 +60,61 @@ def setup_start_cmd(subparsers: argparse._SubParsersAction):
         help="Port to bind the server to.",
         default=80,
     )
+    group.add_argument(
+        "--capture-file",
+        type=str,
+        help="Record request metadata of the audio APIs to this JSONL trace, for replay with `vox-box replay`.",
+    )
+    group.add_argument(
+        "--capture-payload-sample-rate",
+        type=float,
+        help="Fraction of captured requests whose payload is stored along with the trace.",
+        default=0.0,
+    )
+    group.add_argument(
+        "--trace-file",
+        type=str,
+        help="Append OTLP/JSON spans of the audio API requests to this file.",
+    )
+    group.add_argument(
+        "--otlp-endpoint",
+        type=str,
+        help="Export OTLP/JSON spans of the audio API requests to this collector endpoint, e.g. http://localhost:4318/v1/traces.",
+    )
+    group.add_argument(
+        "--debug-token",
+        type=str,
+        help="Enable the /debug endpoints, authenticated with this bearer token. Can also be set with VOX_BOX_DEBUG_TOKEN.",
+        default=os.getenv("VOX_BOX_DEBUG_TOKEN"),
+    )
+    group.add_argument(
+        "--memory-limit",
+        type=parse_size,
+        help="Reject audio API requests with 503 when the projected process memory would exceed this size, e.g. 8GiB.",
+    )
+    group.add_argument(
+        "--cpu-cores",
+        type=int,
+        help="Number of CPUs the process may use. Default is all CPUs available to the process, cgroup quota aware.",
+        default=0,
+    )
+    group.add_argument(
+        "--numa-node",
+        type=int,
+        help="Restrict the process to the CPUs of this NUMA node.",
+    )
+    group.add_argument(
+        "--inference-workers",
+        type=int,
+        help="Number of requests running inference in parallel, each with an equal share of the CPUs as intra-op threads. Default is one per 4 CPUs.",
+        default=0,
+    )
+    group.add_argument(
+        "--pin-workers",
+        action="store_true",
+        help="Pin every inference worker thread to its own CPUs.",
+        default=False,
+    )
     group.add_argument(
         "--model",
         type=str,
@@ -78,12 +138,160 @@ def setup_start_cmd(subparsers: argparse._SubParsersAction):
         help="Model scope model id for the estimate model.",
     )
 
+    group.add_argument(
+        "--synthetic-backend",
+        type=str,
+        choices=["tts", "stt"],
+        help="Serve a deterministic synthetic backend without model weights, for benchmarking.",
+    )
+    group.add_argument(
+        "--synthetic-rtf",
+        type=float,
+        help="Simulated real time factor of the synthetic backend.",
+        default=0.0,
+    )
+    group.add_argument(
+        "--precision",
+        type=str,
+        choices=PRECISIONS,
+        help="Inference precision of the Bark, CosyVoice and Dia backends: fp32, bf16 autocast, or int8 dynamic quantization of the Linear layers (cpu only). Default is the backend default.",
+    )
+    group.add_argument(
+        "--jit",
+        action="store_true",
+        help="Export the CosyVoice LLM and flow encoder to TorchScript on the first start, cached next to the model, and run inference through the exported graphs. Meant for CPU serving, requires fp32 precision.",
+        default=False,
+    )
+    group.add_argument(
+        "--disable-warmup",
+        action="store_true",
+        help="Serve without running synthetic warmup requests through the model after loading it.",
+        default=False,
+    )
+
     group.add_argument(
         "--data-dir",
         type=str,
         help="Directory to store download model data. Default is OS specific.",
     )
 
+    group.add_argument(
+        "--transcription-cache-memory",
+        type=parse_size,
+        help="Size of the in-memory cache of transcription results, keyed by audio content and parameters, 0 disables it. Default is 64MiB.",
+        default=64 * 1024**2,
+    )
+    group.add_argument(
+        "--transcription-cache-disk",
+        type=parse_size,
+        help="Size of the on-disk cache of transcription results under the data directory, e.g. 1GiB. Default is 0, disabled.",
+        default=0,
+    )
+    group.add_argument(
+        "--transcription-cache-ttl",
+        type=int,
+        help="Seconds a cached transcription is served, 0 keeps it until evicted. Default is 86400.",
+        default=24 * 3600,
+    )
+    group.add_argument(
+        "--max-upload-size",
+        type=parse_size,
+        help="Size limit of a transcription upload, larger ones are rejected with 413. Default is 1GiB.",
+        default=1024**3,
+    )
+    group.add_argument(
+        "--upload-spool-size",
+        type=parse_size,
+        help="Size up to which an upload is kept in memory, larger ones are streamed to a file under the data directory. Default is 1MiB.",
+        default=1024**2,
+    )
+    group.add_argument(
+        "--disable-singleflight",
+        action="store_true",
+        help="Run identical concurrent speech and transcription requests separately instead of sharing one computation.",
+        default=False,
+    )
+    group.add_argument(
+        "--fair-scheduling",
+        action="store_true",
+        help="Queue inference per tenant, from the X-Tenant header or the API key, with weighted fair queuing in an interactive and a batch lane chosen by the X-Priority header. Batch requests give their slot up to interactive ones between segments.",
+        default=False,
+    )
+    group.add_argument(
+        "--interactive-reserved-slots",
+        type=int,
+        help="Inference slots batch requests may not take, kept free for interactive requests.",
+        default=1,
+    )
+    group.add_argument(
+        "--tenant-weights",
+        type=parse_weights,
+        help="Relative shares of the inference slots per tenant, e.g. voice-agent=4,etl=1. Tenants not listed weigh 1.",
+    )
+
+    group = parser_server.add_argument_group("TTS settings")
+    group.add_argument(
+        "--tts-segment-max-chars",
+        type=int,
+        help="Split speech inputs longer than this many characters into sentence segments synthesized in parallel, e.g. 250. Default is 0, disabled.",
+        default=0,
+    )
+    group.add_argument(
+        "--tts-segment-workers",
+        type=int,
+        help="Number of sentence segments synthesized concurrently.",
+        default=2,
+    )
+    group.add_argument(
+        "--tts-crossfade-ms",
+        type=int,
+        help="Crossfade duration in milliseconds over the joins between segments.",
+        default=20,
+    )
+    group.add_argument(
+        "--tts-max-batch-size",
+        type=int,
+        help="Maximum number of concurrent speech requests generated as one batch by backends supporting it, 1 disables batching.",
+        default=8,
+    )
+    group.add_argument(
+        "--tts-batch-max-wait-ms",
+        type=int,
+        help="Time in milliseconds a speech request waits for others to join its batch.",
+        default=10,
+    )
+
+    group = parser_server.add_argument_group("STT settings")
+    group.add_argument(
+        "--stt-cpu-threads",
+        type=int,
+        help="Intra-op threads per faster-whisper worker on CPU. Default is derived from the available cores, cgroup quota aware.",
+        default=0,
+    )
+    group.add_argument(
+        "--stt-num-workers",
+        type=int,
+        help="Number of faster-whisper workers, i.e. transcriptions running in parallel. Default is derived from the available cores.",
+        default=0,
+    )
+    group.add_argument(
+        "--stt-compute-type",
+        type=str,
+        help="CTranslate2 compute type of faster-whisper, e.g. int8, int8_float16, float16. Default is int8 on CPU and the model default otherwise.",
+    )
+    group.add_argument(
+        "--stt-autotune",
+        action="store_true",
+        help="Measure the throughput of a few thread and worker layouts when loading faster-whisper on CPU and keep the best.",
+        default=False,
+    )
+    group.add_argument(
+        "--stt-window-seconds",
+        type=float,
+        help="Length of the windows faster-whisper transcribes audio in, decoded incrementally so that memory stays constant for long recordings. 0 decodes the whole audio at once. Windows change the segment boundaries of recordings longer than one window. Default is 0, 600 suits multi-hour recordings.",
+        default=0,
+    )
+
     logger.info("Setting up start command.")
     parser_server.set_defaults(func=run)
 
@@ -93,6 +301,7 @@ def run(args: argparse.Namespace):
         cfg = parse_args(args)
         setup_logging(cfg.debug)
         preconfigure_faster_whisper_env(cfg)
+        setup_resources(cfg)
 
         logger.info("Starting with arguments: %s", args._get_kwargs())
 
@@ -119,10 +328,44 @@ def parse_args(args: argparse.Namespace) -> Config:
     cfg.debug = args.debug
     cfg.host = args.host
     cfg.port = args.port
+    cfg.capture_file = args.capture_file
+    cfg.capture_payload_sample_rate = args.capture_payload_sample_rate
+    cfg.trace_file = args.trace_file
+    cfg.otlp_endpoint = args.otlp_endpoint
+    cfg.debug_token = args.debug_token
+    cfg.memory_limit = args.memory_limit
+    cfg.cpu_cores = args.cpu_cores
+    cfg.numa_node = args.numa_node
+    cfg.inference_workers = args.inference_workers
+    cfg.pin_workers = args.pin_workers
+    cfg.transcription_cache_memory = args.transcription_cache_memory
+    cfg.transcription_cache_disk = args.transcription_cache_disk
+    cfg.transcription_cache_ttl = args.transcription_cache_ttl
+    cfg.max_upload_size = args.max_upload_size
+    cfg.upload_spool_size = args.upload_spool_size
+    cfg.singleflight = not args.disable_singleflight
+    cfg.fair_scheduling = args.fair_scheduling
+    cfg.interactive_reserved_slots = args.interactive_reserved_slots
+    cfg.tenant_weights = args.tenant_weights
+    cfg.warmup = not args.disable_warmup
+    cfg.precision = args.precision
+    cfg.jit = args.jit
     cfg.device = args.device
     cfg.model = args.model
     cfg.huggingface_repo_id = args.huggingface_repo_id
     cfg.model_scope_model_id = args.model_scope_model_id
+    cfg.synthetic_backend = args.synthetic_backend
+    cfg.synthetic_rtf = args.synthetic_rtf
+    cfg.tts_segment_max_chars = args.tts_segment_max_chars
+    cfg.tts_segment_workers = args.tts_segment_workers
+    cfg.tts_crossfade_ms = args.tts_crossfade_ms
+    cfg.tts_max_batch_size = args.tts_max_batch_size
+    cfg.tts_batch_max_wait_ms = args.tts_batch_max_wait_ms
+    cfg.stt_cpu_threads = args.stt_cpu_threads
+    cfg.stt_num_workers = args.stt_num_workers
+    cfg.stt_compute_type = args.stt_compute_type
+    cfg.stt_autotune = args.stt_autotune
+    cfg.stt_window_seconds = args.stt_window_seconds
     cfg.data_dir = args.data_dir or get_data_dir()
     cfg.cache_dir = os.path.join(cfg.data_dir, "cache")
 
@@ -136,9 +379,23 @@ def validate_args(args: argparse.Namespace):
         args.model is None
         and args.huggingface_repo_id is None
         and args.model_scope_model_id is None
+        and args.synthetic_backend is None
     ):
         raise Exception(
-            "One of model, huggingface-repo-id or model-scope-model-id is required."
+            "One of model, huggingface-repo-id, model-scope-model-id or synthetic-backend is required."
+        )
+
+    validate_precision(args.precision, args.device)
+    if args.jit and args.precision not in (None, "fp32"):
+        raise Exception("jit requires fp32 precision")
+    if args.interactive_reserved_slots < 0:
+        raise Exception("interactive-reserved-slots must not be negative")
+    if args.stt_window_seconds != 0 and args.stt_window_seconds < 60:
+        raise Exception("stt-window-seconds must be 0 or at least 60")
+    if args.model is not None and is_transformers_whisper(args.model):
+        raise Exception(
+            f"{args.model} is a Transformers Whisper checkpoint, convert it with "
+            f"`vox-box convert {args.model}` and serve the converted model"
         )
 
 
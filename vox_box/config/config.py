@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Config:
@@ -10,6 +10,72 @@ class Config:
         host: Host to bind the server to.
         port: Port to bind the server to.
         model: Model path.
+        tts_segment_max_chars: Split speech inputs longer than this into
+            sentence segments synthesized in parallel, 0 disables it.
+            Opt-in, since it changes the audio of long inputs.
+        tts_segment_workers: Number of segments synthesized concurrently.
+        tts_crossfade_ms: Crossfade duration over the joins between segments.
+        tts_max_batch_size: Maximum number of concurrent speech requests
+            generated as one batch by backends supporting it, 1 disables it.
+        tts_batch_max_wait_ms: Time a speech request waits for others to
+            join its batch.
+        stt_cpu_threads: Intra-op threads per faster-whisper worker on CPU,
+            0 derives it from the available cores.
+        stt_num_workers: Number of faster-whisper workers, i.e. transcriptions
+            running in parallel, 0 derives it from the available cores.
+        stt_compute_type: CTranslate2 compute type of faster-whisper, None
+            uses int8 on CPU and the model default otherwise.
+        stt_autotune: Measure the throughput of a few thread and worker
+            layouts when loading faster-whisper on CPU and keep the best.
+        stt_window_seconds: Length of the windows faster-whisper transcribes
+            audio in, decoded and resampled incrementally so that memory
+            doesn't grow with the audio length, 0 decodes the whole audio
+            at once. Opt-in, as windows change the segmentation of long
+            audio.
+        synthetic_backend: Serve a deterministic synthetic `tts` or `stt`
+            backend instead of a model, for benchmarking.
+        synthetic_rtf: Simulated real time factor of the synthetic backend.
+        capture_file: Record request metadata of the audio APIs to this JSONL
+            trace, for replay.
+        capture_payload_sample_rate: Fraction of requests whose payload is
+            stored along with the trace.
+        trace_file: Append OTLP/JSON request traces to this file.
+        otlp_endpoint: OTLP/HTTP collector traces endpoint to export request
+            traces to.
+        debug_token: Bearer token enabling the /debug endpoints.
+        precision: Inference precision of the torch TTS backends, fp32, bf16
+            autocast or dynamic int8 quantization of the Linear layers,
+            None keeps the backend default.
+        jit: Export the CosyVoice LLM and flow encoder to TorchScript on the
+            first start and run inference through the cached graphs.
+        warmup: Run synthetic requests through the backend when loading it,
+            /health reports ready once they are done.
+        cpu_cores: Number of CPUs the process may use, 0 uses all available.
+        numa_node: Restrict the process to the CPUs of this NUMA node.
+        inference_workers: Number of requests running inference in
+            parallel, each with an equal share of the CPUs as intra-op
+            threads, 0 derives it from the CPUs. Requests are only bounded
+            to the workers when this, cpu_cores or pin_workers is set.
+        pin_workers: Pin every inference worker thread to its own CPUs.
+        transcription_cache_memory: Size in bytes of the in-memory cache of
+            transcription results, keyed by audio content and parameters.
+        transcription_cache_disk: Size in bytes of the on-disk cache of
+            transcription results under data_dir, 0 disables it.
+        transcription_cache_ttl: Seconds a cached transcription is served,
+            0 keeps it until evicted.
+        max_upload_size: Size limit in bytes of a transcription upload.
+        upload_spool_size: Size in bytes up to which an upload is kept in
+            memory, larger ones are spooled to a file under data_dir.
+        singleflight: Let identical concurrent speech and transcription
+            requests share one computation.
+        fair_scheduling: Queue inference per tenant with weighted fair
+            queuing, in an interactive and a batch priority lane.
+        interactive_reserved_slots: Inference slots batch requests may not
+            take, kept free for interactive requests.
+        tenant_weights: Share of the slots of each tenant relative to the
+            others of its lane, tenants not listed weigh 1.
+        memory_limit: Reject audio API requests with 503 when the projected
+            process memory in bytes would exceed it.
     """
 
     # Common options
@@ -20,12 +86,50 @@ class Config:
     port: Optional[int] = None
     data_dir: Optional[str] = None
     cache_dir: Optional[str] = None
+    capture_file: Optional[str] = None
+    capture_payload_sample_rate: float = 0.0
+    trace_file: Optional[str] = None
+    otlp_endpoint: Optional[str] = None
+    debug_token: Optional[str] = None
+    memory_limit: Optional[int] = None
+    cpu_cores: int = 0
+    numa_node: Optional[int] = None
+    inference_workers: int = 0
+    pin_workers: bool = False
+    transcription_cache_memory: int = 64 * 1024**2
+    transcription_cache_disk: int = 0
+    transcription_cache_ttl: int = 24 * 3600
+    max_upload_size: int = 1024**3
+    upload_spool_size: int = 1024**2
+    singleflight: bool = True
+    fair_scheduling: bool = False
+    interactive_reserved_slots: int = 1
+    tenant_weights: Optional[Dict[str, float]] = None
 
     # Model options
     model: Optional[str] = None
     device: Optional[str] = "cpu"
     huggingface_repo_id: Optional[str] = None
     model_scope_model_id: Optional[str] = None
+    synthetic_backend: Optional[str] = None
+    synthetic_rtf: float = 0.0
+    warmup: bool = True
+    precision: Optional[str] = None
+    jit: bool = False
+
+    # TTS options
+    tts_segment_max_chars: int = 0
+    tts_segment_workers: int = 2
+    tts_crossfade_ms: int = 20
+    tts_max_batch_size: int = 8
+    tts_batch_max_wait_ms: int = 10
+
+    # STT options
+    stt_cpu_threads: int = 0
+    stt_num_workers: int = 0
+    stt_compute_type: Optional[str] = None
+    stt_autotune: bool = False
+    stt_window_seconds: float = 0
 
 
 class BackendEnum(str, Enum):
@@ -34,6 +138,7 @@ class BackendEnum(str, Enum):
     DIA = "Dia"
     FASTER_WHISPER = "FasterWhisper"
     FUN_ASR = "FunASR"
+    SYNTHETIC = "Synthetic"
 
 
 class TaskTypeEnum(str, Enum):
@@ -3,6 +3,11 @@ import signal
 import sys
 
 from vox_box.cmd import setup_start_cmd
+from vox_box.cmd.bench import setup_bench_cmd
+from vox_box.cmd.bench_audio import setup_bench_audio_cmd
+from vox_box.cmd.bench_precision import setup_bench_precision_cmd
+from vox_box.cmd.convert import setup_convert_cmd
+from vox_box.cmd.replay import setup_replay_cmd
 from vox_box.cmd.version import setup_version_cmd
 
 
@@ -26,6 +31,11 @@ def main():
     subparsers = parser.add_subparsers(help="sub-command help")
 
     setup_start_cmd(subparsers)
+    setup_bench_cmd(subparsers)
+    setup_bench_audio_cmd(subparsers)
+    setup_bench_precision_cmd(subparsers)
+    setup_convert_cmd(subparsers)
+    setup_replay_cmd(subparsers)
     setup_version_cmd(subparsers)
 
     args = parser.parse_args()
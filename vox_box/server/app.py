@@ -4,7 +4,17 @@ from fastapi.responses import JSONResponse
 import httpx
 
 from vox_box import __version__
+from vox_box.server.cancellation import (
+    CancellationMiddleware,
+    request_cancelled_handler,
+)
+from vox_box.server.capture import capture_middleware
+from vox_box.server.debug import debug_router
+from vox_box.server.memory import memory_middleware
 from vox_box.server.routers import router
+from vox_box.server.scheduler import scheduling_middleware
+from vox_box.server.tracing import tracing_middleware
+from vox_box.utils.cancellation import RequestCancelled
 
 
 @asynccontextmanager
@@ -21,6 +31,14 @@ app = FastAPI(
     version=__version__,
 )
 app.include_router(router)
+app.include_router(debug_router)
+app.middleware("http")(scheduling_middleware)
+app.middleware("http")(capture_middleware)
+app.middleware("http")(memory_middleware)
+app.middleware("http")(tracing_middleware)
+# Outermost, so the cancellation token is in the context of every request.
+app.add_middleware(CancellationMiddleware)
+app.add_exception_handler(RequestCancelled, request_cancelled_handler)
 
 
 @app.exception_handler(404)
@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Sequence
+
+from pydantic import BaseModel
+
+from vox_box.backends.tts.base import TTSBackend
+from vox_box.utils.archive import ArchiveStreamWriter
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechBatchItem(BaseModel):
+    input: str
+    voice: str
+    response_format: str = "mp3"
+    speed: float = 1.0
+
+
+def bucket_by_length(
+    items: Sequence[SpeechBatchItem], max_batch_size: int
+) -> List[List[int]]:
+    """Group item indices into buckets that can be generated as one batch.
+
+    Items in a bucket share voice, speed and response format, and are sorted
+    by input length so padding inside a batch stays small. Buckets holding the
+    shortest inputs come first so their results can be streamed early.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for index, item in enumerate(items):
+        key = (item.voice, item.speed, item.response_format)
+        groups.setdefault(key, []).append(index)
+
+    buckets = []
+    for indices in groups.values():
+        indices.sort(key=lambda i: len(items[i].input))
+        for start in range(0, len(indices), max_batch_size):
+            buckets.append(indices[start : start + max_batch_size])
+
+    buckets.sort(key=lambda bucket: len(items[bucket[-1]].input))
+    return buckets
+
+
+async def stream_speech_batch(
+    model_instance: TTSBackend,
+    items: Sequence[SpeechBatchItem],
+    buckets: List[List[int]],
+    writer: ArchiveStreamWriter,
+    run: Callable[[Callable], Awaitable],
+    media_type: Callable[[str], str],
+):
+    """Synthesize all buckets concurrently and stream each result as it completes.
+
+    A `manifest.json` member listing every item, its file name or its error is
+    appended once all buckets are done.
+    """
+
+    async def synthesize(bucket: List[int]):
+        first = items[bucket[0]]
+        func = functools.partial(
+            model_instance.speech_batch,
+            [items[i].input for i in bucket],
+            first.voice,
+            first.speed,
+            first.response_format,
+        )
+        try:
+            return bucket, await run(func), None
+        except Exception as e:
+            logger.error(f"Failed to generate speech batch of {len(bucket)}, {e}")
+            return bucket, None, e
+
+    tasks = [asyncio.ensure_future(synthesize(bucket)) for bucket in buckets]
+    manifest = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            bucket, audio_files, error = await next_done
+            for n, index in enumerate(bucket):
+                item = items[index]
+                entry = {
+                    "index": index,
+                    "voice": item.voice,
+                    "response_format": item.response_format,
+                }
+                if error is not None:
+                    entry["error"] = str(error)
+                    manifest.append(entry)
+                    continue
+
+                audio_file = audio_files[n]
+                name = f"{index:05d}{os.path.splitext(audio_file)[1]}"
+                with open(audio_file, "rb") as f:
+                    data = f.read()
+                os.remove(audio_file)
+
+                entry["file"] = name
+                manifest.append(entry)
+                yield writer.add(name, data, media_type(item.response_format))
+
+        manifest.sort(key=lambda entry: entry["index"])
+        yield writer.add(
+            "manifest.json",
+            json.dumps(manifest, ensure_ascii=False).encode("utf-8"),
+            "application/json",
+        )
+        yield writer.close()
+    finally:
+        for task in tasks:
+            task.cancel()
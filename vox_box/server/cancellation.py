@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from vox_box.utils.cancellation import (
+    DEADLINE_EXCEEDED,
+    DISCONNECTED,
+    CancellationToken,
+    RequestCancelled,
+    use_token,
+)
+
+logger = logging.getLogger(__name__)
+
+# Status of a request abandoned by its client, as in nginx.
+CLIENT_CLOSED_REQUEST = 499
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Parse an X-Request-Deadline as Unix seconds.
+
+    Accepts Unix seconds, e.g. 1735689600.5, or an RFC 3339 timestamp, e.g.
+    2025-01-01T00:00:00Z.
+    """
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        deadline = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid X-Request-Deadline: {value}")
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return deadline.timestamp()
+
+
+class CancellationMiddleware:
+    """Cancel the audio API requests abandoned by their client.
+
+    Every request gets a cancellation token, cancelled when the client
+    disconnects, or when the deadline of the X-Request-Deadline header passes.
+    Requests whose deadline has already passed are rejected with 504.
+
+    Disconnects are only reported by the server through `receive`, which
+    nobody calls once the body is read, so the middleware keeps listening
+    from then on.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith("/v1/audio/"):
+            await self.app(scope, receive, send)
+            return
+
+        remaining, rejection = check_deadline(scope)
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+
+        token = CancellationToken()
+        timer = None
+        if remaining is not None:
+            timer = asyncio.get_running_loop().call_later(
+                remaining, token.cancel, DEADLINE_EXCEEDED
+            )
+
+        listener = DisconnectListener(receive, token)
+        try:
+            with use_token(token):
+                await self.app(scope, listener.receive, send)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            listener.close()
+
+
+def check_deadline(scope: Scope) -> Tuple[Optional[float], Optional[JSONResponse]]:
+    """Return the seconds left before the X-Request-Deadline of the request,
+    or the response rejecting it if the header is invalid or the deadline has
+    passed."""
+    try:
+        deadline = parse_deadline(Headers(scope=scope).get("x-request-deadline"))
+    except ValueError as e:
+        return None, JSONResponse(status_code=400, content={"detail": str(e)})
+
+    if deadline is None:
+        return None, None
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return None, JSONResponse(
+            status_code=504, content={"detail": "Deadline exceeded"}
+        )
+    return remaining, None
+
+
+class DisconnectListener:
+    """Wrap `receive` to cancel `token` when the client disconnects.
+
+    Once the body is read, a task keeps receiving to catch the disconnect,
+    and later calls to `receive` wait for it.
+    """
+
+    def __init__(self, receive: Receive, token: CancellationToken):
+        self._receive = receive
+        self._token = token
+        self._task: Optional[asyncio.Future] = None
+
+    async def receive(self) -> Message:
+        if self._task is not None:
+            return await asyncio.shield(self._task)
+
+        message = await self._receive()
+        if message["type"] == "http.disconnect":
+            self._token.cancel(DISCONNECTED)
+        elif not message.get("more_body", False):
+            self._task = asyncio.ensure_future(self._listen())
+        return message
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _listen(self) -> Message:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self._token.cancel(DISCONNECTED)
+                return message
+
+
+async def request_cancelled_handler(request: Request, exc: RequestCancelled):
+    logger.info(f"Stopped {request.method} {request.url.path}, {exc.reason}")
+    status_code = 504 if exc.reason == DEADLINE_EXCEEDED else CLIENT_CLOSED_REQUEST
+    return JSONResponse(status_code=status_code, content={"detail": str(exc)})
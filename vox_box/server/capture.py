@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+
+from fastapi import Request
+
+from vox_box.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_recorder = None
+
+
+class TraceRecorder:
+    """Append request metadata to a JSONL trace for later replay.
+
+    Request payloads are only stored for a random sample of requests, each in
+    its own file under `payload_dir`, referenced by the trace record.
+
+    `submit` hands records to a background writer thread, so that requests
+    don't wait for the disk. Records are dropped while `max_pending` are
+    waiting to be written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        payload_sample_rate: float = 0.0,
+        payload_dir: Optional[str] = None,
+        max_pending: int = 1024,
+    ):
+        self._path = path
+        self._payload_sample_rate = payload_sample_rate
+        self._payload_dir = payload_dir or f"{path}.payloads"
+        self._lock = threading.Lock()
+        self._count = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._writer: Optional[threading.Thread] = None
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if payload_sample_rate > 0:
+            os.makedirs(self._payload_dir, exist_ok=True)
+
+    def should_sample_payload(self) -> bool:
+        return random.random() < self._payload_sample_rate
+
+    def record(self, record: Dict, payload: Optional[bytes] = None):
+        with self._lock:
+            self._count += 1
+            if payload is not None:
+                payload_name = f"{self._count:08d}.bin"
+                with open(os.path.join(self._payload_dir, payload_name), "wb") as f:
+                    f.write(payload)
+                record["payload"] = os.path.join(
+                    os.path.basename(self._payload_dir), payload_name
+                )
+
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def submit(self, record: Dict, payload: Optional[bytes] = None):
+        """Record in the background."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="trace-recorder", daemon=True
+                )
+                self._writer.start()
+        try:
+            self._queue.put_nowait((record, payload))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Dropped a captured request, {self.dropped} so far")
+
+    def flush(self):
+        """Wait until the submitted records are written."""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            record, payload = self._queue.get()
+            try:
+                self.record(record, payload)
+            except Exception as e:
+                logger.error(f"Failed to capture request, {e}")
+            finally:
+                self._queue.task_done()
+
+
+def setup_capture(cfg: Config):
+    global _recorder
+
+    if cfg.capture_file:
+        _recorder = TraceRecorder(
+            cfg.capture_file,
+            payload_sample_rate=cfg.capture_payload_sample_rate,
+        )
+        logger.info(f"Capturing request trace to {cfg.capture_file}")
+
+
+def get_recorder() -> Optional[TraceRecorder]:
+    global _recorder
+    return _recorder
+
+
+async def capture_request(
+    request: Request,
+    params: Dict,
+    payload: Optional[Union[bytes, Callable[[], bytes]]] = None,
+):
+    """Attach request parameters, and a sampled payload, to the trace record.
+
+    A callable payload is only read when sampled, in the default executor.
+    """
+    recorder = get_recorder()
+    if recorder is None:
+        return
+
+    request.state.capture_params = params
+    if payload is not None and recorder.should_sample_payload():
+        if callable(payload):
+            loop = asyncio.get_event_loop()
+            payload = await loop.run_in_executor(None, payload)
+        request.state.capture_payload = payload
+
+
+async def capture_middleware(request: Request, call_next):
+    recorder = get_recorder()
+    if recorder is None or not request.url.path.startswith("/v1/audio/"):
+        return await call_next(request)
+
+    ts = time.time()
+    start = time.perf_counter()
+    response = await call_next(request)
+    latency = time.perf_counter() - start
+
+    record = {
+        "ts": ts,
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "latency": latency,
+        "content_type": request.headers.get("content-type"),
+        "content_length": int(request.headers.get("content-length", 0)),
+        "params": getattr(request.state, "capture_params", {}),
+    }
+    recorder.submit(record, getattr(request.state, "capture_payload", None))
+    return response
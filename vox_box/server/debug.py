@@ -0,0 +1,159 @@
+import asyncio
+import hmac
+import logging
+import os
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+
+from vox_box.config.config import Config
+from vox_box.server.memory import get_memory_tracker
+from vox_box.server.model import get_model_instance
+from vox_box.utils.profiling import (
+    StackSampler,
+    TorchProfiler,
+    profile_allocations,
+)
+
+logger = logging.getLogger(__name__)
+
+_debug_token = None
+_profile_lock = asyncio.Lock()
+
+MAX_PROFILE_SECONDS = 300
+
+
+def setup_debug(cfg: Config):
+    global _debug_token
+
+    _debug_token = cfg.debug_token
+    if _debug_token:
+        logger.info("Debug endpoints are enabled")
+
+
+async def verify_debug_token(authorization: Optional[str] = Header(None)):
+    """Require `Authorization: Bearer <debug token>`.
+
+    The debug endpoints do not exist unless a token is configured.
+    """
+    if not _debug_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode(), _debug_token.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(verify_debug_token)])
+
+
+@debug_router.get("/profile")
+async def profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    mode: str = Query("cpu", pattern="^(cpu|torch|alloc)$"),
+    interval: float = Query(0.01, ge=0.001, le=1),
+):
+    """Profile the live server over a window of `seconds`.
+
+    - cpu: sampled Python stacks of all threads, as folded stacks.
+    - torch: torch profiler trace of the operators of the inference calls run
+      in the window, in the Chrome trace format. The X-Torch-Ops header
+      counts the aten operators, 0 if no inference ran.
+    - alloc: tracemalloc statistics of the allocations made in the window.
+
+    Only one profile runs at a time.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        logger.info(f"Profiling {mode} for {seconds}s")
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        if mode == "cpu":
+            sampler = StackSampler(interval)
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                sampler.stop()
+            logger.info(f"Collected {sampler.sample_count} stack samples")
+            return PlainTextResponse(
+                sampler.folded(),
+                headers=_attachment(f"vox-box-cpu-{timestamp}.folded"),
+            )
+
+        if mode == "alloc":
+            loop = asyncio.get_event_loop()
+            report = await loop.run_in_executor(None, profile_allocations, seconds)
+            return PlainTextResponse(
+                report, headers=_attachment(f"vox-box-alloc-{timestamp}.txt")
+            )
+
+        trace_file, op_count = await profile_torch(seconds)
+        return FileResponse(
+            trace_file,
+            media_type="application/json",
+            filename=f"vox-box-torch-{timestamp}.json",
+            headers={"X-Torch-Ops": str(op_count)},
+            background=BackgroundTask(os.remove, trace_file),
+        )
+
+
+@debug_router.get("/memory")
+async def memory():
+    """Current and high-water memory of the process and per route."""
+    tracker = get_memory_tracker()
+    if tracker is None:
+        raise HTTPException(status_code=503, detail="Memory tracking is disabled")
+
+    model_instance = get_model_instance()
+    return {
+        "backend": (
+            model_instance.model_info().get("backend_framework")
+            if model_instance is not None
+            else None
+        ),
+        **tracker.snapshot(),
+    }
+
+
+async def profile_torch(seconds: float) -> Tuple[str, int]:
+    try:
+        import torch
+        from torch.profiler import ProfilerActivity
+    except ImportError:
+        raise HTTPException(status_code=400, detail="torch is not installed")
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+
+    profiler = TorchProfiler(activities)
+    with profiler.active():
+        await asyncio.sleep(seconds)
+
+    if profiler.op_count == 0:
+        logger.warning(
+            f"Torch profile of {profiler.calls} inference calls has no aten operators"
+        )
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        trace_file = f.name
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, profiler.export_chrome_trace, trace_file)
+    logger.info(
+        f"Exported torch profile of {profiler.calls} inference calls, "
+        f"{profiler.op_count} aten operators, {profiler.skipped} overlapping calls "
+        f"not profiled"
+    )
+    return trace_file, profiler.op_count
+
+
+def _attachment(filename: str):
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
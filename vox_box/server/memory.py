@@ -0,0 +1,402 @@
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from vox_box.config.config import Config
+from vox_box.utils.memory import (
+    get_peak_rss,
+    get_rss,
+    get_torch_memory,
+    reset_torch_peak_memory,
+)
+
+logger = logging.getLogger(__name__)
+
+_tracker = None
+
+_current_reservation: ContextVar[Optional["Reservation"]] = ContextVar(
+    "vox_box_memory_reservation", default=None
+)
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+@dataclass
+class Reservation:
+    route: str
+    units: int
+    expected: int
+    rss_start: int
+    rss_peak: int
+    torch_start: int = 0
+    # RSS around the inference calls, counted from the start of the first
+    # call running.
+    inference_calls: int = 0
+    inference_start: int = 0
+    inference_peak: int = 0
+    inference_peak_delta: int = 0
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    rejected: int = 0
+    rss_delta_last: int = 0
+    rss_delta_max: int = 0
+    peak_delta_max: int = 0
+    torch_peak_max: int = 0
+    inference_peak_delta_max: int = 0
+    output_bytes_total: int = 0
+    output_bytes_max: int = 0
+    # (request size, peak RSS growth) of the recent requests.
+    samples: Deque[Tuple[int, int]] = field(default_factory=lambda: deque(maxlen=100))
+
+    def expected(self, units: int) -> int:
+        """Project the peak RSS growth of a request of `units` bytes.
+
+        Fits a line through the recent requests, plus one standard deviation
+        of the residuals as margin.
+        """
+        if not self.samples:
+            return 0
+
+        xs = np.array([x for x, _ in self.samples], dtype=np.float64)
+        ys = np.array([y for _, y in self.samples], dtype=np.float64)
+        if len(self.samples) < 5 or np.ptp(xs) == 0:
+            return int(ys.max())
+
+        slope, intercept = np.polyfit(xs, ys, 1)
+        slope = max(slope, 0.0)
+        residuals = ys - (intercept + slope * xs)
+        return max(int(intercept + slope * units + residuals.std()), 0)
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "rss_delta_last": self.rss_delta_last,
+            "rss_delta_max": self.rss_delta_max,
+            "peak_delta_max": self.peak_delta_max,
+            "torch_peak_max": self.torch_peak_max,
+            "inference_peak_delta_max": self.inference_peak_delta_max,
+            "output_bytes_total": self.output_bytes_total,
+            "output_bytes_max": self.output_bytes_max,
+        }
+
+
+class MemoryTracker:
+    """Per-request memory accounting and admission against a memory ceiling.
+
+    A sampler thread polls the process RSS so that the peak of each request,
+    not only its RSS at completion, is known. Overlapping requests share the
+    process, so their deltas include each other's allocations, the figures
+    are exact only for requests served alone.
+
+    torch only reports allocator statistics for CUDA, so the RSS growth
+    during the inference calls of a request is tracked as well. On CPU it
+    is the closest figure to the allocator peak, covering the allocations
+    of torch, numpy and native libraries but not the request handling.
+
+    With a `limit`, a request is rejected when the current RSS, plus the
+    growth still expected from the requests in flight, plus the growth
+    projected for the request from its size, would exceed it.
+    """
+
+    def __init__(self, limit: Optional[int] = None, interval: float = 0.05):
+        self._limit = limit
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._routes: Dict[str, RouteStats] = {}
+        self._active: List[Reservation] = []
+        self._rss = get_rss() or 0
+        self._rss_peak = self._rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="memory-sampler", daemon=True
+        )
+
+    @property
+    def limit(self) -> Optional[int]:
+        return self._limit
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def admit(self, route: str, units: int) -> Reservation:
+        rss = get_rss() or 0
+        with self._lock:
+            stats = self._routes.setdefault(route, RouteStats())
+            expected = stats.expected(units)
+            reserved = self._reserved()
+            if self._limit and rss + reserved + expected > self._limit:
+                stats.rejected += 1
+                raise MemoryLimitExceeded(
+                    f"Projected memory {(rss + reserved + expected) / 1024**2:.0f}MiB "
+                    f"exceeds the limit of {self._limit / 1024**2:.0f}MiB"
+                )
+
+            if not self._active:
+                reset_torch_peak_memory()
+            reservation = Reservation(
+                route,
+                units,
+                expected,
+                rss,
+                rss,
+                get_torch_memory().get("allocated", 0),
+            )
+            self._active.append(reservation)
+            return reservation
+
+    def release(self, reservation: Reservation, output_bytes: int):
+        rss = get_rss() or 0
+        torch_memory = get_torch_memory()
+        with self._lock:
+            self._active.remove(reservation)
+            rss_delta = rss - reservation.rss_start
+            peak_delta = max(reservation.rss_peak, rss) - reservation.rss_start
+            torch_peak = max(
+                torch_memory.get("peak_allocated", 0) - reservation.torch_start, 0
+            )
+
+            stats = self._routes[reservation.route]
+            stats.requests += 1
+            stats.rss_delta_last = rss_delta
+            stats.rss_delta_max = max(stats.rss_delta_max, rss_delta)
+            stats.peak_delta_max = max(stats.peak_delta_max, peak_delta)
+            stats.torch_peak_max = max(stats.torch_peak_max, torch_peak)
+            stats.inference_peak_delta_max = max(
+                stats.inference_peak_delta_max, reservation.inference_peak_delta
+            )
+            stats.output_bytes_total += output_bytes
+            stats.output_bytes_max = max(stats.output_bytes_max, output_bytes)
+            stats.samples.append((reservation.units, max(peak_delta, 0)))
+
+        logger.debug(
+            f"Request {reservation.route} used rss_delta={rss_delta} "
+            f"peak_delta={peak_delta} torch_peak={torch_peak} "
+            f"inference_peak_delta={reservation.inference_peak_delta} "
+            f"output={output_bytes}"
+        )
+
+    def inference_started(self, reservation: Reservation):
+        rss = get_rss() or 0
+        with self._lock:
+            if reservation.inference_calls == 0:
+                reservation.inference_start = rss
+                reservation.inference_peak = rss
+            reservation.inference_calls += 1
+
+    def inference_finished(self, reservation: Reservation):
+        rss = get_rss() or 0
+        with self._lock:
+            reservation.inference_calls -= 1
+            peak_delta = (
+                max(reservation.inference_peak, rss) - reservation.inference_start
+            )
+            reservation.inference_peak_delta = max(
+                reservation.inference_peak_delta, peak_delta
+            )
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "rss": self._rss,
+                "rss_peak": self._rss_peak,
+                "rss_high_water": get_peak_rss(),
+                "limit": self._limit,
+                "reserved": self._reserved(),
+                "active_requests": len(self._active),
+                "torch": get_torch_memory(),
+                "routes": {
+                    route: stats.to_dict() for route, stats in self._routes.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Format the statistics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help: str, values: List[Tuple[str, int]]):
+            lines.append(f"# HELP vox_box_{name} {help}")
+            lines.append(f"# TYPE vox_box_{name} {kind}")
+            for labels, value in values:
+                lines.append(f"vox_box_{name}{labels} {value}")
+
+        metric(
+            "resident_memory_bytes",
+            "gauge",
+            "Resident set size of the process.",
+            [("", snapshot["rss"])],
+        )
+        metric(
+            "resident_memory_peak_bytes",
+            "gauge",
+            "Highest sampled resident set size of the process.",
+            [("", snapshot["rss_peak"])],
+        )
+        if snapshot["limit"]:
+            metric(
+                "memory_limit_bytes",
+                "gauge",
+                "Memory ceiling above which requests are rejected.",
+                [("", snapshot["limit"])],
+            )
+        for key, value in snapshot["torch"].items():
+            metric(
+                f"torch_cuda_{key}_bytes",
+                "gauge",
+                f"torch CUDA allocator {key.replace('_', ' ')} memory.",
+                [("", value)],
+            )
+
+        routes = snapshot["routes"]
+        for name, kind, key, help in [
+            ("requests_total", "counter", "requests", "Completed requests."),
+            (
+                "requests_rejected_total",
+                "counter",
+                "rejected",
+                "Requests rejected by the memory limit.",
+            ),
+            (
+                "request_rss_peak_delta_max_bytes",
+                "gauge",
+                "peak_delta_max",
+                "Largest peak resident set size growth of a request.",
+            ),
+            (
+                "request_torch_peak_max_bytes",
+                "gauge",
+                "torch_peak_max",
+                "Largest torch CUDA allocator peak of a request.",
+            ),
+            (
+                "request_inference_rss_peak_delta_max_bytes",
+                "gauge",
+                "inference_peak_delta_max",
+                "Largest peak resident set size growth during the inference "
+                "calls of a request.",
+            ),
+            (
+                "response_bytes_total",
+                "counter",
+                "output_bytes_total",
+                "Bytes of the responses.",
+            ),
+        ]:
+            metric(
+                name,
+                kind,
+                help,
+                [
+                    (f'{{route="{route}"}}', stats[key])
+                    for route, stats in routes.items()
+                ],
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def _reserved(self) -> int:
+        # Growth still expected from the requests in flight, beyond what they
+        # already allocated.
+        return sum(
+            max(r.expected - (r.rss_peak - r.rss_start), 0) for r in self._active
+        )
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            rss = get_rss()
+            if rss is None:
+                continue
+
+            with self._lock:
+                self._rss = rss
+                self._rss_peak = max(self._rss_peak, rss)
+                for reservation in self._active:
+                    reservation.rss_peak = max(reservation.rss_peak, rss)
+                    if reservation.inference_calls:
+                        reservation.inference_peak = max(
+                            reservation.inference_peak, rss
+                        )
+
+
+def setup_memory(cfg: Config):
+    global _tracker
+
+    _tracker = MemoryTracker(cfg.memory_limit)
+    _tracker.start()
+    if cfg.memory_limit:
+        logger.info(f"Memory limit set to {cfg.memory_limit / 1024**2:.0f}MiB")
+
+
+def get_memory_tracker() -> Optional[MemoryTracker]:
+    global _tracker
+    return _tracker
+
+
+@contextmanager
+def track_inference():
+    """Account the RSS growth of the block to the inference of the current
+    request, a no-op outside of an audio API request."""
+    tracker = get_memory_tracker()
+    reservation = _current_reservation.get()
+    if tracker is None or reservation is None:
+        yield
+        return
+
+    tracker.inference_started(reservation)
+    try:
+        yield
+    finally:
+        tracker.inference_finished(reservation)
+
+
+async def memory_middleware(request: Request, call_next):
+    tracker = get_memory_tracker()
+    if tracker is None or not request.url.path.startswith("/v1/audio/"):
+        return await call_next(request)
+
+    units = int(request.headers.get("content-length") or 0)
+    try:
+        reservation = tracker.admit(request.url.path, units)
+    except MemoryLimitExceeded as e:
+        logger.warning(f"Rejected request {request.url.path}, {e}")
+        return JSONResponse(
+            status_code=503, content={"detail": str(e)}, headers={"Retry-After": "1"}
+        )
+
+    _current_reservation.set(reservation)
+    try:
+        response = await call_next(request)
+    except Exception:
+        tracker.release(reservation, 0)
+        raise
+
+    body_iterator = response.body_iterator
+
+    async def count_output():
+        output_bytes = 0
+        try:
+            async for chunk in body_iterator:
+                output_bytes += len(chunk)
+                yield chunk
+        finally:
+            tracker.release(reservation, output_bytes)
+
+    response.body_iterator = count_output()
+    return response
@@ -1,26 +1,48 @@
 import logging
-from typing import Union
+from typing import Optional, Union
 from vox_box.backends.stt.base import STTBackend
 from vox_box.backends.stt.faster_whisper import FasterWhisper
 from vox_box.backends.stt.funasr import FunASR
+from vox_box.backends.stt.synthetic import SyntheticSTT
 from vox_box.backends.tts.bark import Bark
 from vox_box.backends.tts.base import TTSBackend
 from vox_box.backends.tts.cosyvoice import CosyVoice
 from vox_box.backends.tts.dia import Dia
-from vox_box.config.config import BackendEnum, Config
+from vox_box.backends.tts.segmented import SegmentedSpeech
+from vox_box.backends.tts.synthetic import SyntheticTTS
+from vox_box.config.config import BackendEnum, Config, TaskTypeEnum
 from vox_box.downloader import downloaders
 from vox_box.estimator.estimate import estimate_model
 
 _instance = None
+_segmented_speech = None
 
 logger = logging.getLogger(__name__)
 
+BACKENDS = {
+    BackendEnum.FASTER_WHISPER: FasterWhisper,
+    BackendEnum.FUN_ASR: FunASR,
+    BackendEnum.BARK: Bark,
+    BackendEnum.COSY_VOICE: CosyVoice,
+    BackendEnum.DIA: Dia,
+}
+
+SYNTHETIC_BACKENDS = {
+    TaskTypeEnum.TTS: SyntheticTTS,
+    TaskTypeEnum.STT: SyntheticSTT,
+}
+
 
 class ModelInstance:
     def __init__(self, cfg: Config):
         self._cfg = cfg
         self._backend_framework = None
 
+        synthetic_backend = SYNTHETIC_BACKENDS.get(self._cfg.synthetic_backend)
+        if synthetic_backend is not None:
+            self._backend_framework = synthetic_backend(cfg)
+            return
+
         logger.info("Estimating model")
         self._estimate = estimate_model(cfg)
         logger.info("Finished estimating model")
@@ -47,20 +69,18 @@ class ModelInstance:
             except Exception as e:
                 raise Exception(f"Faild to download model, {e}")
 
+        self._backend_framework = self._create_backend()
+
+    def _create_backend(self):
         backend_framework_name = self._estimate.get("backend_framework")
-        if backend_framework_name == BackendEnum.FASTER_WHISPER:
-            self._backend_framework = FasterWhisper(cfg)
-        elif backend_framework_name == BackendEnum.FUN_ASR:
-            self._backend_framework = FunASR(cfg)
-        elif backend_framework_name == BackendEnum.BARK:
-            self._backend_framework = Bark(cfg)
-        elif backend_framework_name == BackendEnum.COSY_VOICE:
-            self._backend_framework = CosyVoice(cfg)
-        elif backend_framework_name == BackendEnum.DIA:
-            self._backend_framework = Dia(cfg)
+        backend = BACKENDS.get(backend_framework_name)
+        if backend is None:
+            return None
+        return backend(self._cfg)
 
     def run(self):
         global _instance
+        global _segmented_speech
 
         if _instance is None:
             try:
@@ -68,9 +88,25 @@ class ModelInstance:
                 _instance = self._backend_framework.load()
             except Exception as e:
                 raise Exception(f"Faild to load model, {e}")
+
+            if (
+                isinstance(_instance, TTSBackend)
+                and self._cfg.tts_segment_max_chars > 0
+            ):
+                _segmented_speech = SegmentedSpeech(
+                    _instance,
+                    max_chars=self._cfg.tts_segment_max_chars,
+                    workers=self._cfg.tts_segment_workers,
+                    crossfade_ms=self._cfg.tts_crossfade_ms,
+                )
         return _instance
 
 
 def get_model_instance() -> Union[TTSBackend, STTBackend]:
     global _instance
     return _instance
+
+
+def get_segmented_speech() -> Optional[SegmentedSpeech]:
+    global _segmented_speech
+    return _segmented_speech
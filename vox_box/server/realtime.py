@@ -0,0 +1,201 @@
+import asyncio
+import functools
+import json
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from vox_box.backends.tts.base import TTSBackend
+from vox_box.backends.tts.segmented import synthesize_segment
+from vox_box.utils.audio import to_pcm16
+from vox_box.utils.cancellation import (
+    DISCONNECTED,
+    CancellationToken,
+    RequestCancelled,
+    use_token,
+)
+from vox_box.utils.text import TextChunker
+
+logger = logging.getLogger(__name__)
+
+# Audio is sent in frames of this duration so a cancel can cut playback short.
+FRAME_MS = 200
+
+
+class SpeechSession:
+    """One full-duplex speech WebSocket connection.
+
+    Text deltas are cut into chunks by a `TextChunker`, each chunk is submitted
+    for synthesis right away, and a sender task streams the audio back in
+    order. Bumping the generation on cancel discards everything queued or in
+    flight for the previous turn, and cancels the token of its syntheses so
+    that the backend stops at its next checkpoint.
+
+    Client messages:
+        {"type": "config", "voice": ..., "speed": ...}
+        {"type": "text", "text": ...}
+        {"type": "flush"}
+        {"type": "cancel"}
+
+    Server messages:
+        {"type": "audio", "text": ..., "sample_rate": ...} followed by binary
+            16-bit mono PCM frames of that chunk
+        {"type": "done"} once all text before a flush has been sent
+        {"type": "cancelled"}
+        {"type": "error", "message": ...}
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        model_instance: TTSBackend,
+        run: Callable[[Callable], Awaitable],
+        voice: Optional[str],
+        speed: float = 1,
+    ):
+        self._websocket = websocket
+        self._model_instance = model_instance
+        self._run = run
+        self._voice = voice
+        self._speed = speed
+        self._chunker = TextChunker()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._futures: List[asyncio.Future] = []
+        self._generation = 0
+        self._token = CancellationToken()
+        self._closed = False
+
+    async def serve(self):
+        sender = asyncio.ensure_future(self._send_loop())
+        try:
+            while True:
+                event = await self._receive_event()
+                if event is not None:
+                    await self._handle(event)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            self._cancel_pending(DISCONNECTED)
+            sender.cancel()
+
+    async def _receive_event(self) -> Optional[dict]:
+        """The next JSON event, None after replying with an error."""
+        message = await self._websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+
+        text = message.get("text")
+        if text is None:
+            await self._send_error("Binary messages are not supported")
+            return None
+        try:
+            event = json.loads(text)
+        except json.JSONDecodeError:
+            await self._send_error("Invalid JSON message")
+            return None
+        if not isinstance(event, dict):
+            await self._send_error("Messages must be JSON objects")
+            return None
+        return event
+
+    async def _handle(self, event: dict):
+        event_type = event.get("type")
+        if event_type == "config":
+            await self._configure(event)
+        elif event_type == "text":
+            text = event.get("text", "")
+            if not isinstance(text, str):
+                await self._send_error("Field text must be a string")
+                return
+            for chunk in self._chunker.push(text):
+                self._enqueue(chunk)
+        elif event_type == "flush":
+            for chunk in self._chunker.flush():
+                self._enqueue(chunk)
+            self._queue.put_nowait((self._generation, None, None))
+        elif event_type == "cancel":
+            self._generation += 1
+            self._chunker.reset()
+            self._cancel_pending()
+            await self._websocket.send_json({"type": "cancelled"})
+        else:
+            await self._send_error(f"Unsupported message type: {event_type}")
+
+    async def _configure(self, event: dict):
+        voice = event.get("voice", self._voice)
+        if voice is not None and not isinstance(voice, str):
+            await self._send_error("Field voice must be a string")
+            return
+        try:
+            speed = float(event.get("speed", self._speed))
+        except (TypeError, ValueError):
+            await self._send_error(f"Invalid speed: {event.get('speed')}")
+            return
+        if speed < 0.25 or speed > 2:
+            await self._send_error("Speed must be between 0.25 and 2")
+            return
+
+        self._voice = voice
+        self._speed = speed
+
+    def _enqueue(self, chunk: str):
+        func = functools.partial(
+            synthesize_segment, self._model_instance, chunk, self._voice, self._speed
+        )
+        # The task runs the synthesis with the token of the current turn.
+        with use_token(self._token):
+            future = asyncio.ensure_future(self._run(func))
+        self._futures.append(future)
+        self._queue.put_nowait((self._generation, chunk, future))
+
+    def _cancel_pending(self, reason: str = "cancelled"):
+        self._token.cancel(reason)
+        self._token = CancellationToken()
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    async def _send_loop(self):
+        while True:
+            generation, chunk, future = await self._queue.get()
+            if future is None:
+                if generation == self._generation:
+                    await self._websocket.send_json({"type": "done"})
+                continue
+
+            result = await self._wait_chunk(future)
+            if result is not None and generation == self._generation:
+                await self._send_audio(generation, chunk, *result)
+
+    async def _wait_chunk(self, future: asyncio.Future) -> Optional[tuple]:
+        """The audio and sample rate of a chunk, None if it was cancelled or
+        failed."""
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if self._closed:
+                raise
+        except RequestCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to generate speech chunk, {e}")
+            await self._send_error(f"Failed to generate speech, {e}")
+        finally:
+            if future in self._futures:
+                self._futures.remove(future)
+        return None
+
+    async def _send_audio(self, generation: int, chunk: str, audio, sample_rate: int):
+        await self._websocket.send_json(
+            {"type": "audio", "text": chunk, "sample_rate": sample_rate}
+        )
+        frame = int(sample_rate * FRAME_MS / 1000)
+        for start in range(0, len(audio), frame):
+            if generation != self._generation:
+                break
+            await self._websocket.send_bytes(to_pcm16(audio[start : start + frame]))
+
+    async def _send_error(self, message: str):
+        await self._websocket.send_json({"type": "error", "message": message})
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from vox_box.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_transcription_cache = None
+
+
+def content_hash(data: bytes = b""):
+    """Hash of the input of a result, see `ResultCache.key`."""
+    return hashlib.blake2b(data, digest_size=16)
+
+
+class ResultCache:
+    """Two tier cache of JSON serializable results.
+
+    The memory tier is an LRU bounded by `memory_size` bytes of serialized
+    results. The optional disk tier stores one file per result under
+    `disk_dir`, bounded by `disk_size` bytes, evicting the least recently
+    written first. Memory hits are promoted from disk. Entries expire `ttl`
+    seconds after they are written, 0 keeps them until evicted.
+    """
+
+    def __init__(
+        self,
+        memory_size: int,
+        disk_dir: Optional[str] = None,
+        disk_size: int = 0,
+        ttl: float = 0,
+    ):
+        self._memory_size = memory_size
+        self._disk_dir = disk_dir if disk_size > 0 else None
+        self._disk_size = disk_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires, size, value)
+        self._memory: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> (mtime, size), in write order
+        self._disk: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._disk_bytes = 0
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+
+        if self._disk_dir is not None:
+            os.makedirs(self._disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def key(data: bytes, **params) -> str:
+        """Key of a result computed from `data` with `params`.
+
+        blake2b hashes at memory bandwidth, fast enough to run on every
+        upload.
+        """
+        return ResultCache.key_from_hash(content_hash(data), **params)
+
+    @staticmethod
+    def key_from_hash(data_hash, **params) -> str:
+        """Key of a result computed from the data hashed by `data_hash`, a
+        `content_hash()` fed incrementally, with `params`."""
+        h = data_hash.copy()
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, size, value = entry
+                if expires and expires < now:
+                    self._pop_memory(key)
+                else:
+                    self._memory.move_to_end(key)
+                    self._hits["memory"] += 1
+                    return value
+
+        value, written = self._get_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits["disk"] += 1
+        # Keep the expiry of the disk entry.
+        self._put_memory(key, value, len(json.dumps(value)), written)
+        return value
+
+    def put(self, key: str, value: Any):
+        data = json.dumps(value)
+        now = time.time()
+        self._put_memory(key, value, len(data), now)
+        if self._disk_dir is not None:
+            self._put_disk(key, data, now)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": dict(self._hits),
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def prometheus(self, name: str) -> str:
+        stats = self.stats()
+        lines = [
+            f"# HELP vox_box_{name}_cache_hits_total Cache hits per tier.",
+            f"# TYPE vox_box_{name}_cache_hits_total counter",
+        ]
+        for tier, hits in stats["hits"].items():
+            lines.append(f'vox_box_{name}_cache_hits_total{{tier="{tier}"}} {hits}')
+        lines += [
+            f"# HELP vox_box_{name}_cache_misses_total Cache misses.",
+            f"# TYPE vox_box_{name}_cache_misses_total counter",
+            f"vox_box_{name}_cache_misses_total {stats['misses']}",
+            f"# HELP vox_box_{name}_cache_bytes Size of the cached results per tier.",
+            f"# TYPE vox_box_{name}_cache_bytes gauge",
+            f'vox_box_{name}_cache_bytes{{tier="memory"}} {stats["memory_bytes"]}',
+            f'vox_box_{name}_cache_bytes{{tier="disk"}} {stats["disk_bytes"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _expires(self, written: float) -> float:
+        return written + self._ttl if self._ttl > 0 else 0
+
+    def _put_memory(self, key: str, value: Any, size: int, written: float):
+        if size > self._memory_size:
+            return
+
+        with self._lock:
+            if key in self._memory:
+                self._pop_memory(key)
+            self._memory[key] = (self._expires(written), size, value)
+            self._memory_bytes += size
+            while self._memory_bytes > self._memory_size:
+                self._pop_memory(next(iter(self._memory)))
+
+    def _pop_memory(self, key: str):
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._disk_dir, key[:2], f"{key}.json")
+
+    def _get_disk(self, key: str, now: float) -> Tuple[Optional[Any], float]:
+        """Return the value and write time of a disk entry."""
+        if self._disk_dir is None:
+            return None, 0
+
+        with self._lock:
+            entry = self._disk.get(key)
+        if entry is None:
+            return None, 0
+
+        mtime, _ = entry
+        if self._ttl > 0 and mtime + self._ttl < now:
+            self._remove_disk(key)
+            return None, 0
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f), mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {key}, {e}")
+            self._remove_disk(key)
+            return None, 0
+
+    def _put_disk(self, key: str, data: str, now: float):
+        size = len(data)
+        if size > self._disk_size:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write atomically, readers may open the entry concurrently.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(path), delete=False, encoding="utf-8"
+        ) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)[1]
+            self._disk[key] = (now, size)
+            self._disk_bytes += size
+            while self._disk_bytes > self._disk_size:
+                evicted_key, (_, evicted_size) = self._disk.popitem(last=False)
+                self._disk_bytes -= evicted_size
+                evicted.append(evicted_key)
+
+        for evicted_key in evicted:
+            self._unlink(evicted_key)
+
+    def _remove_disk(self, key: str):
+        with self._lock:
+            entry = self._disk.pop(key, None)
+            if entry is None:
+                return
+            self._disk_bytes -= entry[1]
+        self._unlink(key)
+
+    def _unlink(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _load_disk_index(self):
+        """Index the entries written by previous processes."""
+        entries = []
+        for root, _, files in os.walk(self._disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, name[: -len(".json")], stat.st_size))
+
+        for mtime, key, size in sorted(entries):
+            self._disk[key] = (mtime, size)
+            self._disk_bytes += size
+        logger.info(
+            f"Indexed {len(self._disk)} cached results, {self._disk_bytes} bytes, in {self._disk_dir}"
+        )
+
+
+def setup_transcription_cache(cfg: Config):
+    global _transcription_cache
+
+    if cfg.transcription_cache_memory <= 0 and cfg.transcription_cache_disk <= 0:
+        return
+
+    _transcription_cache = ResultCache(
+        memory_size=cfg.transcription_cache_memory,
+        disk_dir=(
+            os.path.join(cfg.data_dir, "transcription_cache") if cfg.data_dir else None
+        ),
+        disk_size=cfg.transcription_cache_disk,
+        ttl=cfg.transcription_cache_ttl,
+    )
+
+
+def get_transcription_cache() -> Optional[ResultCache]:
+    global _transcription_cache
+    return _transcription_cache
@@ -1,16 +1,51 @@
 import asyncio
+import contextvars
 import functools
-from fastapi import APIRouter, HTTPException, Request, UploadFile
+import json
+import time
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from pydantic import BaseModel
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 
 from vox_box.backends.stt.base import STTBackend
 from vox_box.backends.tts.base import TTSBackend
-from vox_box.server.model import get_model_instance
+from vox_box.backends.tts.segmented import (
+    SegmentedSpeech,
+    to_output_file,
+    to_pcm_stream,
+)
+from vox_box.server.batch import (
+    SpeechBatchItem,
+    bucket_by_length,
+    stream_speech_batch,
+)
+from vox_box.server.capture import capture_request, get_recorder
+from vox_box.server.memory import get_memory_tracker, track_inference
+from vox_box.server.model import get_model_instance, get_segmented_speech
+from vox_box.server.realtime import SpeechSession
+from vox_box.server.result_cache import ResultCache, get_transcription_cache
+from vox_box.server.scheduler import get_scheduler
+from vox_box.server.singleflight import get_singleflight
+from vox_box.server.upload import SpooledUpload, UploadTooLarge, read_form
+from vox_box.utils.archive import ARCHIVE_MEDIA_TYPES, ArchiveStreamWriter
+from vox_box.utils.audio import get_audio_duration
+from vox_box.utils.cancellation import RequestCancelled, check_cancelled
+from vox_box.utils.resources import get_resource_manager
+from vox_box.utils.profiling import profile_call
+from vox_box.utils.scheduling import get_request_class, use_slot
+from vox_box.utils.tracing import get_trace, record_span, span
 from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import Form, UploadFile, File
-from typing import Optional
+from typing import List, Optional
 import logging
 
 router = APIRouter()
@@ -19,6 +54,55 @@ executor = ThreadPoolExecutor()
 
 logger = logging.getLogger(__name__)
 
+
+async def run_in_executor(func, span_name: str = "inference"):
+    """Run `func` on the shared executor within the caller's trace context.
+
+    With `--inference-workers` or `--cpu-cores`, the executor of the resource
+    manager bounds the number of concurrent inference calls to its worker
+    count. With fair scheduling, the call first
+    waits for a slot in the lane of the request's tenant and priority.
+
+    The wait for a slot and a free worker is recorded as the queue span and
+    the call as `span_name`. Calls of requests cancelled while queued don't
+    start.
+    """
+    ctx = contextvars.copy_context()
+    submitted = time.perf_counter()
+    slot = None
+
+    def call():
+        record_span("queue", submitted)
+        check_cancelled()
+        with span(span_name), use_slot(slot), track_inference():
+            return profile_call(func)
+
+    manager = get_resource_manager()
+    pool = (manager.executor if manager is not None else None) or executor
+    loop = asyncio.get_event_loop()
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return await loop.run_in_executor(pool, ctx.run, call)
+
+    async with scheduler.slot(*get_request_class()) as slot:
+        return await loop.run_in_executor(pool, ctx.run, call)
+
+
+async def deduplicate(key: str, func):
+    """Await `func()`, sharing the call with identical in-flight requests."""
+    flight = get_singleflight()
+    if flight is None:
+        return await func()
+    return await flight.do(key, func)
+
+
+def record_read_span():
+    """Record the request body read and validation done before the handler."""
+    trace = get_trace()
+    if trace is not None:
+        record_span("read", trace.root.start)
+
+
 ALLOWED_SPEECH_OUTPUT_AUDIO_TYPES = {
     "mp3",
     "opus",
@@ -29,16 +113,22 @@ ALLOWED_SPEECH_OUTPUT_AUDIO_TYPES = {
 }
 
 
+# Speech formats that can be streamed segment by segment.
+STREAMING_FORMATS = ("pcm", "wav")
+
+
 class SpeechRequest(BaseModel):
     model: str
     input: str
     voice: str
     response_format: str = "mp3"
     speed: float = 1.0
+    stream: bool = False
 
 
 @router.post("/v1/audio/speech")
-async def speech(request: SpeechRequest):
+async def speech(request: SpeechRequest, raw_request: Request):
+    record_read_span()
     try:
         if (
             request.response_format
@@ -54,12 +144,47 @@ async def speech(request: SpeechRequest):
                 status_code=400, detail="Speed must be between 0.25 and 2"
             )
 
+        if request.stream and request.response_format not in STREAMING_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Streaming is only supported for {', '.join(STREAMING_FORMATS)}",
+            )
+
         model_instance: TTSBackend = get_model_instance()
         if not isinstance(model_instance, TTSBackend):
             return HTTPException(
                 status_code=400, detail="Model instance does not support speech API"
             )
 
+        if get_recorder() is not None:
+            await capture_request(
+                raw_request,
+                {
+                    "model": request.model,
+                    "voice": request.voice,
+                    "response_format": request.response_format,
+                    "speed": request.speed,
+                    "stream": request.stream,
+                    "input_chars": len(request.input),
+                },
+                request.model_dump_json().encode("utf-8"),
+            )
+
+        key = "speech:" + ResultCache.key(
+            request.input.encode("utf-8"),
+            model=model_instance.model_info().get("id"),
+            voice=request.voice,
+            speed=request.speed,
+            response_format=request.response_format,
+            stream=request.stream,
+        )
+
+        segmented_speech = get_segmented_speech()
+        if segmented_speech is not None and segmented_speech.should_split(
+            request.input
+        ):
+            return await segmented_speech_response(segmented_speech, request, key)
+
         func = functools.partial(
             model_instance.speech,
             request.input,
@@ -67,19 +192,123 @@ async def speech(request: SpeechRequest):
             request.speed,
             request.response_format,
         )
-
-        loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(
-            executor,
-            func,
-        )
+        audio_file = await deduplicate(key, lambda: run_in_executor(func))
 
         media_type = get_media_type(request.response_format)
         return FileResponse(audio_file, media_type=media_type)
+    except (HTTPException, RequestCancelled):
+        raise
     except Exception as e:
         return HTTPException(status_code=500, detail=f"Failed to generate speech, {e}")
 
 
+async def segmented_speech_response(
+    segmented_speech: SegmentedSpeech, request: SpeechRequest, key: str
+):
+    def chunks():
+        return segmented_speech.stream(request.input, request.voice, request.speed)
+
+    media_type = get_media_type(request.response_format)
+
+    # Raw PCM and wav can be streamed segment by segment, other formats are
+    # encoded once all segments are ready.
+    if request.stream:
+
+        def pcm_stream():
+            return to_pcm_stream(chunks(), wav_header=request.response_format == "wav")
+
+        flight = get_singleflight()
+        stream = pcm_stream() if flight is None else flight.stream(key, pcm_stream)
+        return StreamingResponse(stream, media_type=media_type)
+
+    func = functools.partial(to_output_file, chunks(), request.response_format)
+    audio_file = await deduplicate(key, lambda: run_in_executor(func))
+    return FileResponse(audio_file, media_type=media_type)
+
+
+@router.websocket("/v1/audio/speech/realtime")
+async def speech_realtime(
+    websocket: WebSocket, voice: Optional[str] = None, speed: float = 1.0
+):
+    model_instance: TTSBackend = get_model_instance()
+    if not isinstance(model_instance, TTSBackend):
+        await websocket.close(
+            code=1003, reason="Model instance does not support speech API"
+        )
+        return
+
+    await websocket.accept()
+    session = SpeechSession(websocket, model_instance, run_in_executor, voice, speed)
+    await session.serve()
+
+
+class SpeechBatchRequest(BaseModel):
+    model: str
+    items: List[SpeechBatchItem]
+    archive_format: str = "tar"
+    max_batch_size: int = 8
+
+
+@router.post("/v1/audio/speech/batch")
+async def speech_batch(request: SpeechBatchRequest, raw_request: Request):
+    record_read_span()
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Field items is required")
+
+    if request.archive_format not in ARCHIVE_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported archive format: {request.archive_format}",
+        )
+
+    if request.max_batch_size < 1:
+        raise HTTPException(
+            status_code=400, detail="max_batch_size must be greater than 0"
+        )
+
+    for item in request.items:
+        if item.response_format not in ALLOWED_SPEECH_OUTPUT_AUDIO_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported audio format: {item.response_format}",
+            )
+
+        if item.speed < 0.25 or item.speed > 2:
+            raise HTTPException(
+                status_code=400, detail="Speed must be between 0.25 and 2"
+            )
+
+    model_instance: TTSBackend = get_model_instance()
+    if not isinstance(model_instance, TTSBackend):
+        raise HTTPException(
+            status_code=400, detail="Model instance does not support speech API"
+        )
+
+    await capture_request(
+        raw_request,
+        {
+            "model": request.model,
+            "items": len(request.items),
+            "archive_format": request.archive_format,
+            "max_batch_size": request.max_batch_size,
+        },
+    )
+
+    writer = ArchiveStreamWriter(request.archive_format)
+    buckets = bucket_by_length(request.items, request.max_batch_size)
+    return StreamingResponse(
+        stream_speech_batch(
+            model_instance,
+            request.items,
+            buckets,
+            writer,
+            run_in_executor,
+            get_media_type,
+        ),
+        media_type=writer.media_type,
+    )
+
+
 @router.post("/v1/audio/copy")
 async def copy(
     model: str = Form(...),
@@ -91,27 +320,7 @@ async def copy(
     prompt_wav: Optional[UploadFile] = File(None),  # 新增文件上传
 ):
     try:
-        # 验证响应格式
-        if response_format and response_format not in ALLOWED_SPEECH_OUTPUT_AUDIO_TYPES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported audio format: {response_format}",
-            )
-
-        # 验证语速
-        if speed < 0.25 or speed > 2:
-            raise HTTPException(
-                status_code=400, detail="Speed must be between 0.25 and 2"
-            )
-
-        # 验证音频文件类型
-        if prompt_wav:
-            content_type = prompt_wav.content_type
-            if content_type not in ALLOWED_TRANSCRIPTIONS_INPUT_AUDIO_FORMATS:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported prompt audio format: {content_type}",
-                )
+        validate_copy_request(response_format, speed, prompt_wav)
 
         # 获取TTS模型实例
         model_instance: TTSBackend = get_model_instance()
@@ -137,18 +346,40 @@ async def copy(
             response_format,
             **kwargs
         )
-
-        loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(
-            executor,
-            func,
-        )
+        audio_file = await run_in_executor(func)
 
         media_type = get_media_type(response_format)
         return FileResponse(audio_file, media_type=media_type)
+    except RequestCancelled:
+        raise
     except Exception as e:
         return HTTPException(status_code=500, detail=f"Failed to generate speech, {e}")
 
+
+def validate_copy_request(
+    response_format: str, speed: float, prompt_wav: Optional[UploadFile]
+):
+    # 验证响应格式
+    if response_format and response_format not in ALLOWED_SPEECH_OUTPUT_AUDIO_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported audio format: {response_format}",
+        )
+
+    # 验证语速
+    if speed < 0.25 or speed > 2:
+        raise HTTPException(status_code=400, detail="Speed must be between 0.25 and 2")
+
+    # 验证音频文件类型
+    if prompt_wav:
+        content_type = prompt_wav.content_type
+        if content_type not in ALLOWED_TRANSCRIPTIONS_INPUT_AUDIO_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported prompt audio format: {content_type}",
+            )
+
+
 # ref: https://github.com/LMS-Community/slimserver/blob/public/10.0/types.conf
 ALLOWED_TRANSCRIPTIONS_INPUT_AUDIO_FORMATS = {
     # flac
@@ -185,16 +416,15 @@ ALLOWED_TRANSCRIPTIONS_OUTPUT_FORMATS = {"json", "text", "srt", "vtt", "verbose_
 
 
 @router.post("/v1/audio/transcriptions")
-async def transcribe(request: Request):
+async def transcribe(request: Request, response: Response):
+    form = None
     try:
-        form = await request.form()
-        keys = form.keys()
-        if "file" not in keys:
+        form = await read_transcription_form(request)
+        file = form.get("file")
+        if not isinstance(file, SpooledUpload):
             return HTTPException(status_code=400, detail="Field file is required")
 
-        file: UploadFile = form[
-            "file"
-        ]  # flac, mp3, mp4, mpeg, mpga, m4a, ogg, wav, or webm
+        # flac, mp3, mp4, mpeg, mpga, m4a, ogg, wav, or webm
         file_content_type = file.content_type
         if file_content_type not in ALLOWED_TRANSCRIPTIONS_INPUT_AUDIO_FORMATS:
             return HTTPException(
@@ -202,7 +432,6 @@ async def transcribe(request: Request):
                 detail=f"Unsupported file format: {file_content_type}",
             )
 
-        audio_bytes = await file.read()
         language = form.get("language")
         prompt = form.get("prompt")
         temperature = float(form.get("temperature", 0))
@@ -225,42 +454,224 @@ async def transcribe(request: Request):
                 detail="Model instance does not support transcriptions API",
             )
 
-        kwargs = {
-            "content_type": file_content_type,
-        }
-        func = functools.partial(
-            model_instance.transcribe,
-            audio_bytes,
-            language,
-            prompt,
-            temperature,
-            timestamp_granularities,
-            response_format,
-            **kwargs,
+        await capture_transcription(
+            request,
+            file,
+            {
+                "file_content_type": file_content_type,
+                "file_size": file.size,
+                "language": language,
+                "temperature": temperature,
+                "timestamp_granularities": timestamp_granularities,
+                "response_format": response_format,
+            },
         )
 
-        loop = asyncio.get_event_loop()
-        data = await loop.run_in_executor(
-            executor,
-            func,
+        key = transcription_key(
+            file,
+            model=model_instance.model_info().get("id"),
+            language=language,
+            prompt=prompt,
+            temperature=temperature,
+            timestamp_granularities=timestamp_granularities,
+            response_format=response_format,
         )
+        data = await lookup_transcription(key, response)
+        if data is None:
+            kwargs = {
+                "content_type": file_content_type,
+            }
+            func = functools.partial(
+                model_instance.transcribe,
+                file.open(),
+                language,
+                prompt,
+                temperature,
+                timestamp_granularities,
+                response_format,
+                **kwargs,
+            )
+            # The form is closed by the transcription from now on.
+            upload_form, form = form, None
+            data = await deduplicate_transcription(key, upload_form, func)
 
-        if response_format == "json":
-            return {"text": data}
-        elif response_format == "text":
-            return data
-        else:
-            return data
+        return {"text": data} if response_format == "json" else data
+    except (HTTPException, RequestCancelled):
+        raise
     except Exception as e:
         return HTTPException(status_code=500, detail=f"Failed to transcribe audio, {e}")
+    finally:
+        if form is not None:
+            await form.close()
+
+
+async def read_transcription_form(request: Request):
+    """Read the multipart form of a transcription request, spooling the
+    upload to disk."""
+    with span("read"):
+        try:
+            return await read_form(request)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+async def capture_transcription(request: Request, file: SpooledUpload, fields: dict):
+    """Capture a transcription request with its upload, if capture is on."""
+    if get_recorder() is None:
+        return
+
+    loop = asyncio.get_event_loop()
+    # Probing the duration may decode the whole upload.
+    fields["audio_duration"] = await loop.run_in_executor(
+        None, get_audio_duration, file.open()
+    )
+    await capture_request(request, fields, file.read)
+
+
+def transcription_key(file: SpooledUpload, **params) -> Optional[str]:
+    """Key of the transcription of `file` with `params` in the result cache
+    and the singleflight, None if neither is enabled."""
+    if get_transcription_cache() is None and get_singleflight() is None:
+        return None
+    # The upload was hashed while it was received.
+    return ResultCache.key_from_hash(file.hash, **params)
+
+
+async def lookup_transcription(key: Optional[str], response: Response):
+    """Return the cached transcription for `key`, None on a miss or without
+    a result cache."""
+    cache = get_transcription_cache()
+    if cache is None:
+        return None
+
+    loop = asyncio.get_event_loop()
+    with span("cache"):
+        data = await loop.run_in_executor(None, cache.get, key)
+    response.headers["X-Cache"] = "miss" if data is None else "hit"
+    return data
+
+
+async def deduplicate_transcription(key: Optional[str], form, func):
+    """Run the transcription `func` of the upload of `form`, sharing it with
+    identical in-flight requests, and cache the result.
+
+    The form is closed once the transcription is done, which may outlive
+    this request when it is shared, or right away if this request joins a
+    transcription in flight.
+    """
+    cache = get_transcription_cache()
+    started = False
+
+    async def compute():
+        try:
+            data = await run_in_executor(func)
+        finally:
+            await form.close()
+        if cache is not None:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, cache.put, key, data)
+        return data
+
+    def start():
+        nonlocal started
+        started = True
+        return compute()
+
+    try:
+        return await deduplicate(f"transcription:{key}", start)
+    finally:
+        if not started:
+            await form.close()
+
+
+@router.websocket("/v1/audio/transcriptions/realtime")
+async def transcribe_realtime(websocket: WebSocket):
+    """Realtime transcription over a WebSocket.
+
+    The client sends 16 kHz mono 16-bit PCM as binary frames and
+    `{"type": "commit"}` to end an utterance. The server answers with
+    `{"type": "partial", "text": ...}` as audio is decoded and
+    `{"type": "final", "text": ...}` for each committed utterance.
+    """
+    model_instance: STTBackend = get_model_instance()
+    if (
+        not isinstance(model_instance, STTBackend)
+        or not model_instance.supports_streaming()
+    ):
+        await websocket.close(
+            code=1003,
+            reason="Model instance does not support realtime transcriptions API",
+        )
+        return
+
+    await websocket.accept()
+    stream = model_instance.create_stream()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            await handle_transcription_message(websocket, stream, message)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to transcribe realtime audio, {e}")
+        await websocket.close(code=1011, reason="Failed to transcribe audio")
+
+
+async def handle_transcription_message(websocket: WebSocket, stream, message: dict):
+    """Feed a binary frame of PCM to `stream`, or handle a JSON event."""
+    if message.get("bytes") is not None:
+        stream.feed(message["bytes"])
+        if stream.ready():
+            text = await run_in_executor(stream.decode)
+            await websocket.send_json({"type": "partial", "text": text})
+        return
+
+    try:
+        event = json.loads(message.get("text") or "{}")
+    except json.JSONDecodeError:
+        await websocket.send_json({"type": "error", "message": "Invalid JSON message"})
+        return
+
+    event_type = event.get("type") if isinstance(event, dict) else None
+    if event_type == "commit":
+        text = await run_in_executor(stream.finish)
+        await websocket.send_json({"type": "final", "text": text})
+    else:
+        await websocket.send_json(
+            {"type": "error", "message": f"Unsupported message type: {event_type}"}
+        )
 
 
 @router.get("/health")
 async def health():
     model_instance = get_model_instance()
     if model_instance is None or (not model_instance.is_load()):
-        return HTTPException(status_code=503, detail="Loading model")
-    return {"status": "ok"}
+        raise HTTPException(status_code=503, detail="Loading model")
+    if not model_instance.is_warm():
+        raise HTTPException(status_code=503, detail="Warming up model")
+    return {"status": "ok", "warmup": model_instance.warmup_timings()}
+
+
+@router.get("/metrics")
+async def metrics():
+    text = ""
+    tracker = get_memory_tracker()
+    if tracker is not None:
+        text += tracker.prometheus()
+    cache = get_transcription_cache()
+    if cache is not None:
+        text += cache.prometheus("transcription")
+    flight = get_singleflight()
+    if flight is not None:
+        text += flight.prometheus()
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        text += scheduler.prometheus()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
 
 
 @router.get("/v1/models")
@@ -0,0 +1,83 @@
+import logging
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from vox_box.config.config import Config
+from vox_box.utils.cpu import THREADS_PER_WORKER, get_cpu_count
+from vox_box.utils.resources import get_resource_manager
+from vox_box.utils.scheduling import (
+    BATCH,
+    DEFAULT_TENANT,
+    INTERACTIVE,
+    PRIORITIES,
+    FairScheduler,
+    set_request_class,
+)
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+# Routes served in the batch lane unless the request asks otherwise.
+BATCH_ROUTES = ("/v1/audio/speech/batch",)
+
+
+def setup_scheduler(cfg: Config):
+    global _scheduler
+
+    if not cfg.fair_scheduling:
+        return
+
+    manager = get_resource_manager()
+    if manager is not None:
+        slots = manager.workers
+        # Preempted requests keep their thread while waiting.
+        manager.spare_threads = slots
+    else:
+        slots = cfg.inference_workers or max(1, get_cpu_count() // THREADS_PER_WORKER)
+
+    _scheduler = FairScheduler(
+        slots,
+        reserved_slots=cfg.interactive_reserved_slots,
+        weights=cfg.tenant_weights,
+    )
+    logger.info(
+        f"Fair scheduling over {slots} slots, {_scheduler.batch_slots} for batch requests"
+    )
+
+
+def get_scheduler() -> Optional[FairScheduler]:
+    global _scheduler
+    return _scheduler
+
+
+def get_tenant(request: Request) -> str:
+    """Tenant of a request, from the X-Tenant header or the API key."""
+    tenant = request.headers.get("x-tenant")
+    if tenant:
+        return tenant
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return DEFAULT_TENANT
+
+
+async def scheduling_middleware(request: Request, call_next):
+    if get_scheduler() is None or not request.url.path.startswith("/v1/audio/"):
+        return await call_next(request)
+
+    default = BATCH if request.url.path in BATCH_ROUTES else INTERACTIVE
+    priority = request.headers.get("x-priority", default).lower()
+    if priority not in PRIORITIES:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "detail": f"Invalid X-Priority {priority}, expected one of {', '.join(PRIORITIES)}"
+            },
+        )
+
+    set_request_class(get_tenant(request), priority)
+    return await call_next(request)
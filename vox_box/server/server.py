@@ -4,6 +4,14 @@ import uvicorn
 
 from vox_box.logging import setup_logging
 from vox_box.server.app import app
+from vox_box.server.capture import setup_capture
+from vox_box.server.debug import setup_debug
+from vox_box.server.memory import setup_memory
+from vox_box.server.result_cache import setup_transcription_cache
+from vox_box.server.scheduler import setup_scheduler
+from vox_box.server.singleflight import setup_singleflight
+from vox_box.server.tracing import setup_tracing
+from vox_box.server.upload import setup_uploads
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +44,14 @@ class Server:
         )
 
         setup_logging()
+        setup_capture(self._config)
+        setup_tracing(self._config)
+        setup_debug(self._config)
+        setup_memory(self._config)
+        setup_transcription_cache(self._config)
+        setup_uploads(self._config)
+        setup_singleflight(self._config)
+        setup_scheduler(self._config)
 
         logger.info(f"Serving on {config.host}:{config.port}.")
         server = uvicorn.Server(config)
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+from vox_box.config.config import Config
+from vox_box.utils.cancellation import (
+    DISCONNECTED,
+    CancellationToken,
+    get_cancellation_token,
+    use_token,
+)
+
+logger = logging.getLogger(__name__)
+
+_singleflight = None
+
+_END = object()
+
+
+def _shared_context(token: CancellationToken) -> contextvars.Context:
+    """A copy of the current context with `token` as cancellation token."""
+    with use_token(token):
+        return contextvars.copy_context()
+
+
+class _Call:
+    """A shared computation, cancelled once all its callers are cancelled."""
+
+    def __init__(self):
+        self.token = CancellationToken()
+        self.task: Optional[asyncio.Future] = None
+        self.callers = 0
+
+    def join(self) -> Callable[[str], None]:
+        """Count a caller in, returns the function counting it out with the
+        reason its request was cancelled for."""
+        self.callers += 1
+        left = False
+
+        def leave(reason: str = DISCONNECTED):
+            nonlocal left
+            if left:
+                return
+            left = True
+            self.callers -= 1
+            if self.callers == 0 and not self.task.done():
+                self.token.cancel(reason)
+
+        return leave
+
+
+class SharedStream:
+    """Fan a blocking chunk iterator out to several subscribers.
+
+    The iterator is consumed once, in a thread, and every chunk is kept until
+    the stream ends, so that subscribers joining late receive the whole
+    stream from its start. The iterator runs with its own cancellation
+    token, cancelled when all subscribers are gone before the end.
+    """
+
+    def __init__(self, iterator: Iterator[Any]):
+        self._chunks: List[Any] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._updated = asyncio.Event()
+        self._subscribers = 0
+        self.token = CancellationToken()
+        self.task = asyncio.ensure_future(self._produce(iterator))
+
+    async def _produce(self, iterator: Iterator[Any]):
+        loop = asyncio.get_event_loop()
+        produce = functools.partial(
+            _shared_context(self.token).run, next, iterator, _END
+        )
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, produce)
+                if chunk is _END:
+                    break
+                self._chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._notify()
+
+    def _notify(self):
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        self._subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self._chunks):
+                    yield self._chunks[index]
+                    index += 1
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                await self._updated.wait()
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self._done:
+                self.token.cancel(DISCONNECTED)
+
+
+class SingleFlight:
+    """Coalesce identical concurrent requests into one computation.
+
+    Callers passing the same key while a computation for it is running wait
+    for it and share its result, or its exception, instead of starting their
+    own. The key is released once the computation ends, results aren't
+    cached.
+
+    The computation runs with its own cancellation token, cancelled once the
+    requests of all its callers are cancelled, so that one abandoned request
+    doesn't stop the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, SharedStream] = {}
+        self.shared = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            # A task, so that the computation outlives a cancelled leader
+            # while others are waiting for it.
+            call = _Call()
+            call.task = _shared_context(call.token).run(asyncio.ensure_future, func())
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+            logger.debug(f"Joining in-flight request {key}")
+
+        leave = call.join()
+        token = get_cancellation_token()
+        remove = None
+        if token is not None:
+            remove = token.add_callback(lambda: leave(token.reason))
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            if remove is not None:
+                remove()
+            leave()
+
+    def stream(
+        self, key: str, factory: Callable[[], Iterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """Subscribe to the in-flight stream of `key`, or start it."""
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = SharedStream(factory())
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._streams.pop(key, None))
+        else:
+            self.shared += 1
+            logger.debug(f"Joining in-flight stream {key}")
+        return shared.subscribe()
+
+    def prometheus(self) -> str:
+        return (
+            "# HELP vox_box_singleflight_shared_total Requests served by joining an identical in-flight request.\n"
+            "# TYPE vox_box_singleflight_shared_total counter\n"
+            f"vox_box_singleflight_shared_total {self.shared}\n"
+        )
+
+
+def setup_singleflight(cfg: Config):
+    global _singleflight
+
+    if cfg.singleflight:
+        _singleflight = SingleFlight()
+
+
+def get_singleflight() -> Optional[SingleFlight]:
+    global _singleflight
+    return _singleflight
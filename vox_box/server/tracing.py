@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Optional
+
+import httpx
+from fastapi import Request
+
+from vox_box.config.config import Config
+from vox_box.utils.tracing import Trace, start_trace
+
+logger = logging.getLogger(__name__)
+
+_exporter = None
+
+
+class TraceExporter:
+    """Export finished traces as OTLP/JSON in a background thread.
+
+    Traces are appended as one ExportTraceServiceRequest per line to `path`,
+    and/or posted to an OTLP/HTTP collector `endpoint`, e.g.
+    http://localhost:4318/v1/traces. When the queue is full traces are
+    dropped rather than slowing down requests.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        max_queue_size: int = 1024,
+    ):
+        self._path = path
+        self._endpoint = endpoint
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._dropped = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._thread = threading.Thread(
+            target=self._run, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped % 100 == 1:
+                logger.warning(f"Trace export queue is full, dropped {self._dropped}")
+
+    def _run(self):
+        client = httpx.Client(timeout=5) if self._endpoint else None
+        while True:
+            trace: Trace = self._queue.get()
+            data = trace.to_otlp()
+            if self._path:
+                try:
+                    with open(self._path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(data) + "\n")
+                except Exception as e:
+                    logger.error(f"Failed to write trace, {e}")
+
+            if client is not None:
+                try:
+                    client.post(self._endpoint, json=data).raise_for_status()
+                except Exception as e:
+                    logger.debug(f"Failed to export trace to {self._endpoint}, {e}")
+
+
+def setup_tracing(cfg: Config):
+    global _exporter
+
+    if cfg.trace_file or cfg.otlp_endpoint:
+        _exporter = TraceExporter(cfg.trace_file, cfg.otlp_endpoint)
+        logger.info(
+            f"Exporting request traces to {cfg.trace_file or cfg.otlp_endpoint}"
+        )
+
+
+def get_exporter() -> Optional[TraceExporter]:
+    global _exporter
+    return _exporter
+
+
+async def tracing_middleware(request: Request, call_next):
+    """Trace the audio API requests and return their stages as Server-Timing.
+
+    For streaming responses the header only covers the stages finished before
+    the first byte, the exported trace covers the whole response.
+    """
+    if not request.url.path.startswith("/v1/audio/"):
+        return await call_next(request)
+
+    trace = start_trace(
+        f"{request.method} {request.url.path}",
+        **{"http.method": request.method, "http.target": request.url.path},
+    )
+    response = await call_next(request)
+    trace.root.attributes["http.status_code"] = response.status_code
+    response.headers["Server-Timing"] = trace.server_timing()
+
+    body_iterator = response.body_iterator
+
+    async def finish_trace():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            trace.finish()
+            exporter = get_exporter()
+            if exporter is not None:
+                exporter.export(trace)
+
+    response.body_iterator = finish_trace()
+    return response
@@ -0,0 +1,277 @@
+import asyncio
+import atexit
+import io
+import logging
+import os
+import shutil
+import socket
+import tempfile
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from fastapi import Request
+from starlette.datastructures import FormData
+
+from vox_box.config.config import Config
+from vox_box.server.result_cache import content_hash
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Size limit of the form fields besides files, in total.
+MAX_FIELDS_SIZE = 1024 * 1024
+
+_max_upload_size = 1024**3
+_spool_size = 1024 * 1024
+_upload_dir: Optional[str] = None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SpooledUpload:
+    """A file of a multipart upload, kept in memory up to `spool_size` bytes
+    and moved to a named temporary file under `dir` beyond.
+
+    The content is hashed while it is written, for the result cache key.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        content_type: Optional[str],
+        spool_size: int,
+        dir: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.hash = content_hash()
+        self.path: Optional[str] = None
+        self._spool_size = spool_size
+        self._dir = dir
+        self._file: BinaryIO = io.BytesIO()
+
+    def in_memory(self, size: int = 0) -> bool:
+        """Whether the content still fits in memory after `size` more bytes."""
+        return self.path is None and self.size + size <= self._spool_size
+
+    def write(self, data: bytes):
+        if self.path is None and not self.in_memory(len(data)):
+            self._rollover()
+        self._file.write(data)
+        self.hash.update(data)
+        self.size += len(data)
+
+    def open(self) -> BinaryIO:
+        """The content as a file object positioned at the start, named by
+        `path` once on disk."""
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def read(self) -> bytes:
+        return self.open().read()
+
+    def close(self):
+        self._file.close()
+
+    def _rollover(self):
+        f = tempfile.NamedTemporaryFile(prefix="upload-", dir=self._dir)
+        f.write(self._file.getbuffer())
+        self._file = f
+        self.path = f.name
+
+
+class UploadForm(FormData):
+    """Form data whose files are `SpooledUpload`s, closed with the form."""
+
+    async def close(self):
+        for _, value in self.multi_items():
+            if isinstance(value, SpooledUpload):
+                value.close()
+
+
+class _MultipartReader:
+    def __init__(self, boundary: bytes, max_size: int, spool_size: int):
+        self.items: List[Tuple[str, Union[str, SpooledUpload]]] = []
+        self.uploads: List[SpooledUpload] = []
+        # Writes of file data not done yet, in order.
+        self.pending: List[Tuple[SpooledUpload, bytes]] = []
+        self._max_size = max_size
+        self._spool_size = spool_size
+        self._fields_size = 0
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = ""
+        self._upload: Optional[SpooledUpload] = None
+        self._upload_size = 0
+        self._field = bytearray()
+        self.parser = multipart.MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._upload = None
+        self._upload_size = 0
+        self._field = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        self._name = options.get(b"name", b"").decode("utf-8")
+        filename = options.get(b"filename")
+        if filename is None:
+            return
+
+        content_type = self._headers.get(b"content-type")
+        self._upload = SpooledUpload(
+            filename.decode("utf-8"),
+            content_type.decode("latin-1") if content_type else None,
+            self._spool_size,
+            _upload_dir,
+        )
+        self.uploads.append(self._upload)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._upload is None:
+            self._fields_size += end - start
+            if self._fields_size > MAX_FIELDS_SIZE:
+                raise UploadTooLarge(f"Form fields exceed {MAX_FIELDS_SIZE} bytes")
+            self._field.extend(data[start:end])
+            return
+
+        self._upload_size += end - start
+        if self._upload_size > self._max_size:
+            raise UploadTooLarge(
+                f"File exceeds the upload limit of {self._max_size} bytes"
+            )
+        self.pending.append((self._upload, data[start:end]))
+
+    def _on_part_end(self):
+        if self._upload is not None:
+            self.items.append((self._name, self._upload))
+        else:
+            self.items.append((self._name, self._field.decode("utf-8")))
+
+
+async def read_form(request: Request) -> UploadForm:
+    """Parse a multipart form, streaming its files into `SpooledUpload`s.
+
+    Unlike `request.form()`, files are hashed as they arrive and never read
+    back into memory as a whole, and a file over the upload limit fails with
+    `UploadTooLarge` as soon as it crosses it.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data body")
+
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > _max_upload_size + MAX_FIELDS_SIZE:
+        raise UploadTooLarge(
+            f"Body of {content_length} bytes exceeds the upload limit of {_max_upload_size} bytes"
+        )
+
+    loop = asyncio.get_running_loop()
+    reader = _MultipartReader(params[b"boundary"], _max_upload_size, _spool_size)
+    try:
+        async for chunk in request.stream():
+            reader.parser.write(chunk)
+            for upload, data in reader.pending:
+                if upload.in_memory(len(data)):
+                    upload.write(data)
+                else:
+                    # Don't block the event loop on disk writes.
+                    await loop.run_in_executor(None, upload.write, data)
+            reader.pending.clear()
+        reader.parser.finalize()
+    except BaseException:
+        for upload in reader.uploads:
+            upload.close()
+        raise
+
+    return UploadForm(reader.items)
+
+
+def setup_uploads(cfg: Config):
+    global _max_upload_size, _spool_size, _upload_dir
+
+    _max_upload_size = cfg.max_upload_size
+    _spool_size = cfg.upload_spool_size
+    if cfg.data_dir:
+        # The data dir may be shared with other servers, every process
+        # spools to its own directory.
+        root = os.path.join(cfg.data_dir, "uploads")
+        _remove_stale_upload_dirs(root)
+        _upload_dir = os.path.join(root, f"{_host()}-{os.getpid()}")
+        os.makedirs(_upload_dir, exist_ok=True)
+        atexit.register(shutil.rmtree, _upload_dir, True)
+
+
+def _host() -> str:
+    return socket.gethostname().replace(os.sep, "_")
+
+
+def _remove_stale_upload_dirs(root: str):
+    """Remove the upload directories of processes of this host that exited
+    without cleaning up."""
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+
+    prefix = f"{_host()}-"
+    for name in names:
+        pid = name[len(prefix) :]
+        if not name.startswith(prefix) or not pid.isdigit():
+            continue
+        if int(pid) != os.getpid() and not _pid_exists(int(pid)):
+            logger.info(f"Removing stale uploads of process {pid}")
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _pid_exists(pid: int) -> bool:
+    try:
+        import psutil
+
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+
+    if os.name != "posix":
+        # Assume it is alive, os.kill terminates processes on Windows.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
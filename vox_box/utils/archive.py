@@ -0,0 +1,101 @@
+import io
+import tarfile
+import time
+import uuid
+import zipfile
+from typing import Dict
+
+
+ARCHIVE_MEDIA_TYPES = {
+    "tar": "application/x-tar",
+    "zip": "application/zip",
+    "multipart": "multipart/mixed",
+}
+
+
+class _DrainableBuffer(io.RawIOBase):
+    """A write-only, unseekable sink whose content can be drained incrementally."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, b) -> int:
+        self._buffer += b
+        self._position += len(b)
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class ArchiveStreamWriter:
+    """Incrementally build a tar, zip or multipart/mixed stream.
+
+    Each call to `add` returns the bytes that can be sent to the client right
+    away, so members are streamed as soon as they are produced.
+    """
+
+    def __init__(self, archive_format: str = "tar"):
+        if archive_format not in ARCHIVE_MEDIA_TYPES:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+
+        self._format = archive_format
+        self._sink = _DrainableBuffer()
+        self._boundary = uuid.uuid4().hex
+        self._tar = None
+        self._zip = None
+        if archive_format == "tar":
+            self._tar = tarfile.open(fileobj=self._sink, mode="w")
+        elif archive_format == "zip":
+            self._zip = zipfile.ZipFile(self._sink, mode="w")
+
+    @property
+    def media_type(self) -> str:
+        media_type = ARCHIVE_MEDIA_TYPES[self._format]
+        if self._format == "multipart":
+            media_type = f"{media_type}; boundary={self._boundary}"
+        return media_type
+
+    def add(self, name: str, data: bytes, content_type: str) -> bytes:
+        if self._tar is not None:
+            info = tarfile.TarInfo(name=name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+        elif self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            headers = self._multipart_headers(name, content_type)
+            self._sink.write(f"--{self._boundary}\r\n".encode())
+            self._sink.write(headers)
+            self._sink.write(data)
+            self._sink.write(b"\r\n")
+
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        if self._tar is not None:
+            self._tar.close()
+        elif self._zip is not None:
+            self._zip.close()
+        else:
+            self._sink.write(f"--{self._boundary}--\r\n".encode())
+
+        return self._sink.drain()
+
+    def _multipart_headers(self, name: str, content_type: str) -> bytes:
+        headers: Dict[str, str] = {
+            "Content-Type": content_type,
+            "Content-Disposition": f'attachment; filename="{name}"',
+        }
+        lines = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        return f"{lines}\r\n".encode()
@@ -1,6 +1,16 @@
+import io
+import os
 import shutil
+import struct
 import tempfile
+import wave
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
 import av
+import numpy as np
+
+from vox_box.utils.cancellation import RequestCancelled, check_cancelled
+from vox_box.utils.tracing import traced
 
 
 output_format_to_encoder_decoder_map = {
@@ -22,6 +32,7 @@ output_format_to_suffix_map = {
 }
 
 
+@traced("encode")
 def convert(
     input_file_path: str,
     output_format: str,
@@ -51,6 +62,10 @@ def convert(
 
             input_container.close()
             return output_file_path
+        except RequestCancelled:
+            input_container.close()
+            os.remove(output_file_path)
+            raise
         except Exception as e:
             raise Exception(
                 f"Failed to convert audio to format {output_format}, speed: {speed}: {e}"
@@ -67,6 +82,7 @@ def convert_to_pcm(input_stream, output_file_path: str, speed: float):
         )
 
         for frame in input_stream.container.decode(input_stream):
+            check_cancelled()
             frame.pts = None  # Reset PTS to avoid issues with frame timing
             resampled_frames = resampler.resample(frame)
             for resampled_frame in resampled_frames:
@@ -80,8 +96,6 @@ def convert_to_pcm(input_stream, output_file_path: str, speed: float):
 def convert_to_format(
     input_stream, output_file_path: str, response_format: str, speed: float
 ):
-    with open('/a.txt', 'w', encoding='utf-8') as file:
-        file.write(f"---------------{response_format}")
     output_rate = int(input_stream.rate * speed)
     
 
@@ -97,6 +111,9 @@ def convert_to_format(
         rate=output_rate,
         channels=input_stream.channels,
     )
+    # Conversions run on the request's inference worker, don't let the codec
+    # start a thread per core on top of it.
+    output_stream.codec_context.thread_count = 1
 
     resampler = av.AudioResampler(
         format=output_stream.format,
@@ -105,6 +122,7 @@ def convert_to_format(
     )
 
     for frame in input_stream.container.decode(input_stream):
+        check_cancelled()
         # Reset PTS to avoid issues with frame timing
         frame.pts = None
         frames = resampler.resample(frame)
@@ -117,3 +135,137 @@ def convert_to_format(
         output_container.mux(packet)
 
     output_container.close()
+
+
+def read_wav(input_file_path: str) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit PCM wav file as a mono float32 array in [-1, 1]."""
+    with wave.open(input_file_path, "rb") as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        frames = wf.readframes(wf.getnframes())
+
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 2**15
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sample_rate
+
+
+def write_wav(output_file_path: str, audio: np.ndarray, sample_rate: int):
+    """Write a mono float32 array in [-1, 1] as a 16-bit PCM wav file."""
+    with wave.open(output_file_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(to_pcm16(audio))
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    return (np.clip(audio, -1, 1) * (2**15 - 1)).astype(np.int16).tobytes()
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1) -> bytes:
+    """Build a 16-bit PCM wav header for a stream of unknown length.
+
+    The RIFF and data chunk sizes are set to their maximum, which players
+    interpret as "read until end of stream".
+    """
+    byte_rate = sample_rate * channels * 2
+    return (
+        b"RIFF"
+        + struct.pack("<I", 0xFFFFFFFF)
+        + b"WAVEfmt "
+        + struct.pack(
+            "<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * 2, 16
+        )
+        + b"data"
+        + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def generate_wav_bytes(
+    duration: float,
+    sample_rate: int = 16000,
+    frequency: float = 440.0,
+    noise: float = 0.0,
+    seed: int = 0,
+) -> bytes:
+    """Generate a deterministic sine (plus optional white noise) wav file."""
+    t = np.arange(int(duration * sample_rate), dtype=np.float32) / sample_rate
+    audio = 0.5 * np.sin(2 * np.pi * frequency * t)
+    if noise > 0:
+        rng = np.random.default_rng(seed)
+        audio = audio + noise * rng.standard_normal(len(t)).astype(np.float32)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(to_pcm16(audio))
+    return buffer.getvalue()
+
+
+def as_audio_file(audio: Union[bytes, BinaryIO]) -> BinaryIO:
+    """A file object reading `audio` from its start, without copying it."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return io.BytesIO(audio)
+    audio.seek(0)
+    return audio
+
+
+def audio_file_path(audio: Union[bytes, BinaryIO]) -> Tuple[str, bool]:
+    """A path to `audio`, for libraries reading files by name.
+
+    Returns the path and whether it is a temporary copy to remove. Files
+    with a name on disk, such as uploads spooled to disk, are used in place.
+    """
+    name = getattr(audio, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        audio.flush()
+        return name, False
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            f.write(audio)
+        else:
+            audio.seek(0)
+            shutil.copyfileobj(audio, f)
+    return f.name, True
+
+
+def decode_audio_chunks(
+    source: Union[str, BinaryIO], sampling_rate: int = 16000
+) -> Iterator[np.ndarray]:
+    """Decode `source` to mono float32 samples at `sampling_rate`, one chunk
+    per decoded frame, so that the whole audio never has to be in memory."""
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sampling_rate)
+    with av.open(source, metadata_errors="ignore") as container:
+        frames = container.decode(audio=0)
+        while True:
+            try:
+                frame = next(frames, None)
+            except av.error.InvalidDataError:
+                # Truncated files, as faster-whisper does, keep what was decoded.
+                frame = None
+            check_cancelled()
+            for resampled_frame in resampler.resample(frame):
+                pcm_data = resampled_frame.to_ndarray().reshape(-1)
+                yield pcm_data.astype(np.float32) / 2**15
+            if frame is None:
+                return
+
+
+def get_audio_duration(source: Union[str, BinaryIO]) -> Optional[float]:
+    """Return the duration in seconds of an audio file, None if unknown."""
+    try:
+        with av.open(source) as container:
+            stream = container.streams.audio[0]
+            if stream.duration is not None and stream.time_base is not None:
+                return float(stream.duration * stream.time_base)
+            if container.duration is not None:
+                return container.duration / av.time_base
+
+            samples = sum(frame.samples for frame in container.decode(stream))
+            return samples / stream.rate
+    except Exception:
+        return None
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from vox_box.utils.cancellation import check_cancelled, on_cancel
+from vox_box.utils.profiling import handoff_profile, profile_call
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """Group concurrent calls into batches executed by a single worker thread.
+
+    Items are queued per key, only items with the same key are batched
+    together. A batch is run as soon as `max_batch_size` items of a key are
+    queued, or when the oldest of them has waited `max_wait` seconds, so a
+    lone request is delayed by at most `max_wait`. Keys are served oldest
+    first.
+
+    `func(key, items)` must return one result per item, in order. When it
+    raises, or returns a different number of results, every item of the
+    batch fails with the exception and the worker goes on with the next
+    batch.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[Hashable, List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        name: str = "batch-scheduler",
+    ):
+        self._func = func
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._pending: Dict[Hashable, List[Tuple[Any, Future, float]]] = {}
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending.setdefault(key, []).append((item, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def run(self, key: Hashable, item: Any) -> Any:
+        """Submit an item and wait for its result."""
+        return self.map(key, [item])[0]
+
+    def map(self, key: Hashable, items: Sequence[Any]) -> List[Any]:
+        """Submit items and wait for their results, in order.
+
+        When the request of the caller is cancelled, its items still queued
+        are left out of their batches.
+        """
+        futures = [self.submit(key, item) for item in items]
+        # The items run in the worker thread, let it be profiled.
+        handoff_profile()
+
+        def cancel():
+            for future in futures:
+                future.cancel()
+
+        with on_cancel(cancel):
+            try:
+                return [future.result() for future in futures]
+            except CancelledError:
+                check_cancelled()
+                raise
+
+    def _next_batch(self) -> Tuple[Hashable, List[Tuple[Any, Future, float]]]:
+        while True:
+            if not self._pending:
+                self._cond.wait()
+                continue
+
+            key, entries = min(self._pending.items(), key=lambda kv: kv[1][0][2])
+            wait = entries[0][2] + self._max_wait - time.monotonic()
+            if len(entries) >= self._max_batch_size or wait <= 0:
+                batch = entries[: self._max_batch_size]
+                if len(entries) > self._max_batch_size:
+                    self._pending[key] = entries[self._max_batch_size :]
+                else:
+                    del self._pending[key]
+                return key, batch
+
+            self._cond.wait(wait)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key, batch = self._next_batch()
+
+            # Skip the items cancelled while queued.
+            batch = [
+                entry for entry in batch if entry[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            try:
+                self._run_batch(key, batch)
+            except BaseException as e:
+                # Keep the worker alive, later calls would wait forever.
+                logger.error(f"Batch of {len(batch)} items for key {key} failed, {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, key: Hashable, batch: List[Tuple[Any, Future, float]]):
+        items = [item for item, _, _ in batch]
+        results = profile_call(lambda: self._func(key, items))
+        if len(results) != len(batch):
+            raise Exception(
+                f"Batch function returned {len(results)} results for {len(batch)} items"
+            )
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        logger.debug(f"Ran batch of {len(batch)} items for key {key}")
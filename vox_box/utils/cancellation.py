@@ -0,0 +1,111 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DISCONNECTED = "client disconnected"
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+_current_token: ContextVar[Optional["CancellationToken"]] = ContextVar(
+    "vox_box_cancellation_token", default=None
+)
+
+
+class RequestCancelled(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"Request cancelled, {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """Cancellation state of a request, shared with the threads serving it.
+
+    Inference checks the token of the current context between chunks of work
+    with `check_cancelled()`, and stops with `RequestCancelled` once the
+    request was cancelled. Callbacks run in the thread calling `cancel`.
+    """
+
+    def __init__(self):
+        self._reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._reason is not None
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._reason is not None:
+                return
+            self._reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Cancellation callback failed, {e}")
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `callback` on cancellation, right away if already cancelled.
+
+        Returns a function removing the callback.
+        """
+        with self._lock:
+            if self._reason is None:
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def check(self):
+        if self._reason is not None:
+            raise RequestCancelled(self._reason)
+
+    def _remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def get_cancellation_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]):
+    """Make `token` the cancellation token of the current context."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def check_cancelled():
+    """Raise `RequestCancelled` if the request of the current context was
+    cancelled, a no-op outside of a request."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def on_cancel(callback: Callable[[], None]):
+    """Call `callback` if the request of the current context is cancelled
+    while in the block."""
+    token = _current_token.get()
+    remove = token.add_callback(callback) if token is not None else None
+    try:
+        yield
+    finally:
+        if remove is not None:
+            remove()
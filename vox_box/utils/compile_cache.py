@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_FILE = "artifacts.bin"
+
+
+class CompileCache:
+    """Persistent torch.compile cache for a model.
+
+    The directory is keyed by model, dtype, device and torch version, since
+    compiled graphs and kernels are only valid for that combination. It holds
+    the Inductor and Triton on-disk caches, so that a restarted process finds
+    the graphs compiled by the previous one, and, on torch versions that
+    support it, the portable cache artifacts saved with
+    `torch.compiler.save_cache_artifacts`, which can be copied to other
+    machines of the fleet.
+    """
+
+    def __init__(
+        self,
+        cache_root: str,
+        model_path: str,
+        dtype: str,
+        device: str,
+    ):
+        import torch
+
+        key = {
+            "model": os.path.basename(os.path.normpath(model_path)),
+            "model_config": _file_digest(os.path.join(model_path, "config.json")),
+            "dtype": dtype,
+            "device": device.split(":")[0],
+            "device_name": _device_name(device),
+            "torch": torch.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        }
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        self.key = key
+        self.path = os.path.join(cache_root, f"{key['model']}-{digest[:16]}")
+
+    def setup(self):
+        """Point the Inductor and Triton caches to the cache directory.
+
+        Must be called before the first compilation. Cache directories set
+        in the environment by the user are left untouched.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        os.environ.setdefault(
+            "TORCHINDUCTOR_CACHE_DIR", os.path.join(self.path, "inductor")
+        )
+        os.environ.setdefault("TRITON_CACHE_DIR", os.path.join(self.path, "triton"))
+        with open(os.path.join(self.path, "key.json"), "w", encoding="utf-8") as f:
+            json.dump(self.key, f, indent=2)
+
+    def load_artifacts(self) -> bool:
+        import torch
+
+        artifacts_path = os.path.join(self.path, ARTIFACTS_FILE)
+        if not hasattr(torch.compiler, "load_cache_artifacts") or not os.path.exists(
+            artifacts_path
+        ):
+            return False
+
+        try:
+            with open(artifacts_path, "rb") as f:
+                torch.compiler.load_cache_artifacts(f.read())
+        except Exception as e:
+            logger.warning(f"Failed to load compile cache artifacts, {e}")
+            return False
+
+        logger.info(f"Loaded compile cache artifacts from {artifacts_path}")
+        return True
+
+    def save_artifacts(self) -> Optional[str]:
+        import torch
+
+        if not hasattr(torch.compiler, "save_cache_artifacts"):
+            return None
+
+        try:
+            artifacts = torch.compiler.save_cache_artifacts()
+        except Exception as e:
+            logger.warning(f"Failed to save compile cache artifacts, {e}")
+            return None
+        if artifacts is None:
+            return None
+
+        data, _ = artifacts
+        artifacts_path = os.path.join(self.path, ARTIFACTS_FILE)
+        # Write atomically, other processes sharing the cache may be loading it.
+        with tempfile.NamedTemporaryFile(dir=self.path, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, artifacts_path)
+        logger.info(f"Saved compile cache artifacts to {artifacts_path}")
+        return artifacts_path
+
+
+def _file_digest(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _device_name(device: str) -> Optional[str]:
+    import torch
+
+    if device.startswith("cuda") and torch.cuda.is_available():
+        return torch.cuda.get_device_name(torch.device(device))
+    return None
@@ -0,0 +1,78 @@
+import math
+import os
+from typing import List, Optional, Tuple
+
+# Intra-op threads per inference worker beyond which a single request, e.g. a
+# Whisper encode, barely gets faster. More cores are better spent on
+# concurrent requests.
+THREADS_PER_WORKER = 4
+
+
+def get_cpu_count() -> int:
+    """Number of CPUs this process can use.
+
+    The minimum of the CPU affinity mask and the cgroup CPU quota, so that a
+    container limited to 4 CPUs on a 64-core host reports 4, unlike
+    `os.cpu_count()`.
+    """
+    count = os.cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+
+    quota = get_cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(1, math.ceil(quota)))
+    return count
+
+
+def get_cgroup_cpu_quota() -> Optional[float]:
+    """CPU quota of the cgroup of this process in CPUs, None when unlimited."""
+    # cgroup v2
+    value = _read_file("/sys/fs/cgroup/cpu.max")
+    if value is not None:
+        quota, _, period = value.partition(" ")
+        if quota == "max" or not period:
+            return None
+        return int(quota) / int(period)
+
+    # cgroup v1
+    quota = _read_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota is None or period is None or int(quota) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def whisper_cpu_layout(cores: int) -> Tuple[int, int]:
+    """Default `(cpu_threads, num_workers)` of a CTranslate2 Whisper model.
+
+    Each worker runs one transcription at a time with `cpu_threads` intra-op
+    threads, workers together use every core once.
+    """
+    num_workers = max(1, cores // THREADS_PER_WORKER)
+    return max(1, cores // num_workers), num_workers
+
+
+def whisper_cpu_layout_candidates(cores: int) -> List[Tuple[int, int]]:
+    """`(cpu_threads, num_workers)` layouts to probe, from one worker using
+    all cores to workers of 2 threads."""
+    candidates = []
+    for threads in [cores, 8, 4, 2]:
+        if threads > cores or threads < 1:
+            continue
+        layout = (threads, max(1, cores // threads))
+        if layout not in candidates:
+            candidates.append(layout)
+
+    default = whisper_cpu_layout(cores)
+    if default not in candidates:
+        candidates.append(default)
+    return candidates
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
@@ -0,0 +1,53 @@
+import logging
+import os
+import tempfile
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def jit_cache_dir(model_path: str, data_dir: Optional[str], device: str) -> str:
+    """Directory of the exported graphs of a model.
+
+    Next to the model when its directory is writable, under `data_dir`
+    otherwise. Graphs are only valid for the torch version and device type
+    they were exported with.
+    """
+    import torch
+
+    name = f"jit-{device.split(':')[0]}-torch{torch.__version__}"
+    if os.access(model_path, os.W_OK) or data_dir is None:
+        return os.path.join(model_path, name)
+
+    model_name = os.path.basename(os.path.normpath(model_path))
+    return os.path.join(data_dir, "jit", model_name, name)
+
+
+def export_torchscript(
+    module, path: str, preserved_attrs: Optional[List[str]] = None
+) -> str:
+    """Script, freeze and optimize `module` for inference and save it to
+    `path`, unless it was exported before."""
+    if os.path.exists(path):
+        return path
+
+    import torch
+
+    logger.info(f"Exporting TorchScript graph {path}")
+    script = torch.jit.script(module.eval())
+    script = torch.jit.freeze(script, preserved_attrs=preserved_attrs or [])
+    script = torch.jit.optimize_for_inference(script)
+
+    # Write atomically, a partial file would be loaded by the next start.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path), suffix=".zip", delete=False
+    ) as f:
+        temp_path = f.name
+    try:
+        script.save(temp_path)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return path
@@ -0,0 +1,85 @@
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+_SIZE_UNITS = {
+    "": 1,
+    "k": 1000,
+    "m": 1000**2,
+    "g": 1000**3,
+    "t": 1000**4,
+    "ki": 1024,
+    "mi": 1024**2,
+    "gi": 1024**3,
+    "ti": 1024**4,
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse a size like 512MiB, 8G or 1073741824 into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]i?)?b?\s*", value.lower())
+    if match is None:
+        raise ValueError(f"Invalid size: {value}")
+
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit or ""])
+
+
+def get_rss() -> Optional[int]:
+    """Resident set size of the current process in bytes."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def get_peak_rss() -> Optional[int]:
+    """High-water mark of the resident set size of the current process in bytes."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def get_torch_memory() -> Dict[str, int]:
+    """CUDA allocator statistics, empty when torch isn't loaded or without CUDA.
+
+    torch is never imported here, so that reading memory statistics doesn't
+    load it into processes serving backends which don't use it.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return {}
+
+    return {
+        "allocated": torch.cuda.memory_allocated(),
+        "reserved": torch.cuda.memory_reserved(),
+        "peak_allocated": torch.cuda.max_memory_allocated(),
+    }
+
+
+def reset_torch_peak_memory():
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
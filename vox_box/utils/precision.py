@@ -0,0 +1,68 @@
+import contextlib
+import logging
+from functools import wraps
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ["fp32", "bf16", "int8"]
+
+
+def validate_precision(precision: Optional[str], device: str):
+    if precision is None:
+        return
+
+    if precision not in PRECISIONS:
+        raise Exception(
+            f"Unsupported precision {precision}, expected one of {PRECISIONS}"
+        )
+
+    if precision == "int8" and not device.startswith("cpu"):
+        raise Exception("int8 precision is only supported on cpu")
+
+
+def precision_context(precision: Optional[str], device: str):
+    """Autocast context for the bf16 precision, a no-op otherwise.
+
+    Autocast state is thread local, enter it in the thread running the model.
+    """
+    if precision != "bf16":
+        return contextlib.nullcontext()
+
+    import torch
+
+    return torch.autocast(device_type=torch.device(device).type, dtype=torch.bfloat16)
+
+
+def with_precision(func, precision: Optional[str], device: str):
+    """Wrap `func` to run within the precision context."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with precision_context(precision, device):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def quantize_linear(module, name: str):
+    """Quantize the Linear layers of `module` to int8 in place.
+
+    Weights are quantized ahead of time and activations dynamically per
+    batch, which needs no calibration data. CPU only.
+    """
+    import torch
+
+    module = torch.ao.quantization.quantize_dynamic(
+        module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    count = sum(
+        1
+        for m in module.modules()
+        if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)
+    )
+    if count == 0:
+        logger.warning(f"{name} has no Linear layers to quantize")
+    else:
+        logger.info(f"Quantized {count} Linear layers of {name} to int8")
+    return module
@@ -0,0 +1,257 @@
+import io
+import json
+import linecache
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_torch_profiler: Optional["TorchProfiler"] = None
+
+
+class StackSampler:
+    """Sampling CPU profiler over all Python threads.
+
+    A background thread collects the stack of every other thread each
+    `interval` seconds, the samples are reported as folded stacks, one
+    `thread;frame;...;frame count` line per distinct stack, the input format
+    of flamegraph.pl and speedscope. Sampling does not instrument the
+    profiled code, the overhead is one stack walk per thread per interval.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self._interval = interval
+        self._samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sample_count = 0
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self._samples.most_common()
+        )
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self._interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+
+def format_tracemalloc_snapshot(snapshot: tracemalloc.Snapshot, limit: int = 50) -> str:
+    """Report the allocations still alive in `snapshot`, largest first."""
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ]
+    )
+    stats = snapshot.statistics("traceback")
+    total = sum(stat.size for stat in stats)
+
+    output = io.StringIO()
+    output.write(
+        f"Total allocated size: {total / 1024:.1f} KiB in {len(stats)} locations\n\n"
+    )
+    for index, stat in enumerate(stats[:limit], 1):
+        output.write(f"#{index}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+        for frame in stat.traceback.format(most_recent_first=True):
+            output.write(f"{frame}\n")
+        output.write("\n")
+
+    return output.getvalue()
+
+
+def profile_allocations(seconds: float, frames: int = 10, limit: int = 50) -> str:
+    """Trace the allocations made over `seconds` and report those still alive.
+
+    Blocks the calling thread for the whole window.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+    try:
+        baseline = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    linecache.clearcache()
+    report = format_tracemalloc_snapshot(snapshot, limit)
+
+    output = io.StringIO()
+    output.write("Top allocation growth over the window:\n\n")
+    for stat in snapshot.compare_to(baseline, "lineno")[:limit]:
+        output.write(f"{stat}\n")
+    output.write("\nLive allocations at the end of the window:\n\n")
+    output.write(report)
+    return output.getvalue()
+
+
+class TorchProfiler:
+    """Torch profiler of the inference calls run while it is active.
+
+    PyTorch records the operators of the thread a profiler runs on only, so
+    a profiler started on the event loop misses the inference running in
+    executor threads. Instead, the calls go through `run`, which profiles
+    each of them in its own thread, and their traces are merged into one
+    Chrome trace. Torch runs one profiler at a time, calls overlapping with
+    a profiled one run unprofiled.
+
+    A call handing its work to another thread, such as a batch worker, ends
+    its profile with `handoff` before waiting, so that the thread doing the
+    work can be profiled instead.
+    """
+
+    def __init__(self, activities: List[Any]):
+        self._activities = activities
+        # Held by the profiled call.
+        self._lock = threading.Lock()
+        self._events_lock = threading.Lock()
+        self._events: List[Dict] = []
+        self._base_time: Optional[int] = None
+        # Profile of the call running in the thread, if profiled.
+        self._local = threading.local()
+        self.calls = 0
+        self.skipped = 0
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        if not self._lock.acquire(blocking=False):
+            self.skipped += 1
+            return func()
+
+        import torch
+
+        try:
+            profile = torch.profiler.profile(
+                activities=self._activities, record_shapes=True
+            )
+            profile.__enter__()
+        except BaseException:
+            self._lock.release()
+            raise
+
+        self._local.profile = profile
+        try:
+            return func()
+        finally:
+            self.handoff()
+
+    def handoff(self):
+        """End the profile of the call running in this thread, if any."""
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            return
+
+        self._local.profile = None
+        try:
+            profile.__exit__(None, None, None)
+            self._collect(profile)
+        finally:
+            self._lock.release()
+
+    @property
+    def op_count(self) -> int:
+        """Number of aten operators recorded."""
+        with self._events_lock:
+            return sum(
+                1
+                for event in self._events
+                if event.get("name", "").startswith("aten::")
+            )
+
+    def export_chrome_trace(self, path: str):
+        """Write the calls profiled so far, those still running are left out."""
+        with self._events_lock:
+            events = list(self._events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events}, f)
+
+    @contextmanager
+    def active(self):
+        """Profile the calls of `run_in_executor` while in the block."""
+        global _torch_profiler
+
+        _torch_profiler = self
+        try:
+            yield self
+        finally:
+            _torch_profiler = None
+
+    def _collect(self, profiler):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            path = f.name
+        try:
+            profiler.export_chrome_trace(path)
+            with open(path, "r", encoding="utf-8") as f:
+                trace = json.load(f)
+        finally:
+            os.remove(path)
+
+        # Timestamps of recent versions are relative to a base time, align the
+        # calls on the base time of the first one.
+        with self._events_lock:
+            shift = 0.0
+            base_time = trace.get("baseTimeNanoseconds")
+            if base_time is not None:
+                if self._base_time is None:
+                    self._base_time = base_time
+                shift = (base_time - self._base_time) / 1000
+
+            for event in trace.get("traceEvents", []):
+                if shift and "ts" in event:
+                    event["ts"] = float(event["ts"]) + shift
+                self._events.append(event)
+            self.calls += 1
+
+
+def get_torch_profiler() -> Optional[TorchProfiler]:
+    return _torch_profiler
+
+
+def profile_call(func: Callable[[], Any]) -> Any:
+    """Call `func`, profiled by the active torch profiler if any."""
+    profiler = _torch_profiler
+    if profiler is None:
+        return func()
+    return profiler.run(func)
+
+
+def handoff_profile():
+    """End the torch profile of the current thread before it waits for work
+    done by other threads, which can then be profiled."""
+    profiler = _torch_profiler
+    if profiler is not None:
+        profiler.handoff()
@@ -0,0 +1,254 @@
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from vox_box.config.config import Config
+from vox_box.utils.cpu import THREADS_PER_WORKER, get_cpu_count
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by OpenMP, MKL and the BLAS libraries when they
+# initialize.
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+_resource_manager = None
+
+
+class ResourceManager:
+    """Process-wide CPU budget shared by the inference workers.
+
+    The budget is a set of cores, optionally restricted to a NUMA node, split
+    between `workers` inference workers of `threads_per_worker` intra-op
+    threads each, so that concurrent requests don't oversubscribe the cores
+    with one full-size thread pool per library and request.
+
+    With `bounded`, requests run on the bounded `executor`, extra requests
+    wait for a free worker, and with `pin_workers` every worker thread is
+    pinned to its own core set. Otherwise `executor` is None and requests run
+    on the default executor.
+
+    `spare_threads` adds executor threads beyond the workers, for requests
+    preempted by the scheduler, which hold a thread but not a CPU share.
+    `reserve_threads` keeps enough threads for the requests of a batching
+    backend, which hold a thread while waiting for their batch.
+    """
+
+    def __init__(
+        self,
+        cores: int = 0,
+        numa_node: Optional[int] = None,
+        workers: int = 0,
+        pin_workers: bool = False,
+        bounded: bool = True,
+    ):
+        available = sorted(_get_affinity())
+        if numa_node is not None:
+            node_cpus = get_numa_node_cpus(numa_node)
+            available = [cpu for cpu in available if cpu in node_cpus]
+            if not available:
+                raise Exception(f"No usable CPUs on NUMA node {numa_node}")
+
+        limit = min(len(available), get_cpu_count())
+        if cores > 0:
+            limit = min(limit, cores)
+
+        self.cpus = available[:limit]
+        self.numa_node = numa_node
+        self.workers = workers or max(1, len(self.cpus) // THREADS_PER_WORKER)
+        self.threads_per_worker = max(1, len(self.cpus) // self.workers)
+        self.pin_workers = pin_workers
+        self.bounded = bounded
+        self._spare_threads = 0
+        self._reserved_threads = 0
+        self._executor = None
+        self._next_worker = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cores(self) -> int:
+        return len(self.cpus)
+
+    @property
+    def spare_threads(self) -> int:
+        return self._spare_threads
+
+    @spare_threads.setter
+    def spare_threads(self, value: int):
+        self._spare_threads = value
+        self._reset_executor()
+
+    def reserve_threads(self, count: int):
+        """Keep at least `count` executor threads besides the spare ones."""
+        if count > self._reserved_threads:
+            self._reserved_threads = count
+            self._reset_executor()
+
+    def worker_cpus(self, index: int) -> List[int]:
+        """Core set of a worker, wrapping around with more workers than cores."""
+        start = (index * self.threads_per_worker) % len(self.cpus)
+        return [
+            self.cpus[(start + i) % len(self.cpus)]
+            for i in range(self.threads_per_worker)
+        ]
+
+    def apply(self):
+        """Restrict the process to the budget and size the thread pools.
+
+        Must run on the main thread before the models start their thread
+        pools, threads started later inherit the affinity.
+
+        Without a configured budget, only a NUMA node restricts the process,
+        and the libraries keep their default pools sized to all cores.
+        Thread counts already set in the environment are kept.
+        """
+        if hasattr(os, "sched_setaffinity") and (
+            self.bounded or self.numa_node is not None
+        ):
+            os.sched_setaffinity(0, self.cpus)
+
+        if not self.bounded:
+            return
+
+        for name in THREAD_ENV_VARS:
+            if name in os.environ:
+                logger.info(f"Keeping {name}={os.environ[name]} from the environment")
+                continue
+            os.environ[name] = str(self.threads_per_worker)
+
+        # Backends import torch before the budget is known, resize its pools.
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(self.threads_per_worker)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError as e:
+                logger.debug(f"Keeping the torch inter-op threads, {e}")
+
+    def resize(self, workers: int, threads_per_worker: int):
+        """Adopt the layout chosen by a backend, before the first request."""
+        if (workers, threads_per_worker) == (self.workers, self.threads_per_worker):
+            return
+
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self._reset_executor()
+        logger.info(f"CPU layout changed by the backend {self.layout()}")
+
+    @property
+    def executor(self) -> Optional[ThreadPoolExecutor]:
+        if not self.bounded:
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                self._next_worker = 0
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(self.workers, self._reserved_threads)
+                    + self._spare_threads,
+                    thread_name_prefix="inference",
+                    initializer=self._init_worker,
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        """Resize the executor on its next use, running calls finish on the
+        previous one."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def layout(self) -> Dict:
+        return {
+            "cpus": _format_cpulist(self.cpus),
+            "numa_node": self.numa_node,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "pin_workers": self.pin_workers,
+            "worker_cpus": [
+                _format_cpulist(self.worker_cpus(i)) for i in range(self.workers)
+            ],
+        }
+
+    def _init_worker(self):
+        with self._lock:
+            index = self._next_worker
+            self._next_worker += 1
+
+        if self.pin_workers and hasattr(os, "sched_setaffinity"):
+            # Pid 0 is the calling thread on Linux.
+            os.sched_setaffinity(0, self.worker_cpus(index))
+
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            # The OpenMP pool size is per thread.
+            torch.set_num_threads(self.threads_per_worker)
+
+
+def setup_resources(cfg: Config) -> ResourceManager:
+    global _resource_manager
+
+    _resource_manager = ResourceManager(
+        cores=cfg.cpu_cores,
+        numa_node=cfg.numa_node,
+        workers=cfg.inference_workers,
+        pin_workers=cfg.pin_workers,
+        # Bounding the requests to the workers is opt-in, it would also
+        # queue cheap requests behind inference.
+        bounded=cfg.cpu_cores > 0 or cfg.inference_workers > 0 or cfg.pin_workers,
+    )
+    _resource_manager.apply()
+    logger.info(f"CPU layout {_resource_manager.layout()}")
+    return _resource_manager
+
+
+def get_resource_manager() -> Optional[ResourceManager]:
+    global _resource_manager
+    return _resource_manager
+
+
+def get_numa_node_cpus(node: int) -> List[int]:
+    path = f"/sys/devices/system/node/node{node}/cpulist"
+    try:
+        with open(path, "r") as f:
+            return parse_cpulist(f.read())
+    except OSError:
+        raise Exception(f"NUMA node {node} not found")
+
+
+def parse_cpulist(value: str) -> List[int]:
+    """Parse a kernel CPU list like 0-3,8,10-11."""
+    cpus = []
+    for part in value.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def _format_cpulist(cpus: List[int]) -> str:
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
+
+
+def _get_affinity() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return list(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
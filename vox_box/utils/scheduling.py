@@ -0,0 +1,346 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from vox_box.utils.cancellation import check_cancelled, on_cancel
+from vox_box.utils.tracing import record_span
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+DEFAULT_TENANT = "default"
+
+_request_class: ContextVar[Tuple[str, str]] = ContextVar(
+    "vox_box_request_class", default=(DEFAULT_TENANT, INTERACTIVE)
+)
+_current_slot: ContextVar[Optional["Slot"]] = ContextVar("vox_box_slot", default=None)
+
+
+class _Ticket:
+    __slots__ = ("slot", "start", "grant")
+
+    def __init__(self, slot: "Slot", start: float, grant: Optional[Callable]):
+        self.slot = slot
+        self.start = start
+        self.grant = grant
+
+
+class Slot:
+    """A share of the inference concurrency, held by one request."""
+
+    def __init__(self, scheduler: "FairScheduler", tenant: str, priority: str):
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.priority = priority
+        self.preemptions = 0
+        self._granted = threading.Event()
+        self._ticket: Optional[_Ticket] = None
+        self._preempted = False
+        self._released = False
+
+    def checkpoint(self):
+        self.scheduler._checkpoint(self)
+
+    def release(self):
+        self.scheduler._release(self)
+
+
+class FairScheduler:
+    """Weighted fair queuing of inference requests over `slots` slots.
+
+    Requests wait in two lanes. A free slot goes to an `interactive` request
+    before any `batch` request, and `batch` requests never hold more than
+    `slots - reserved_slots` slots, so interactive requests don't queue
+    behind a bulk job. Within a lane, tenants share the slots in proportion
+    to their weight by start-time fair queuing: every grant advances the
+    virtual time of its tenant by 1 / weight, and the waiting request with
+    the lowest virtual start time is granted first.
+
+    Long requests call `checkpoint()` between chunks of work. A batch request
+    gives its slot up there while an interactive request, or a batch request
+    of a tenant behind its fair share, is waiting, and queues again. A
+    preempted request keeps its executor thread, at most `max_preempted` are
+    preempted at a time.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        reserved_slots: int = 1,
+        weights: Optional[Dict[str, float]] = None,
+        max_preempted: Optional[int] = None,
+    ):
+        self.slots = slots
+        self.reserved_slots = reserved_slots
+        self.max_preempted = slots if max_preempted is None else max_preempted
+        self._weights = weights or {}
+        self._lock = threading.Lock()
+        # priority -> tenant -> tickets in arrival order
+        self._queues: Dict[str, Dict[str, Deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self._virtual_time = {p: 0.0 for p in PRIORITIES}
+        # (priority, tenant) -> virtual finish time of its last request
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._running = {p: 0 for p in PRIORITIES}
+        self._granted = {p: 0 for p in PRIORITIES}
+        self._preempted = 0
+        self._preemptions = 0
+
+    @property
+    def batch_slots(self) -> int:
+        return max(1, self.slots - self.reserved_slots)
+
+    def weight(self, tenant: str) -> float:
+        return self._weights.get(tenant, 1.0)
+
+    async def acquire(self, tenant: str, priority: str = INTERACTIVE) -> Slot:
+        """Wait for a slot, the caller must release it."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Invalid priority: {priority}")
+
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        slot = Slot(self, tenant, priority)
+
+        def resolve():
+            if granted.cancelled():
+                slot.release()
+            else:
+                granted.set_result(slot)
+
+        with self._lock:
+            self._enqueue(slot, lambda: loop.call_soon_threadsafe(resolve))
+            self._dispatch()
+
+        try:
+            return await granted
+        except asyncio.CancelledError:
+            # Dequeues the request, or gives the slot back if it was granted
+            # meanwhile.
+            slot.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, priority: str = INTERACTIVE):
+        slot = await self.acquire(tenant, priority)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queued": {
+                    p: sum(len(q) for q in self._queues[p].values()) for p in PRIORITIES
+                },
+                "running": dict(self._running),
+                "granted": dict(self._granted),
+                "preempted": self._preempted,
+                "preemptions": self._preemptions,
+            }
+
+    def prometheus(self) -> str:
+        stats = self.stats()
+        lines = [
+            "# HELP vox_box_scheduler_queued Requests waiting for an inference slot.",
+            "# TYPE vox_box_scheduler_queued gauge",
+        ]
+        for p in PRIORITIES:
+            lines.append(
+                f'vox_box_scheduler_queued{{priority="{p}"}} {stats["queued"][p]}'
+            )
+        lines += [
+            "# HELP vox_box_scheduler_running Requests holding an inference slot.",
+            "# TYPE vox_box_scheduler_running gauge",
+        ]
+        for p in PRIORITIES:
+            lines.append(
+                f'vox_box_scheduler_running{{priority="{p}"}} {stats["running"][p]}'
+            )
+        lines += [
+            "# HELP vox_box_scheduler_granted_total Inference slots granted, including after preemptions.",
+            "# TYPE vox_box_scheduler_granted_total counter",
+        ]
+        for p in PRIORITIES:
+            lines.append(
+                f'vox_box_scheduler_granted_total{{priority="{p}"}} {stats["granted"][p]}'
+            )
+        lines += [
+            "# HELP vox_box_scheduler_preemptions_total Batch requests that gave their slot up at a checkpoint.",
+            "# TYPE vox_box_scheduler_preemptions_total counter",
+            f"vox_box_scheduler_preemptions_total {stats['preemptions']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _enqueue(self, slot: Slot, grant: Optional[Callable]):
+        key = (slot.priority, slot.tenant)
+        start = max(self._virtual_time[slot.priority], self._finish.get(key, 0.0))
+        self._finish[key] = start + 1.0 / self.weight(slot.tenant)
+        if len(self._finish) > 4096:
+            self._forget_idle_tenants()
+
+        queue = self._queues[slot.priority].setdefault(slot.tenant, deque())
+        if slot._preempted:
+            # A preempted request holds a thread, it goes first among the
+            # requests of its tenant.
+            if queue:
+                start = min(start, queue[0].start)
+            ticket = _Ticket(slot, start, grant)
+            queue.appendleft(ticket)
+        else:
+            ticket = _Ticket(slot, start, grant)
+            queue.append(ticket)
+        slot._ticket = ticket
+
+    def _dequeue(self, ticket: _Ticket):
+        slot = ticket.slot
+        queue = self._queues[slot.priority][slot.tenant]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[slot.priority][slot.tenant]
+        slot._ticket = None
+
+    def _head(self, priority: str) -> Optional[_Ticket]:
+        """The waiting request of the lane with the lowest start time."""
+        heads = [queue[0] for queue in self._queues[priority].values()]
+        return min(heads, key=lambda t: t.start) if heads else None
+
+    def _dispatch(self):
+        while sum(self._running.values()) < self.slots:
+            ticket = self._head(INTERACTIVE)
+            if ticket is None and self._running[BATCH] < self.batch_slots:
+                ticket = self._head(BATCH)
+            if ticket is None:
+                return
+
+            slot = ticket.slot
+            self._dequeue(ticket)
+            self._virtual_time[slot.priority] = ticket.start
+            self._running[slot.priority] += 1
+            self._granted[slot.priority] += 1
+            if slot._preempted:
+                slot._preempted = False
+                self._preempted -= 1
+            slot._granted.set()
+            if ticket.grant is not None:
+                ticket.grant()
+
+    def _should_preempt(self, slot: Slot) -> bool:
+        if slot.priority != BATCH or self._preempted >= self.max_preempted:
+            return False
+        if self._queues[INTERACTIVE]:
+            return True
+
+        # Another tenant behind its fair share waits for a batch slot.
+        starts = [
+            queue[0].start
+            for tenant, queue in self._queues[BATCH].items()
+            if tenant != slot.tenant
+        ]
+        if not starts:
+            return False
+        key = (BATCH, slot.tenant)
+        return min(starts) < max(self._virtual_time[BATCH], self._finish.get(key, 0))
+
+    def _checkpoint(self, slot: Slot):
+        with self._lock:
+            if slot._released:
+                return
+            if slot._granted.is_set():
+                if not self._should_preempt(slot):
+                    return
+                self._running[slot.priority] -= 1
+                self._preempted += 1
+                self._preemptions += 1
+                slot.preemptions += 1
+                slot._preempted = True
+                slot._granted.clear()
+                self._enqueue(slot, None)
+                self._dispatch()
+
+        # Other threads of the request wait here as well. A cancelled request
+        # gives its place in the queue up.
+        start = time.perf_counter()
+        with on_cancel(slot.release):
+            slot._granted.wait()
+        record_span("preempted", start)
+
+    def _release(self, slot: Slot):
+        with self._lock:
+            if slot._released:
+                return
+            slot._released = True
+            if slot._ticket is not None:
+                self._dequeue(slot._ticket)
+                if slot._preempted:
+                    slot._preempted = False
+                    self._preempted -= 1
+                # Wake up the threads waiting at a checkpoint.
+                slot._granted.set()
+            elif slot._granted.is_set():
+                self._running[slot.priority] -= 1
+            self._dispatch()
+
+    def _forget_idle_tenants(self):
+        """Drop the finish times that no longer differ from the lane's
+        virtual time, they have no effect on the next start time."""
+        self._finish = {
+            key: finish
+            for key, finish in self._finish.items()
+            if finish > self._virtual_time[key[0]] or key[1] in self._queues[key[0]]
+        }
+
+
+def set_request_class(tenant: str, priority: str):
+    """Set the tenant and priority of the requests of the current context."""
+    _request_class.set((tenant, priority))
+
+
+def get_request_class() -> Tuple[str, str]:
+    return _request_class.get()
+
+
+@contextmanager
+def use_slot(slot: Optional[Slot]):
+    """Make `slot` the one `checkpoint()` yields, in the current context."""
+    token = _current_slot.set(slot)
+    try:
+        yield
+    finally:
+        _current_slot.reset(token)
+
+
+def checkpoint():
+    """Let waiting requests of a higher priority or a fairer tenant run, and
+    stop cancelled requests.
+
+    Long running inference calls this between chunks or segments of work,
+    it may block until the request is granted a slot again, and raises
+    `RequestCancelled` once the request was cancelled. The scheduling part is
+    a no-op outside of a scheduled request.
+    """
+    check_cancelled()
+    slot = _current_slot.get()
+    if slot is not None:
+        slot.checkpoint()
+        check_cancelled()
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse tenant weights like voice-agent=4,etl=1."""
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        tenant, sep, weight = part.rpartition("=")
+        if not sep or not tenant.strip():
+            raise ValueError(f"Invalid tenant weight: {part}")
+        weights[tenant.strip()] = float(weight)
+        if weights[tenant.strip()] <= 0:
+            raise ValueError(f"Tenant weight must be positive: {part}")
+    return weights
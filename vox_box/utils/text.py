@@ -0,0 +1,150 @@
+import re
+from typing import List, Optional
+
+# Sentence terminators, ASCII and CJK, keeping trailing quotes and brackets.
+_SENTENCE_RE = re.compile(r"[^.!?;。！？；\n]*(?:[.!?;。！？；\n]+[\"'”’)\]]*|$)")
+_CLAUSE_RE = re.compile(r"[^,:，、：]*(?:[,:，、：]+|$)")
+_SPEAKER_TAG_RE = re.compile(r"^\s*\[S\d+\]")
+
+
+def split_sentences(text: str, max_chars: int = 250, min_chars: int = 10) -> List[str]:
+    """Split text into segments at sentence boundaries.
+
+    Sentences longer than `max_chars` are further split at clause boundaries,
+    then at whitespace, and packed back into pieces of at most `max_chars`.
+    Fragments shorter than `min_chars` are merged into the following segment
+    so that no segment is a lone word or punctuation mark.
+    """
+    pieces = []
+    for sentence in _SENTENCE_RE.findall(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        clauses = []
+        for clause in _CLAUSE_RE.findall(sentence):
+            clause = clause.strip()
+            if clause:
+                clauses.extend(_split_hard(clause, max_chars))
+        pieces.extend(_pack(clauses, max_chars))
+
+    segments = []
+    buffer = ""
+    for piece in pieces:
+        buffer = f"{buffer} {piece}".strip() if buffer else piece
+        if len(buffer) >= min_chars:
+            segments.append(buffer)
+            buffer = ""
+    if buffer:
+        if segments and len(segments[-1]) + len(buffer) < max_chars:
+            segments[-1] = f"{segments[-1]} {buffer}"
+        else:
+            segments.append(buffer)
+
+    return carry_speaker_tags(segments)
+
+
+def carry_speaker_tags(segments: List[str]) -> List[str]:
+    """Prefix segments with the dialogue speaker tag (e.g. `[S1]`) in effect.
+
+    Dialogue models such as Dia expect every input to start with a speaker tag,
+    which is lost when a speaker's turn is split over several segments.
+    """
+    result = []
+    speaker = None
+    for segment in segments:
+        match = _SPEAKER_TAG_RE.match(segment)
+        if match is None and speaker is not None:
+            segment = f"{speaker} {segment}"
+
+        tags = re.findall(r"\[S\d+\]", segment)
+        if tags:
+            speaker = tags[-1]
+        result.append(segment)
+
+    return result
+
+
+def _pack(pieces: List[str], max_chars: int) -> List[str]:
+    packed = []
+    for piece in pieces:
+        if packed and len(packed[-1]) + len(piece) + 1 <= max_chars:
+            packed[-1] = f"{packed[-1]} {piece}"
+        else:
+            packed.append(piece)
+    return packed
+
+
+def _split_hard(text: str, max_chars: int) -> List[str]:
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+# Boundaries usable while text is still arriving. ASCII punctuation only counts
+# once followed by whitespace, so that "3.14" or "e.g." are not cut early.
+_STREAM_SENTENCE_RE = re.compile(r"[.!?;]+[\"')\]]*\s|[。！？；\n]+")
+_STREAM_CLAUSE_RE = re.compile(r"[,:]+\s|[，、：]+")
+
+
+class TextChunker:
+    """Incrementally cut streamed text (e.g. LLM token deltas) into chunks.
+
+    A chunk is emitted at a sentence boundary once it holds at least
+    `min_chars`. The first chunk of a turn may also be cut at a clause
+    boundary, so synthesis can start as early as possible. Text longer than
+    `max_chars` without any boundary is cut at whitespace.
+    """
+
+    def __init__(self, min_chars: int = 10, max_chars: int = 250):
+        self._min_chars = min_chars
+        self._max_chars = max_chars
+        self.reset()
+
+    def push(self, delta: str) -> List[str]:
+        self._buffer += delta
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+                self._emitted = True
+        return chunks
+
+    def flush(self) -> List[str]:
+        chunk = self._buffer.strip()
+        self.reset()
+        return [chunk] if chunk else []
+
+    def reset(self):
+        self._buffer = ""
+        self._emitted = False
+
+    def _find_cut(self) -> Optional[int]:
+        patterns = [_STREAM_SENTENCE_RE]
+        if not self._emitted or len(self._buffer) > self._max_chars:
+            patterns.append(_STREAM_CLAUSE_RE)
+
+        for pattern in patterns:
+            for match in pattern.finditer(self._buffer):
+                if len(self._buffer[: match.end()].strip()) >= self._min_chars:
+                    return match.end()
+
+        if len(self._buffer) > self._max_chars:
+            cut = self._buffer.rfind(" ", 0, self._max_chars)
+            return cut if cut > 0 else self._max_chars
+
+        return None
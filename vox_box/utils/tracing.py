@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar(
+    "vox_box_trace", default=None
+)
+_current_span_id: ContextVar[Optional[str]] = ContextVar(
+    "vox_box_span_id", default=None
+)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+
+class Trace:
+    """Spans of a single request.
+
+    Spans may be recorded from the event loop and from executor threads, the
+    current trace and parent span are carried by context variables, so
+    functions run in an executor must be called within a copy of the
+    caller's context.
+    """
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(
+            name, _new_span_id(), None, time.perf_counter(), attributes=attributes or {}
+        )
+        self._spans: List[Span] = [self.root]
+        self._start_unix_ns = time.time_ns()
+        self._lock = threading.Lock()
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def add_span(
+        self,
+        name: str,
+        start: float,
+        end: Optional[float] = None,
+        parent_id: Optional[str] = None,
+        **attributes,
+    ) -> Span:
+        span = Span(
+            name,
+            _new_span_id(),
+            parent_id or self.root.span_id,
+            start,
+            end,
+            attributes,
+        )
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    def finish(self):
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+
+    def server_timing(self) -> str:
+        """Format the finished spans as a Server-Timing header value.
+
+        Each stage reports its own time, excluding its child spans, summed
+        over spans of the same name, followed by the total request time.
+        """
+        spans = self.spans
+        child_durations: Dict[str, float] = defaultdict(float)
+        for span in spans[1:]:
+            if span.end is not None:
+                child_durations[span.parent_id] += span.duration
+
+        durations: Dict[str, float] = {}
+        for span in spans[1:]:
+            if span.end is None:
+                continue
+            self_duration = max(span.duration - child_durations[span.span_id], 0)
+            durations[span.name] = durations.get(span.name, 0) + self_duration
+
+        metrics = [f"{name};dur={d * 1000:.1f}" for name, d in durations.items()]
+        metrics.append(f"total;dur={self.root.duration * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def to_otlp(self) -> Dict:
+        """Convert the trace to an OTLP/JSON ExportTraceServiceRequest."""
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 2 if span.parent_id is None else 1,
+                "startTimeUnixNano": str(self._unix_ns(span.start)),
+                "endTimeUnixNano": str(self._unix_ns(span.start + span.duration)),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span.attributes.items()
+                ],
+            }
+            if span.parent_id is not None:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "vox-box"}}
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "vox_box"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def _unix_ns(self, perf: float) -> int:
+        return self._start_unix_ns + int((perf - self.root.start) * 1e9)
+
+
+def start_trace(name: str, **attributes) -> Trace:
+    """Create a trace and make it current in the calling context."""
+    trace = Trace(name, attributes)
+    _current_trace.set(trace)
+    _current_span_id.set(trace.root.span_id)
+    return trace
+
+
+def get_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def record_span(
+    name: str, start: float, end: Optional[float] = None, **attributes
+) -> Optional[Span]:
+    """Record an already elapsed stage, from `start` to `end` or now."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+
+    return trace.add_span(
+        name,
+        start,
+        end if end is not None else time.perf_counter(),
+        _current_span_id.get(),
+        **attributes,
+    )
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record the enclosed block as a span of the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = trace.add_span(
+        name, time.perf_counter(), parent_id=_current_span_id.get(), **attributes
+    )
+    token = _current_span_id.set(current.span_id)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        _current_span_id.reset(token)
+
+
+def traced(name: str):
+    """Decorator recording each call of the function as a span."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
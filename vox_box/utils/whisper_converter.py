@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = [
+    "int8",
+    "int8_float32",
+    "int8_float16",
+    "int8_bfloat16",
+    "int16",
+    "float16",
+    "bfloat16",
+    "float32",
+]
+
+# Files faster-whisper reads next to model.bin.
+COPY_FILES = ["tokenizer.json", "preprocessor_config.json"]
+
+WEIGHT_SUFFIXES = (".safetensors", ".bin", ".pt")
+
+
+def is_transformers_whisper(model_path: str) -> bool:
+    """Whether `model_path` is a local Transformers Whisper checkpoint."""
+    config_path = os.path.join(model_path, "config.json")
+    if not os.path.exists(config_path) or os.path.exists(
+        os.path.join(model_path, "model.bin")
+    ):
+        return False
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("model_type") == "whisper"
+
+
+def converted_model_dir(cache_root: str, model: str, quantization: str) -> str:
+    """Cache directory of a converted model.
+
+    Keyed by the config and weight file sizes and modification times of
+    local checkpoints, so that a fine-tuned checkpoint saved again to the
+    same path is converted again.
+    """
+    name = os.path.basename(os.path.normpath(model))
+    return os.path.join(
+        cache_root, f"{name}-{quantization}-{_checkpoint_digest(model)[:16]}"
+    )
+
+
+def convert_whisper(
+    model: str,
+    output_dir: str,
+    quantization: str,
+    force: bool = False,
+) -> str:
+    """Convert a Transformers Whisper checkpoint, local or on the Huggingface
+    hub, to a CTranslate2 model usable by faster-whisper.
+
+    The conversion is written to a temporary directory next to `output_dir`
+    and moved into place once complete, an existing conversion is reused
+    unless `force` is set.
+    """
+    if quantization not in QUANTIZATIONS:
+        raise Exception(
+            f"Unsupported quantization {quantization}, expected one of {QUANTIZATIONS}"
+        )
+
+    if os.path.exists(os.path.join(output_dir, "model.bin")) and not force:
+        logger.info(f"Using cached conversion {output_dir}")
+        return output_dir
+
+    from ctranslate2.converters import TransformersConverter
+
+    copy_files = COPY_FILES
+    if os.path.isdir(model):
+        copy_files = [f for f in COPY_FILES if os.path.exists(os.path.join(model, f))]
+
+    parent_dir = os.path.dirname(os.path.abspath(output_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=parent_dir, prefix=".convert-")
+    try:
+        logger.info(f"Converting {model} to {quantization}")
+        converter = TransformersConverter(
+            model, copy_files=copy_files, low_cpu_mem_usage=True
+        )
+        converter.convert(temp_dir, quantization=quantization, force=True)
+
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.replace(temp_dir, output_dir)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Converted {model} to {output_dir}")
+    return output_dir
+
+
+def get_dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def _checkpoint_digest(model: str) -> str:
+    h = hashlib.sha256(model.encode())
+    if not os.path.isdir(model):
+        return h.hexdigest()
+
+    for name in sorted(os.listdir(model)):
+        if name != "config.json" and not name.endswith(WEIGHT_SUFFIXES):
+            continue
+        stat = os.stat(os.path.join(model, name))
+        h.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()